@@ -310,5 +310,8 @@ def createApp( root_path, config_file = None, module = None, full_start = True,
 
     # register table name class mapping
     API.tables_dict = { table.__tablename__: table for table in API.db.Model.__subclasses__() }
+    # the tracking needs the version and table information, build it once
+    from webapp2.common.tracking.metadata import trackingMetadata
+    trackingMetadata.build()
 
     return API.app
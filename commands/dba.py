@@ -1,8 +1,10 @@
 import os
+import time
 import click
 import yaml
 from yamlinclude import YamlIncludeConstructor
 import json
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.engine.reflection import Inspector
 import sqlalchemy.orm
 import webapp2.api as API
@@ -105,12 +107,98 @@ def restore( _list, name, schema ):
     return
 
 
+def modelTables( table = None ):
+    """The tables from the database with their model class, optional only one table.
+    """
+    result = []
+    for tbl in listTables():
+        if table is not None and table != tbl:
+            API.app.logger.warning( "Incorrect table, looking for {}".format( table ) )
+            continue
+
+        model = API.db.get_model_by_tablename( tbl )
+        if model is None:
+            API.app.logger.warning( "Cannot detect MODEL of table {}".format( tbl ) )
+            continue
+
+        result.append( ( tbl, model ) )
+
+    return result
+
+
+def tableLevels( tables ):
+    """Group the tables in levels for the import, the tables of a level only refer
+       (foreign keys) to the tables of the previous levels.
+    """
+    names = set( tbl for tbl, model in tables )
+    depends = { tbl: set( fk.column.table.name for fk in model.__table__.foreign_keys
+                          if fk.column.table.name in names and fk.column.table.name != tbl )
+                for tbl, model in tables }
+    levels = []
+    done = set()
+    while len( done ) < len( tables ):
+        level = [ ( tbl, model ) for tbl, model in tables if tbl not in done and depends[ tbl ] <= done ]
+        if len( level ) == 0:
+            # circular references, the remaining tables in one level
+            level = [ ( tbl, model ) for tbl, model in tables if tbl not in done ]
+
+        levels.append( level )
+        done.update( tbl for tbl, model in level )
+
+    return levels
+
+
+def printThroughput( results ):
+    click.echo( '{:40}  {:>10}  {:>10}  {:>12}'.format( 'Table', 'Records', 'Seconds', 'Records/s' ) )
+    click.echo( '-' * 78 )
+    for tbl, count, elapsed in results:
+        if count is None:
+            click.echo( '{:40}  {:>10}  {:>10.2f}  {:>12}'.format( tbl, '-', elapsed, '-' ) )
+
+        else:
+            click.echo( '{:40}  {:>10}  {:>10.2f}  {:>12.1f}'.format( tbl, count, elapsed,
+                                                                       count / elapsed if elapsed > 0 else 0.0 ) )
+
+    return
+
+
+def exportTable( exporter, tbl, model, clear, chunk ):
+    API.app.logger.info( "Table: {}".format( tbl ) )
+    start = time.monotonic()
+    # server side cursor, only a chunk of records is loaded at the time
+    query = API.db.session.query( model ).execution_options( stream_results = True ).yield_per( chunk )
+    count = exporter.writeTable( tbl, query, clear )
+    API.db.session.expunge_all()
+    return tbl, count, time.monotonic() - start
+
+
+def exportWorker( exporterClass, filename, tbl, model, clear, chunk, fragment ):
+    """Export one table in a worker thread, with its own application context and
+       therefore its own session and connection.
+    """
+    with API.app.app_context():
+        exporter = exporterClass( filename, chunk )
+        if fragment is not None:
+            exporter.openFragment( fragment )
+
+        try:
+            return exportTable( exporter, tbl, model, clear, chunk )
+
+        finally:
+            exporter.closeFragment()
+            API.db.session.remove()
+
+
 EXPORT_HELP = """Export the database to a {} file.
 
-    dba export [ --fmt <type> ] [ --table <table-name> ] <filename>
+    dba export [ --fmt <type> ] [ --table <table-name> ] [ --chunk <records> ] [ --jobs <n> ] [ --gzip ] <filename>
 
 
 <filename>: The filename with or without the extension to be used to write the database information to.
+
+The tables are read with a server side cursor and written in chunks of <records> records.
+With --jobs the tables are exported by <n> threads, each table to a fragment file, the
+fragments are merged into <filename> at the end.
 """.format( dbExporters.keysToString() )
 
 
@@ -126,39 +214,99 @@ EXPORT_HELP = """Export the database to a {} file.
 @click.option( '--clear',
                default = False,
                help = "Clears the table before inserting (only for {}.)".format( dbExporters.hasClear2String() ) )
+@click.option( '--chunk',
+               default = 1000,
+               type = int,
+               help = "The number of records read and written at once (default: 1000)." )
+@click.option( '--jobs',
+               default = 1,
+               type = int,
+               help = "The number of tables exported at the same time (default: 1)." )
+@click.option( '--gzip/--nogzip', 'compress',
+               default = False,
+               help = "Compress the output file, <filename>.gz (not for CSV and NPZ)." )
 @click.argument( 'filename' )
-def export( fmt, filename, table, clear ):
+def export( fmt, filename, table, clear, chunk, jobs, compress ):
     fmt = fmt.lower()
+    if filename.endswith( '.gz' ):
+        filename, compress = filename[ : -3 ], True
+
     if not filename.endswith( fmt ):
         filename += ".{}".format( fmt )
 
+    if compress and fmt not in ( 'csv', 'npz' ):
+        filename += ".gz"
+
     API.app.logger.info( "Output filename: {}".format( filename ) )
-    exporter = dbExporters[ fmt ]( filename )
-    for tbl in listTables():
+    exporter = dbExporters[ fmt ]( filename, chunk )
+    tables = modelTables( table )
+    if jobs <= 1:
         exporter.open( filename )
-        API.app.logger.info( "TABLE: {}".format( tbl ) )
-        if table is not None and table != tbl:
-            API.app.logger.warning( "Incorrect table, looking for {}".format( table ) )
-            continue
+        results = [ exportTable( exporter, tbl, model, clear, chunk ) for tbl, model in tables ]
+        exporter.close()
 
-        model = API.db.get_model_by_tablename( tbl )
-        if model is None:
-            API.app.logger.warning( "Cannot detect MODEL of table {}".format( tbl ) )
-            continue
+    else:
+        fragments = { tbl: "{}.{}.part".format( filename, tbl ) if exporter.FRAGMENTS else None
+                      for tbl, model in tables }
+        try:
+            with ThreadPoolExecutor( max_workers = jobs ) as pool:
+                futures = [ pool.submit( exportWorker, type( exporter ), filename, tbl, model, clear, chunk, fragments[ tbl ] )
+                            for tbl, model in tables ]
+                results = [ future.result() for future in futures ]
 
-        API.app.logger.info( "Table: {}".format( tbl ) )
-        exporter.writeTable( tbl, API.db.session.query( model ).all(), clear )
+            if exporter.FRAGMENTS:
+                exporter.open( filename )
+                for tbl, model in tables:
+                    exporter.appendFragment( fragments[ tbl ] )
 
-    exporter.close()
+                exporter.close()
+
+        finally:
+            for fragment in fragments.values():
+                if fragment is not None and os.path.isfile( fragment ):
+                    os.remove( fragment )
+
+    printThroughput( results )
     return
 
 
+def importTable( importer, tbl, model, clear ):
+    API.app.logger.info( "Table: {}".format( tbl ) )
+    start = time.monotonic()
+    count = importer.loadTable( tbl, model, clear )
+    return tbl, count, time.monotonic() - start
+
+
+def importWorker( importerClass, filename, tbl, model, clear, batch ):
+    """Import one table in a worker thread, with its own application context and
+       therefore its own session and connection.
+    """
+    with API.app.app_context():
+        importer = importerClass( filename, batch )
+        importer.open( filename )
+        try:
+            return importTable( importer, tbl, model, clear )
+
+        finally:
+            importer.close()
+            API.db.session.remove()
+
+
 INPORT_HELP = """Import the database from a {} file.
 
-    dba inport [ --fmt <type> ] [ --table <table-name> ] <filename>
+    dba inport [ --fmt <type> ] [ --table <table-name> ] [ --batch <records> ] [ --jobs <n> ] <filename>
 
 
 <filename>: The filename with or without the extension to be used to write the database information to.
+
+The records are inserted in batches of <records> records, every batch is committed and
+saved in a checkpoint file <filename>.<table>.checkpoint. When the import is interrupted
+the next run continues after the checkpoint. With DBA_LOAD_DATA the CSV files are loaded
+by MySQL with LOAD DATA LOCAL INFILE.
+
+With --jobs the tables are imported by <n> threads. The tables are imported in the order of
+their foreign keys, the tables of the same level at the same time. Only the CSV and NPZ
+files are imported in parallel, the other formats are parsed or indexed as one file.
 """.format( dbInporters.keysToString() )
 
 
@@ -177,25 +325,40 @@ INPORT_HELP = """Import the database from a {} file.
 @click.option( '--clear/--noclear',
                default = False,
                help = "Clears the table before inserting (Only for {})".format( dbInporters.hasClear2String() ) )
+@click.option( '--jobs',
+               default = 1,
+               type = int,
+               help = "The number of tables imported at the same time (default: 1)." )
+@click.option( '--batch',
+               default = 1000,
+               type = int,
+               help = "The number of records inserted and committed at once (default: 1000)." )
 @click.argument( 'filename' )
-def inport( fmt, filename, table, clear ):
+def inport( fmt, filename, table, clear, jobs, batch ):
     fmt = fmt.lower()
-    importer = dbInporters[ fmt ]( filename )
-    importer.open( filename )
-    for tbl in listTables():
-        if table is not None and table != tbl:
-            API.app.logger.warning( "Incorrect table, looking for {}".format( table ) )
-            continue
+    importerClass = dbInporters[ fmt ]
+    levels = tableLevels( modelTables( table ) )
+    if jobs > 1 and not importerClass.PARALLEL:
+        API.app.logger.warning( "The {} format cannot be imported in parallel".format( fmt.upper() ) )
+        jobs = 1
 
-        model = API.db.get_model_by_tablename( tbl )
-        if model is None:
-            API.app.logger.warning( "Cannot detect MODEL of table {}".format( tbl ) )
-            continue
+    results = []
+    if jobs <= 1:
+        importer = importerClass( filename, batch )
+        importer.open( filename )
+        for level in levels:
+            results.extend( importTable( importer, tbl, model, clear ) for tbl, model in level )
+
+        importer.close()
 
-        API.app.logger.info( "Table: {}".format( tbl ) )
-        importer.loadTable( table, model, clear )
+    else:
+        with ThreadPoolExecutor( max_workers = jobs ) as pool:
+            for level in levels:
+                futures = [ pool.submit( importWorker, importerClass, filename, tbl, model, clear, batch )
+                            for tbl, model in level ]
+                results.extend( future.result() for future in futures )
 
-    importer.close()
+    printThroughput( results )
     return
 
 
@@ -541,3 +704,46 @@ def copy( schema, clear, force, ignore_errors ):
 
         print("Total skipped: {:40}: {}".format("total", len(skipped)))
     return
+
+
+TRACKING_ARCHIVE_HELP = """Move the tracking records older than the hot window to the archive.
+
+    dba tracking-archive [ --days <n> ] [ --mode table|file ] [ --chunk <n> ] [ --purge/--nopurge ]
+
+The defaults are taken from TRACKING_HOT_DAYS, TRACKING_ARCHIVE_MODE, TRACKING_ARCHIVE_CHUNK
+and TRACKING_RETENTION_MONTHS in the configuration.
+"""
+
+
+@dba.command( 'tracking-archive',
+              short_help = 'Move old tracking records to the archive.',
+              help = TRACKING_ARCHIVE_HELP )
+@click.option( '--days',
+               type = int,
+               default = None,
+               help = "The number of days that stay in the tracking table." )
+@click.option( '--mode',
+               default = None,
+               help = "Archive to monthly tables or to compressed NDJSON files.",
+               type = click.Choice( [ 'table', 'file' ], case_sensitive = False ) )
+@click.option( '--chunk',
+               type = int,
+               default = None,
+               help = "The number of records moved per transaction." )
+@click.option( '--purge/--nopurge',
+               default = True,
+               help = "Remove the archives older than the retention." )
+@with_appcontext
+def trackingArchive( days, mode, chunk, purge ):
+    from webapp2.common.tracking.archive import trackingArchive as archive
+    cutoff = archive.cutoff( days )
+    mode = ( mode or archive.mode ).lower()
+    print( "Archive tracking records before {} to {}".format( cutoff.strftime( '%Y-%m-%d %H:%M:%S' ), mode ) )
+    moved = archive.archive( cutoff, mode, chunk,
+                             progress = lambda count: print( "{:>12} records moved".format( count ), end = '\r' ) )
+    print( "Total records moved: {}".format( moved ) )
+    if purge:
+        for month in archive.purge( mode = mode ):
+            print( "Archive {} removed".format( month ) )
+
+    return
@@ -2,10 +2,12 @@ from webapp2.commands.exporter.csv import CsvDbExporter
 from webapp2.commands.exporter.sql import SqlDbExporter
 from webapp2.commands.exporter.yaml import YamlDbExporter
 from webapp2.commands.exporter.json import JsonDbExporter
+from webapp2.commands.exporter.npz import NpzDbExporter
 from webapp2.commands.exporter.base import DbExporters
 
 
 dbExporters = DbExporters( { 'csv': CsvDbExporter,
                              'sql': SqlDbExporter,
                              'yaml': YamlDbExporter,
-                             'json': JsonDbExporter } )
+                             'json': JsonDbExporter,
+                             'npz': NpzDbExporter } )
@@ -1,16 +1,28 @@
+import gzip
+import shutil
+import webapp2.api as API
 from webapp2.common.util import InvalidModel, DbExporterInporters
 
 class DbExporter( object ):
-    CLEAR = False
+    CLEAR           = False
+    CHUNK           = 1000
+    BUILD_MEMBER    = 'toDict()'
+    # the tables are exported to fragment files by 'dba export --jobs', then merged
+    FRAGMENTS       = True
 
-    def __init__( self, filename = None ):
+    def __init__( self, filename = None, chunk = None ):
         self._filename = filename
         self._stream   = None
+        self._chunk    = chunk or self.CHUNK
         return
 
     def open( self, filename ):
         if self._stream is None:
-            self._stream = open( filename, 'w' )
+            if filename.endswith( '.gz' ):
+                self._stream = gzip.open( filename, 'wt', encoding = 'utf-8' )
+
+            else:
+                self._stream = open( filename, 'w' )
 
         return
 
@@ -21,7 +33,57 @@ class DbExporter( object ):
         self._stream = None
         return
 
-    def writeTable( self, table, records, clear ):
+    def openFragment( self, filename ):
+        """Open the fragment file of one table, without the header of the format.
+        """
+        self._stream = open( filename, 'w' )
+        return
+
+    def closeFragment( self ):
+        DbExporter.close( self )
+        return
+
+    def appendFragment( self, filename ):
+        with open( filename, 'r' ) as stream:
+            shutil.copyfileobj( stream, self._stream )
+
+        return
+
+    def writeTable( self, table, records, clear = False ):
+        """Write the records of the table in chunks, the records may be a query with
+           yield_per() so only one chunk of records is in memory.
+
+           :return:     number of records written.
+        """
+        count = 0
+        chunk = []
+        self.beginTable( table, clear )
+        try:
+            for record in records:
+                chunk.append( self.buildRecord( table, record ) )
+                if len( chunk ) >= self._chunk:
+                    self.writeRecords( table, chunk )
+                    count += len( chunk )
+                    chunk = []
+
+            if len( chunk ) > 0:
+                self.writeRecords( table, chunk )
+                count += len( chunk )
+
+        except InvalidModel:
+            API.app.logger.warning( "No {} member in '{}' model class".format( self.BUILD_MEMBER, table ) )
+
+        self.endTable( table, count )
+        API.app.logger.info( "No of records: {}".format( count ) )
+        return count
+
+    def beginTable( self, table, clear ):
+        return
+
+    def writeRecords( self, table, records ):
+        return
+
+    def endTable( self, table, count ):
         return
 
     def buildRecord( self, table, record ):
@@ -4,38 +4,46 @@ import webapp2.api as API
 from webapp2.commands.exporter.base import *
 
 
+def fieldList( records ):
+    """The fields of the model of a query, None for a list of records.
+    """
+    descriptions = getattr( records, 'column_descriptions', None ) or [ {} ]
+    return getattr( descriptions[ 0 ].get( 'entity' ), '__field_list__', None )
+
+
 class CsvDbExporter( DbExporter ):
+    # a file per table
+    FRAGMENTS = False
+
     def open( self, filename ):
         return
 
-    def writeTable( self, table, records ):
+    def writeTable( self, table, records, clear = False ):
+        # the header of an empty table is taken from the model
+        self._fields = fieldList( records )
+        return DbExporter.writeTable( self, table, records, clear )
+
+    def beginTable( self, table, clear ):
         basefilename, ext = os.path.splitext( self._filename )
         filename = '{}-{}{}'.format( basefilename, table, ext )
-        with open( filename, 'w', newline='' ) as stream:
-            if len( records ) > 0:
-                csvwriter = csv.writer( stream, delimiter = ';',quotechar = '"' )
-                try:
-                    csvwriter.writerow( self.buildRecord( table, records[ 0 ] ).keys() )
-
-                    for record in records:
-                        try:
-                            csvwriter.writerow( self.buildRecord( table, record ).values() )
-
-                        except InvalidModel:
-                            API.app.logger.warning( "No toSql() member in '{}' model class".format( table ) )
-
-                        except:
-                            raise
-
-                except InvalidModel:
-                    API.app.logger.warning( "No toSql() member in '{}' model class".format( table ) )
+        self._stream = open( filename, 'w', newline='' )
+        self._writer = csv.writer( self._stream, delimiter = ';',quotechar = '"' )
+        self._header = False
+        return
 
-                except:
-                    raise
+    def writeRecords( self, table, records ):
+        if not self._header:
+            self._writer.writerow( records[ 0 ].keys() )
+            self._header = True
 
-                API.app.logger.info( "No of records: {}".format( len( records ) ) )
+        self._writer.writerows( record.values() for record in records )
+        return
 
-            else:
-                API.app.logger.warning( "Nothing to export" )
+    def endTable( self, table, count ):
+        if count == 0:
+            API.app.logger.warning( "Nothing to export" )
+            if not self._header and self._fields is not None:
+                self._writer.writerow( self._fields )
 
+        DbExporter.close( self )
         return
@@ -1,13 +1,53 @@
 import json
 from webapp2.common.jsonenc import JsonEncoder
-import webapp2.api as API
 from webapp2.commands.exporter.base import DbExporter
-from webapp2.commands.exporter.yaml import YamlDbExporter
 
 
-class JsonDbExporter( YamlDbExporter ):
+class JsonDbExporter( DbExporter ):
+    """Writes { "<table>": { "records": [ ... ] } } as a stream, one record per line.
+    """
+    def __init__( self, filename = None, chunk = None ):
+        DbExporter.__init__( self, filename, chunk )
+        self._tables = 0
+        return
+
+    def open( self, filename ):
+        if self._stream is None:
+            DbExporter.open( self, filename )
+            self._stream.write( "{" )
+
+        return
+
     def close( self ):
-        API.app.logger.info( "Writing the output file" )
-        json.dump( self._blob, self._stream, indent = 4, cls = JsonEncoder )
+        if self._stream is not None:
+            self._stream.write( "\n}\n" )
+
         DbExporter.close( self )
         return
+
+    def appendFragment( self, filename ):
+        if self._tables > 0:
+            self._stream.write( "," )
+
+        DbExporter.appendFragment( self, filename )
+        self._tables += 1
+        return
+
+    def beginTable( self, table, clear ):
+        self._stream.write( '{}\n    {}: {{ "records": ['.format( ',' if self._tables > 0 else '',
+                                                                   json.dumps( table ) ) )
+        self._tables += 1
+        self._first = True
+        return
+
+    def writeRecords( self, table, records ):
+        for record in records:
+            self._stream.write( '{}\n        {}'.format( '' if self._first else ',',
+                                                         json.dumps( record, cls = JsonEncoder ) ) )
+            self._first = False
+
+        return
+
+    def endTable( self, table, count ):
+        self._stream.write( "\n    ] }" )
+        return
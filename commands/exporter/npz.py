@@ -0,0 +1,148 @@
+import json
+import zipfile
+import numpy
+import sqlalchemy.sql.sqltypes as SQLTYPES
+from webapp2.common.jsonenc import JsonEncoder
+from webapp2.commands.exporter.base import *
+
+
+# Column type to the kind of the column array, checked in this order
+COLUMN_KINDS = ( ( SQLTYPES.Boolean,    'bool' ),
+                 ( SQLTYPES.Integer,    'int' ),
+                 ( SQLTYPES.Float,      'float' ),
+                 ( SQLTYPES.Numeric,    'decimal' ),
+                 ( SQLTYPES.DateTime,   'datetime' ),
+                 ( SQLTYPES.Date,       'date' ),
+                 ( SQLTYPES.Time,       'time' ),
+                 ( ( SQLTYPES.LargeBinary, SQLTYPES.BINARY, SQLTYPES.VARBINARY ), 'binary' ),
+                 ( SQLTYPES.JSON,       'json' ) )
+
+
+def columnKind( column ):
+    for column_type, kind in COLUMN_KINDS:
+        if isinstance( column.type, column_type ):
+            return kind
+
+    return 'text'
+
+
+def encodeBytes( chunks, mask ):
+    """The chunks stored as one uint8 array, value n is data[ offsets[ n ] : offsets[ n + 1 ] ].
+    """
+    offsets = numpy.zeros( len( chunks ) + 1, dtype = numpy.int64 )
+    offsets[ 1: ] = numpy.cumsum( [ len( chunk ) for chunk in chunks ] )
+    return { 'data': numpy.frombuffer( b''.join( chunks ), dtype = numpy.uint8 ), 'offsets': offsets, 'mask': mask }
+
+
+def encodeColumn( kind, values ):
+    """The arrays of a column; 'data', 'mask' for the NULL values and 'offsets' for
+       the binary and text values, which are stored as one uint8 array. A fixed width
+       string array would size every value of the chunk to the longest value.
+    """
+    mask = numpy.array( [ value is None for value in values ], dtype = bool )
+    if kind == 'int':
+        data = numpy.array( [ 0 if value is None else value for value in values ], dtype = numpy.int64 )
+
+    elif kind == 'float':
+        data = numpy.array( [ numpy.nan if value is None else value for value in values ], dtype = numpy.float64 )
+
+    elif kind == 'bool':
+        data = numpy.array( [ bool( value ) for value in values ], dtype = bool )
+
+    elif kind == 'datetime':
+        data = numpy.array( [ numpy.datetime64( 'NaT' ) if value is None else numpy.datetime64( value.replace( tzinfo = None ), 'us' )
+                              for value in values ], dtype = 'datetime64[us]' )
+
+    elif kind == 'date':
+        data = numpy.array( [ numpy.datetime64( 'NaT' ) if value is None else numpy.datetime64( value, 'D' )
+                              for value in values ], dtype = 'datetime64[D]' )
+
+    elif kind == 'binary':
+        return encodeBytes( [ b'' if value is None else bytes( value ) for value in values ], mask )
+
+    elif kind == 'json':
+        return encodeBytes( [ b'' if value is None else json.dumps( value, cls = JsonEncoder ).encode( 'utf-8' )
+                              for value in values ], mask )
+
+    else:
+        # text, decimal and time as UTF-8 text, the decimals keep their precision
+        return encodeBytes( [ b'' if value is None else str( value ).encode( 'utf-8' ) for value in values ], mask )
+
+    return { 'data': data, 'mask': mask }
+
+
+class NpzDbExporter( DbExporter ):
+    """Writes the tables as typed column arrays in a NumPy .npz (zip) file. Each chunk
+    of records is a row group, each column of a row group is a compressed member;
+
+        <table>/meta.json                   columns, kinds, row groups and records
+        <table>/<group>/<column>.npy        the values
+        <table>/<group>/<column>.mask.npy   the NULL values, when there are any
+
+    The arrays can be read column by column with numpy.load() without parsing text.
+    """
+    def open( self, filename ):
+        if self._stream is None:
+            self._stream = zipfile.ZipFile( filename, 'w', compression = zipfile.ZIP_DEFLATED, allowZip64 = True )
+
+        return
+
+    def openFragment( self, filename ):
+        self._stream = zipfile.ZipFile( filename, 'w', compression = zipfile.ZIP_DEFLATED, allowZip64 = True )
+        return
+
+    def appendFragment( self, filename ):
+        with zipfile.ZipFile( filename, 'r' ) as fragment:
+            for info in fragment.infolist():
+                with fragment.open( info ) as source, self._stream.open( info.filename, 'w', force_zip64 = True ) as target:
+                    while True:
+                        block = source.read( 1 << 20 )
+                        if not block:
+                            break
+
+                        target.write( block )
+
+        return
+
+    def beginTable( self, table, clear ):
+        self._columns = None
+        self._group = 0
+        return
+
+    def buildRecord( self, table, record ):
+        if not hasattr( record, '__field_list__' ):
+            raise InvalidModel( table )
+
+        if self._columns is None:
+            # the kinds are chosen once per table
+            self._columns = [ ( field, columnKind( record.__mapper__.get_property( field ).columns[ 0 ] ) )
+                              for field in record.__field_list__ ]
+
+        return [ getattr( record, field ) for field, kind in self._columns ]
+
+    def writeArray( self, name, array ):
+        with self._stream.open( name, 'w', force_zip64 = True ) as stream:
+            numpy.lib.format.write_array( stream, array, allow_pickle = False )
+
+        return
+
+    def writeRecords( self, table, records ):
+        for index, ( field, kind ) in enumerate( self._columns ):
+            arrays = encodeColumn( kind, [ record[ index ] for record in records ] )
+            prefix = '{}/{:06}/{}'.format( table, self._group, field )
+            self.writeArray( prefix + '.npy', arrays[ 'data' ] )
+            if 'offsets' in arrays:
+                self.writeArray( prefix + '.offsets.npy', arrays[ 'offsets' ] )
+
+            if arrays[ 'mask' ].any():
+                self.writeArray( prefix + '.mask.npy', arrays[ 'mask' ] )
+
+        self._group += 1
+        return
+
+    def endTable( self, table, count ):
+        self._stream.writestr( '{}/meta.json'.format( table ),
+                               json.dumps( { 'columns':    [ { 'name': field, 'kind': kind } for field, kind in self._columns or [] ],
+                                             'groups':     self._group,
+                                             'records':    count } ) )
+        return
@@ -1,32 +1,67 @@
 import webapp2.api as API
+from webapp2.common.sqlliteral import InsertWriter, quoteName
 from webapp2.commands.exporter.base import *
 
 
 class SqlDbExporter( DbExporter ):
-    CLEAR = True
+    """Writes a SQL dump with extended INSERT statements of DBA_SQL_ROWS rows (default
+    100), the literals are rendered per column type for the dialect of the database.
+    Each table is a section '-- TABLE <table>' in its own transaction, SqlDbInporter
+    loads the tables by their section. A filename ending with .gz is compressed.
+    """
+    CLEAR           = True
+    BUILD_MEMBER    = '__field_list__'
+
+    def __init__( self, filename = None, chunk = None ):
+        DbExporter.__init__( self, filename, chunk )
+        self._rows      = int( API.app.config.get( 'DBA_SQL_ROWS', 100 ) )
+        self._dialect   = API.db.engine.dialect
+        self._writer    = None
+        self._fields    = None
+        return
+
+    def open( self, filename ):
+        if self._stream is None:
+            DbExporter.open( self, filename )
+            if self._dialect.name == 'mysql':
+                self._stream.write( "SET FOREIGN_KEY_CHECKS=0;\n" )
+
+        return
+
+    def close( self ):
+        if self._stream is not None and self._dialect.name == 'mysql':
+            self._stream.write( "-- END\nSET FOREIGN_KEY_CHECKS=1;\n" )
+
+        DbExporter.close( self )
+        return
 
     def buildRecord( self, table, record ):
-        if not hasattr( record,'toSql' ):
+        if not hasattr( record, '__field_list__' ):
             raise InvalidModel( table )
 
-        return record.toSql()
+        if self._writer is None:
+            # the literal processors are chosen once per table
+            self._fields = record.__field_list__
+            self._writer = InsertWriter( table,
+                                         [ record.__mapper__.get_property( field ).columns[ 0 ] for field in self._fields ],
+                                         self._dialect )
 
-    def writeTable( self, table, records, clear ):
-        self._stream.write( "-- TABLE {}\n".format( table ) )
-        if clear:
-            self._stream.write( "DELETE FROM {};\n".format( table ) )
+        return [ getattr( record, field ) for field in self._fields ]
 
-        for record in records:
-            try:
-                self._stream.write( "{}\n".format( self.buildRecord( table, record ) ) )
+    def beginTable( self, table, clear ):
+        self._writer = None
+        self._stream.write( "-- TABLE {}\nBEGIN;\n".format( table ) )
+        if clear:
+            self._stream.write( "DELETE FROM {};\n".format( quoteName( table, self._dialect ) ) )
 
-            except InvalidModel:
-                API.app.logger.warning( "No toSql() member in '{}' model class".format( table ) )
+        return
 
-            except:
-                raise
+    def writeRecords( self, table, records ):
+        for index in range( 0, len( records ), self._rows ):
+            self._stream.write( self._writer.statement( records[ index : index + self._rows ] ) )
 
-        API.app.logger.info( "No of records: {}".format( len( records ) ) )
         return
 
-
+    def endTable( self, table, count ):
+        self._stream.write( "COMMIT;\n" )
+        return
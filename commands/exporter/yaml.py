@@ -1,32 +1,34 @@
 import yaml
-import webapp2.api as API
+import decimal
+import datetime
 from webapp2.commands.exporter.base import *
 
 
-class YamlDbExporter( DbExporter ):
-    def __init__( self, filename = None ):
-        DbExporter.__init__( self, filename )
-        self._blob = []
-        return
+class YamlDumper( yaml.SafeDumper ):
+    """Safe dumper, the Decimal and time values are written as text so the file
+    is loaded by yaml.safe_load(); the inporter converts the text per column.
+    """
 
-    def close( self ):
-        API.app.logger.info( "Writing the output file" )
-        yaml.dump( self._blob, self._stream, default_style = False, default_flow_style = False )
-        DbExporter.close( self )
-        return
 
-    def writeTable( self, table, records ):
-        for rec in records:
-            try:
-                self._blob.append( { 'table':   table,
-                                     'records': [ self.buildRecord( table, rec ) ] } )
+YamlDumper.add_representer( decimal.Decimal, lambda dumper, value: dumper.represent_str( str( value ) ) )
+YamlDumper.add_representer( datetime.time, lambda dumper, value: dumper.represent_str( value.isoformat() ) )
 
-            except InvalidModel:
-                API.app.logger.warning( "No toSql() member in '{}' model class".format( table ) )
 
-            except:
-                raise
+class YamlDbExporter( DbExporter ):
+    """Writes { <table>: { records: [ ... ] } }, each chunk of records is dumped and
+    indented below its table, so the file is written while the table is read.
+    """
+    def beginTable( self, table, clear ):
+        self._stream.write( "{}:\n  records:\n".format( table ) )
+        return
 
-        API.app.logger.info( "No of records: {}".format( len( records ) ) )
+    def writeRecords( self, table, records ):
+        text = yaml.dump( records, Dumper = YamlDumper, default_style = False, default_flow_style = False )
+        self._stream.write( ''.join( '    ' + line for line in text.splitlines( True ) ) )
         return
 
+    def endTable( self, table, count ):
+        if count == 0:
+            self._stream.write( "    []\n" )
+
+        return
@@ -3,11 +3,13 @@ from webapp2.commands.inporter.csv import CsvDbInporter
 from webapp2.commands.inporter.sql import SqlDbInporter
 from webapp2.commands.inporter.yaml import YamlDbInporter
 from webapp2.commands.inporter.json import JsonDbInporter
+from webapp2.commands.inporter.npz import NpzDbInporter
 
 
 dbInporters = DbInporters( { 'csv': CsvDbInporter,
                              'sql': SqlDbInporter,
                              'yaml': YamlDbInporter,
-                             'json': JsonDbInporter } )
+                             'json': JsonDbInporter,
+                             'npz': NpzDbInporter } )
 
 
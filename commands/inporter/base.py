@@ -1,13 +1,95 @@
 import os
+import gzip
+import traceback
+import datetime
+import decimal
+import dateutil.parser
+import sqlalchemy.sql.sqltypes as SQLTYPES
 import webapp2.api as API
-from webapp2.common.util import InvalidModel, DbExporterInporters
+from webapp2.common.util import DbExporterInporters
+
+
+def toDateTime( value ):
+    if len( value ) == 19:
+        # the format of the exporters, without the generic parser
+        return datetime.datetime.strptime( value.replace( 'T', ' ' ), '%Y-%m-%d %H:%M:%S' )
+
+    return dateutil.parser.parse( value )
+
+
+def toDate( value ):
+    return datetime.datetime.strptime( value[ : 10 ], '%Y-%m-%d' ).date()
+
+
+def toTime( value ):
+    return dateutil.parser.parse( value ).time()
+
+
+def toBoolean( value ):
+    return value.lower() in ( '1', 'true', 'yes', 'y' )
+
+
+def toBinary( value ):
+    return value.encode( 'utf-8' )
+
+
+# Column type to the conversion of a text value, checked in this order
+TYPE_CONVERTERS = ( ( SQLTYPES.DateTime,    toDateTime ),
+                    ( SQLTYPES.Date,        toDate ),
+                    ( SQLTYPES.Time,        toTime ),
+                    ( SQLTYPES.Boolean,     toBoolean ),
+                    ( SQLTYPES.Integer,     int ),
+                    ( SQLTYPES.Float,       float ),
+                    ( SQLTYPES.Numeric,     decimal.Decimal ),
+                    ( SQLTYPES.LargeBinary, toBinary ) )
+
+
+def columnConverter( column ):
+    """The converter of a column, chosen once per column. Only text values are
+       converted, the values of YAML and JSON may already have the right type.
+       An empty text is NULL for the non text columns.
+    """
+    for column_type, convert in TYPE_CONVERTERS:
+        if isinstance( column.type, column_type ):
+            def converter( value ):
+                if isinstance( value, str ):
+                    return convert( value ) if value != '' else None
+
+                return value
+
+            return converter
+
+    return lambda value: value
+
+
+def resetForeignKeyChecks( connection, execute = None ):
+    """Enable the foreign key checks (MySQL) again, also after a failed load. The
+       connection returns to the pool, when the reset fails it is invalidated so the
+       pool doesn't hand out a connection without foreign key checks.
+
+       :param execute:  the execute of the DBAPI cursor, default connection.execute.
+    """
+    try:
+        ( execute or connection.execute )( "SET FOREIGN_KEY_CHECKS=1" )
+
+    except Exception:
+        API.app.logger.error( traceback.format_exc() )
+        connection.invalidate()
+
+    return
+
 
 class DbInporter( object ):
-    CLEAR = True
+    CLEAR       = True
+    # the tables can be imported by 'dba inport --jobs', each by its own inporter
+    PARALLEL    = True
+    BATCH       = 1000
+    MODE        = 'r'
 
-    def __init__( self, filename = None ):
+    def __init__( self, filename = None, batch = None ):
         self._filename = filename
         self._stream = None
+        self._batch = batch or self.BATCH
         return
 
     def open( self, filename ):
@@ -18,7 +100,12 @@ class DbInporter( object ):
             API.app.logger.error( "Filename {} doesn't exists".format( filename ) )
             raise FileNotFoundError( filename )
 
-        self._stream = open( filename, 'r' )
+        if filename.endswith( '.gz' ):
+            self._stream = gzip.open( filename, self.MODE if 'b' in self.MODE else 'rt' )
+
+        else:
+            self._stream = open( filename, self.MODE )
+
         return
 
     def close( self ):
@@ -29,9 +116,106 @@ class DbInporter( object ):
         return
 
     def loadTable( self, table, model, clear ):
+        """Load the records of the table.
+
+           :return:     number of records loaded, None when not known.
+        """
+        return None
+
+    @staticmethod
+    def modelColumns( model, fields ):
+        """The columns of the fields, the field is the attribute name of the model
+           (the exporters use toDict()) or the column name.
+        """
+        attributes = { prop.key: prop.columns[ 0 ] for prop in model.__mapper__.column_attrs }
+        columns = []
+        for field in fields:
+            column = attributes.get( field )
+            if column is None:
+                column = attributes.get( field.upper() )
+
+            if column is None:
+                column = model.__table__.c[ field ]
+
+            columns.append( column )
+
+        return columns
+
+    def checkpointFile( self, table ):
+        return '{}.{}.checkpoint'.format( self._filename, table )
+
+    def checkpoint( self, table ):
+        """The number of records of the table that were loaded by an interrupted run.
+        """
+        filename = self.checkpointFile( table )
+        if not os.path.isfile( filename ):
+            return 0
+
+        with open( filename, 'r' ) as stream:
+            return int( stream.read().strip() or 0 )
+
+    def saveCheckpoint( self, table, count ):
+        with open( self.checkpointFile( table ), 'w' ) as stream:
+            stream.write( str( count ) )
+
         return
 
+    def bulkLoad( self, table, model, fields, rows, clear ):
+        """Insert the rows (sequences of values in the order of the fields) with one
+           executemany per batch, each batch is committed and saved in the checkpoint
+           file. A load that was interrupted continues after the checkpoint.
+
+           :return:     number of records inserted.
+        """
+        columns = self.modelColumns( model, fields )
+        converters = [ columnConverter( column ) for column in columns ]
+        keys = [ column.key for column in columns ]
+        statement = model.__table__.insert()
+        skip = self.checkpoint( table )
+        if skip > 0:
+            API.app.logger.warning( "Table {} continues after record {}".format( table, skip ) )
+
+        count = 0
+        with API.db.engine.connect() as connection:
+            mysql = connection.dialect.name == 'mysql'
+            if mysql:
+                # the tables of a level may refer to each other
+                connection.execute( "SET FOREIGN_KEY_CHECKS=0" )
+
+            try:
+                if clear and skip == 0:
+                    with connection.begin():
+                        connection.execute( model.__table__.delete() )
+
+                batch = []
+                for index, row in enumerate( rows ):
+                    if index < skip:
+                        continue
+
+                    batch.append( { key: convert( value ) for key, convert, value in zip( keys, converters, row ) } )
+                    if len( batch ) >= self._batch:
+                        with connection.begin():
+                            connection.execute( statement, batch )
+
+                        count += len( batch )
+                        self.saveCheckpoint( table, skip + count )
+                        batch = []
+
+                if len( batch ) > 0:
+                    with connection.begin():
+                        connection.execute( statement, batch )
+
+                    count += len( batch )
+
+            finally:
+                if mysql:
+                    resetForeignKeyChecks( connection )
+
+        if os.path.isfile( self.checkpointFile( table ) ):
+            os.remove( self.checkpointFile( table ) )
+
+        return count
+
 
 class DbInporters( DbExporterInporters ):
     pass
-
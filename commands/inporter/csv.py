@@ -5,26 +5,71 @@ from webapp2.commands.inporter.base import DbInporter
 
 
 class CsvDbInporter( DbInporter ):
-    def loadTable( self, table, model, clear ):
+    def open( self, filename ):
+        # a file per table, opened by loadTable()
+        return
+
+    def tableFile( self, table ):
         fn, ext = os.path.splitext( self._filename )
-        filename = "{}-{}{}".format( fn, table, ext )
-        self.open( filename )
-        csvreader = csv.reader( self._stream, delimiter = ';',quotechar = '"',quoting = csv.QUOTE_MINIMAL )
-        it = iter( csvreader )
-        header = it.__next__()
-        if header is not None:
-            if clear:
-                API.db.session.delete( model )
-                API.db.session.commit()
+        return "{}-{}{}".format( fn, table, ext )
 
-            for row in it:
-                obj = model()
-                for field,value in zip( header,row ):
-                    setattr( obj,field,value )
+    def loadTable( self, table, model, clear ):
+        filename = self.tableFile( table )
+        if API.app.config.get( 'DBA_LOAD_DATA', False ) and API.db.engine.dialect.name == 'mysql':
+            return self.loadData( filename, table, model, clear )
 
-                API.db.session.add( obj )
+        DbInporter.open( self, filename )
+        try:
+            csvreader = csv.reader( self._stream, delimiter = ';',quotechar = '"',quoting = csv.QUOTE_MINIMAL )
+            header = next( csvreader, None )
+            count = 0
+            if header is not None:
+                count = self.bulkLoad( table, model, header, csvreader, clear )
 
-            API.db.session.commit()
+        finally:
+            self.close()
 
-        self.close()
-        return
+        return count
+
+    @staticmethod
+    def isText( column ):
+        try:
+            return column.type.python_type is str
+
+        except NotImplementedError:
+            return True
+
+    def loadData( self, filename, table, model, clear ):
+        """Let the MySQL server load the file with LOAD DATA LOCAL INFILE, the client
+           and the server need local_infile enabled.
+        """
+        with open( filename, 'r', newline = '' ) as stream:
+            header = next( csv.reader( stream, delimiter = ';', quotechar = '"' ), None )
+
+        if header is None:
+            return 0
+
+        # the empty text of the non text columns is NULL, as with the bulk load
+        targets = []
+        assignments = []
+        for index, column in enumerate( self.modelColumns( model, header ) ):
+            if self.isText( column ):
+                targets.append( column.name )
+
+            else:
+                targets.append( '@v{}'.format( index ) )
+                assignments.append( "{} = NULLIF( @v{}, '' )".format( column.name, index ) )
+
+        statement = "LOAD DATA LOCAL INFILE '{}' INTO TABLE {} " \
+                    "FIELDS TERMINATED BY ';' OPTIONALLY ENCLOSED BY '\"' " \
+                    "LINES TERMINATED BY '\\r\\n' IGNORE 1 LINES ( {} )".format( os.path.abspath( filename ).replace( '\\', '/' ),
+                                                                                 table,
+                                                                                 ", ".join( targets ) )
+        if len( assignments ) > 0:
+            statement += " SET {}".format( ", ".join( assignments ) )
+
+        with API.db.engine.begin() as connection:
+            if clear:
+                connection.execute( model.__table__.delete() )
+
+            return connection.execute( statement ).rowcount
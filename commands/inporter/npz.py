@@ -0,0 +1,84 @@
+import json
+import zipfile
+import numpy
+import webapp2.api as API
+from webapp2.commands.inporter.base import DbInporter
+
+
+def decodeColumn( kind, data, mask = None, offsets = None ):
+    """The values of a column array, see NpzDbExporter.
+    """
+    if offsets is not None:
+        # the binary, text and JSON values are one uint8 array
+        raw = data.tobytes()
+        offsets = offsets.tolist()
+        values = [ raw[ offsets[ index ] : offsets[ index + 1 ] ] for index in range( len( offsets ) - 1 ) ]
+        if kind != 'binary':
+            values = [ value.decode( 'utf-8' ) for value in values ]
+
+        if kind == 'json':
+            values = [ json.loads( value ) if value != '' else None for value in values ]
+
+    elif kind == 'json':
+        # the string arrays of the files written before the text columns had offsets
+        values = [ json.loads( value ) if value != '' else None for value in data.tolist() ]
+
+    else:
+        # the datetime64 arrays give datetime and date objects, NaT gives None
+        values = data.tolist()
+
+    if mask is not None:
+        values = [ None if null else value for value, null in zip( values, mask.tolist() ) ]
+
+    return values
+
+
+class NpzDbInporter( DbInporter ):
+    """Loads the tables from the column arrays of a NpzDbExporter file, a row group
+    at the time through the bulk load.
+    """
+    def open( self, filename ):
+        if self._stream is None:
+            DbInporter.open( self, filename )
+            self.close()
+            self._stream = zipfile.ZipFile( filename, 'r' )
+            self._names = set( self._stream.namelist() )
+
+        return
+
+    def readArray( self, name ):
+        if name not in self._names:
+            return None
+
+        with self._stream.open( name ) as stream:
+            return numpy.lib.format.read_array( stream, allow_pickle = False )
+
+    def rows( self, table, columns, groups ):
+        for group in range( groups ):
+            values = []
+            for column in columns:
+                prefix = '{}/{:06}/{}'.format( table, group, column[ 'name' ] )
+                values.append( decodeColumn( column[ 'kind' ],
+                                             self.readArray( prefix + '.npy' ),
+                                             self.readArray( prefix + '.mask.npy' ),
+                                             self.readArray( prefix + '.offsets.npy' ) ) )
+
+            for row in zip( *values ):
+                yield row
+
+        return
+
+    def loadTable( self, table, model, clear ):
+        name = '{}/meta.json'.format( table )
+        if name not in self._names:
+            API.app.logger.warning( "Table {} not in the file".format( table ) )
+            return 0
+
+        meta = json.loads( self._stream.read( name ).decode( 'utf-8' ) )
+        if len( meta[ 'columns' ] ) == 0:
+            return 0
+
+        return self.bulkLoad( table, model,
+                              [ column[ 'name' ] for column in meta[ 'columns' ] ],
+                              self.rows( table, meta[ 'columns' ], meta[ 'groups' ] ),
+                              clear )
@@ -1,30 +1,109 @@
-from webapp2.commands.inporter.base import DbInporter
+import re
+from webapp2.commands.inporter.base import DbInporter, resetForeignKeyChecks
+from webapp2.common.sqlliteral import backslashEscapes, quoteName
 import webapp2.api as API
 
 
+TABLE_MARKER    = b'-- TABLE '
+END_MARKER      = b'-- END'
+ESCAPED         = re.compile( r"\\." )
+
+
 class SqlDbInporter( DbInporter ):
-    CLEAR = False
+    """Loads the tables from a SQL dump of SqlDbExporter, each table from its section
+    '-- TABLE <table>'. The sections are indexed when the file is opened. The
+    statements are executed with the DBAPI cursor, so the text is not formatted as
+    a statement with parameters.
+    """
+    MODE        = 'rb'
+    # open() indexes the whole file and the seek of a .gz file decompresses it again,
+    # an inporter per table would do that for every table
+    PARALLEL    = False
 
-    def loadTable( self, table, model, clear ):
-        connection = API.db.session.connection()
-        for idx, line in enumerate( self._stream.readlines() ):
-            if line.startswith( '--' ):
-                continue
+    def open( self, filename ):
+        if self._stream is not None:
+            return
+
+        DbInporter.open( self, filename )
+        self._sections = self.index()
+        return
 
-            if idx == 0 and clear:
-                API.db.session.delete( model )
-                API.db.session.commit()
+    def index( self ):
+        sections = {}
+        table = None
+        start = offset = 0
+        while True:
+            offset = self._stream.tell()
+            line = self._stream.readline()
+            if not line:
+                break
 
-            try:
-                line = line.replace( '\n', '' )
-                API.app.logger.info( line )
-                result = connection.execute( line )
-                if result.rowcount != 1:
-                    raise Exception( "row not inserted" )
+            if line.startswith( TABLE_MARKER ) or line.startswith( END_MARKER ):
+                if table is not None:
+                    sections[ table ] = ( start, offset )
+
+                table = line[ len( TABLE_MARKER ): ].strip().decode( 'utf-8' ) if line.startswith( TABLE_MARKER ) else None
+                start = self._stream.tell()
+
+        if table is not None:
+            sections[ table ] = ( start, offset )
+
+        return sections
+
+    def statements( self, start, end, backslash ):
+        """The statements of a section, a statement ends with a ';' at the end of a
+           line outside a text literal.
+        """
+        self._stream.seek( start )
+        lines = []
+        quoted = False
+        while self._stream.tell() < end:
+            line = self._stream.readline().decode( 'utf-8' )
+            if not quoted and ( line.startswith( '--' ) or line.strip() == '' ):
+                continue
 
+            lines.append( line )
+            if ( ESCAPED.sub( '', line ) if backslash else line ).count( "'" ) % 2 == 1:
+                quoted = not quoted
 
-            except Exception as exc:
-                API.app.logger.error( exc )
+            if not quoted and line.rstrip().endswith( ';' ):
+                yield ''.join( lines ).strip().rstrip( ';' )
+                lines = []
 
-        API.db.session.commit()
         return
+
+    def loadTable( self, table, model, clear ):
+        if table not in self._sections:
+            API.app.logger.warning( "Table {} not in the file".format( table ) )
+            return 0
+
+        dialect = API.db.engine.dialect
+        count = 0
+        connection = API.db.engine.raw_connection()
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            if dialect.name == 'mysql':
+                cursor.execute( "SET FOREIGN_KEY_CHECKS=0" )
+
+            if clear:
+                cursor.execute( "DELETE FROM {}".format( quoteName( table, dialect ) ) )
+
+            for statement in self.statements( *self._sections[ table ], backslashEscapes( dialect ) ):
+                cursor.execute( statement )
+                if statement.startswith( 'INSERT' ):
+                    count += cursor.rowcount
+
+            connection.commit()
+
+        except Exception:
+            connection.rollback()
+            raise
+
+        finally:
+            if dialect.name == 'mysql' and cursor is not None:
+                resetForeignKeyChecks( connection, cursor.execute )
+
+            connection.close()
+
+        return count
@@ -126,3 +126,62 @@ def urls(url, order):
         click.echo(str_template.format(*row[:column_length]))
 
     return
+
+
+
+@cli.command( 'route-bench' )
+@click.option( '--url', 'urls', multiple = True,
+               help = 'Url to request, may be repeated (default: the Angular index and sources)' )
+@click.option( '--count', default = 200,
+               help = 'Number of requests per url (default: 200)' )
+@with_appcontext
+def routeBench( urls, count ):
+    """Requests per second of the routes with and without the after request hooks.
+    The requests are done through the Flask test client, without a web server.
+    """
+    import time
+    from webapp2.common.routeclass import routeClasses
+
+    if len( urls ) == 0:
+        angular_path = current_app.config.get( 'ANGULAR_PATH', '' )
+        urls = [ '/' ]
+        if os.path.isdir( angular_path ):
+            urls += [ '/' + name for name in sorted( os.listdir( angular_path ) )
+                      if os.path.splitext( name )[ 1 ] in ( '.js', '.css', '.ico' ) ][ : 20 ]
+
+    hooks = current_app.after_request_funcs.get( None, [] )
+
+    def run():
+        client = current_app.test_client()
+        start = time.perf_counter()
+        for _ in range( count ):
+            for url in urls:
+                client.get( url ).close()
+
+        return ( count * len( urls ) ) / ( time.perf_counter() - start )
+
+    saved = list( hooks )
+    try:
+        del hooks[ : ]
+        bare = run()
+        hooks.extend( saved )
+        hooked = run()
+
+    finally:
+        hooks[ : ] = saved
+
+    for url in urls:
+        adapter = current_app.url_map.bind( 'localhost' )
+        try:
+            endpoint = adapter.match( url )[ 0 ]
+
+        except ( NotFound, MethodNotAllowed ):
+            endpoint = None
+
+        click.echo( '{:50}  {:30}  {}'.format( url, str( endpoint ), routeClasses.get( endpoint ) or
+                    getattr( current_app.view_functions.get( endpoint ), 'route_class', '-' ) ) )
+
+    click.echo( 'Without hooks : {:10.1f} requests/s'.format( bare ) )
+    click.echo( 'With hooks    : {:10.1f} requests/s ({:.1f}% lost to the hooks)'.format( hooked,
+                                                                                       100.0 * ( bare - hooked ) / bare ) )
+    return
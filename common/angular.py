@@ -18,11 +18,12 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 import os
-from flask import Blueprint, send_from_directory, current_app, request, jsonify
+from flask import Blueprint, send_from_directory, current_app, request, jsonify, abort
 from mako.template import Template
-from werkzeug.routing import BaseConverter
 import webapp2.api as API
 from webapp2.extensions.database import db
+from webapp2.common.routeclass import routeClass, STATIC
+from webapp2.common.staticfiles import staticManifest
 
 
 __version__         = '2.0.0'
@@ -59,27 +60,28 @@ def renderErrorPage( message, reason = '', explanation = '' ):
                                           explanation = explanation )
 
 
-class RegexConverter( BaseConverter ):
-    def __init__( self, url_map, *items ):
-        super( RegexConverter, self ).__init__( url_map )
-        self.regex = items[ 0 ]
-
-
 bluePrint   = Blueprint( 'angular', __name__ )
 
 
 def registerAngular():
-    # Set the logger for the oldangular module
-    API.app.url_map.converters[ 'regex' ] = RegexConverter
     API.app.register_blueprint( bluePrint )
+    config = API.app.config
+    staticManifest.build( config[ 'ANGULAR_PATH' ], int( config.get( 'ANGULAR_MEMORY_LIMIT', 262144 ) ) )
+    if config.get( 'ANGULAR_WATCH', False ):
+        staticManifest.watch( float( config.get( 'ANGULAR_WATCH_INTERVAL', 2 ) ) )
+
     return
 
 
 @bluePrint.route( '/' )
+@routeClass( STATIC )
 def index():
+    response = staticManifest.send( "index.html" )
+    if response is not None:
+        return response
+
     angular_path = current_app.config[ 'ANGULAR_PATH' ]
-    env = current_app.config[ 'ENV' ]
-    current_app.logger.info( "Angular dist ({}) : {}".format( env, angular_path ) )
+    current_app.logger.info( "Angular dist ({}) : {}".format( current_app.config[ 'ENV' ], angular_path ) )
     try:
         if os.path.isdir( angular_path ):
             if os.path.isfile( os.path.join( angular_path, "index.html" ) ):
@@ -104,20 +106,20 @@ def index():
         raise
 
 
-@bluePrint.route( r"/<regex('\w\.(js|css|map|ico|jpg|eps|png|woff|woff2|svg|eot|ttf|map)'):path>" )
+@bluePrint.route( "/<path:path>", methods = [ 'GET' ] )
+@routeClass( STATIC )
 def angularSource( path ):
-    angular_path = current_app.config[ 'ANGULAR_PATH' ]
-    env = current_app.config[ 'ENV' ]
-    current_app.logger.info( "Angular dist ({}) : {}".format( env, angular_path ) )
-    return send_from_directory( angular_path, path )
+    # The sources and the assets are looked up in the manifest, the more specific
+    # (api) routes are matched first by the url map. An unknown api route or an api
+    # route without GET is not served from the Angular folder.
+    if path == 'api' or path.startswith( 'api/' ):
+        abort( 404 )
 
+    response = staticManifest.send( path )
+    if response is None:
+        abort( 404 )
 
-@bluePrint.route( r"/assets/<regex('\w\.(ico|jpg|eps|png|woff|woff2|svg|eot|ttf|map)'):path>" )
-def angularAsserts( path ):
-    angular_path = current_app.config[ 'ANGULAR_PATH' ]
-    env = current_app.config[ 'ENV' ]
-    current_app.logger.info( "Angular assets ({}) : {}".format( env, angular_path ) )
-    return send_from_directory( os.path.join( angular_path, 'assets' ), path )
+    return response
 
 
 #
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import time
+import threading
+import json
+import traceback
+import webapp2.api as API
+from webapp2.common.jsonenc import JsonEncoder
+
+
+def filterSignature( *args ):
+    """Canonical string of the filter arguments, pydantic models are converted to dicts.
+    """
+    def convert( value ):
+        if hasattr( value, 'dict' ) and callable( value.dict ):
+            return value.dict()
+
+        if isinstance( value, ( list, tuple ) ):
+            return [ convert( item ) for item in value ]
+
+        return value
+
+    return json.dumps( [ convert( arg ) for arg in args ], sort_keys = True, cls = JsonEncoder )
+
+
+class TableGenerations( object ):
+    """Generation counter per table, kept in the cache backend so all workers share them.
+
+    Cache keys of table dependent entries contain the generations of the tables, a write
+    to a table bumps its generation. The entries of that table are never hit again and
+    expire by their timeout, entries of other tables survive.
+
+    A missing counter (never set or evicted) is initialized from the clock, so a counter
+    never returns to a value that was used before.
+    """
+    PREFIX  = 'webapp2.gen.'
+
+    def __init__( self ):
+        self._local = {}
+        self._lock  = threading.Lock()
+        return
+
+    @staticmethod
+    def _seed():
+        return int( time.time() * 1000 )
+
+    def _localGet( self, table ):
+        with self._lock:
+            return self._local.setdefault( table, self._seed() )
+
+    def _localBump( self, table ):
+        with self._lock:
+            self._local[ table ] = self._local.get( table, self._seed() ) + 1
+
+        return
+
+    def get( self, table ):
+        key = self.PREFIX + table
+        try:
+            value = API.cache.get( key )
+            if value is None:
+                API.cache.add( key, self._seed(), timeout = 0 )
+                value = API.cache.get( key )
+
+        except Exception:
+            value = None
+
+        if value is None:
+            # No usable cache backend (null cache or no application)
+            return self._localGet( table )
+
+        return value
+
+    def bump( self, *tables ):
+        for table in tables:
+            key = self.PREFIX + table
+            try:
+                # inc() of a missing key starts at 1 (simple, filesystem and redis), the key
+                # is seeded from the clock first, add() doesn't change an existing key
+                API.cache.add( key, self._seed(), timeout = 0 )
+                if API.cache.cache.inc( key, 1 ) is None:
+                    API.cache.set( key, self._seed(), timeout = 0 )
+
+            except Exception:
+                API.logger.error( traceback.format_exc() )
+
+            self._localBump( table )
+
+        return
+
+    def key( self, tables ):
+        return ".".join( "{}:{}".format( table, self.get( table ) ) for table in sorted( set( tables ) ) )
+
+
+tableGenerations = TableGenerations()
+
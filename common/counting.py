@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+import hashlib
+import traceback
+from sqlalchemy import text
+import webapp2.api as API
+from webapp2.common.cachegen import tableGenerations
+
+
+class RecordCounter( object ):
+    """Base class of the count strategies used by CrudInterface.pagedList and the
+       paged version of CrudInterface.selectList.
+
+       count() returns a tuple( value, exact ), where exact is False when the value
+       is an estimate or a capped value.
+    """
+    NAME = None
+
+    def __init__( self, interface, tables = None ):
+        self._interface = interface
+        self._tables    = tables or [ interface._model_cls.__tablename__ ]
+        return
+
+    def count( self, query, filtered, signature ):
+        return query.count(), True
+
+
+class ExactCounter( RecordCounter ):
+    NAME = 'exact'
+
+
+class SkippedCounter( RecordCounter ):
+    NAME = 'skipped'
+
+    def count( self, query, filtered, signature ):
+        return None, False
+
+
+class CappedCounter( RecordCounter ):
+    """Count up to the cap + 1 records, when there are more the count is reported as '>cap'
+    """
+    NAME = 'capped'
+
+    def count( self, query, filtered, signature ):
+        cap = self._interface._countCap
+        value = query.limit( cap + 1 ).count()
+        if value > cap:
+            return ">{}".format( cap ), False
+
+        return value, True
+
+
+class EstimatedCounter( RecordCounter ):
+    """Use the table statistics when there is no filter, and the row estimate of the
+       query planner when there is a filter. Falls back to the exact count when the
+       database doesn't provide the estimate.
+    """
+    NAME = 'estimated'
+
+    def count( self, query, filtered, signature ):
+        try:
+            if filtered:
+                value = self.plannerRows( query )
+
+            else:
+                value = self.tableRows( query.session, self._interface._model_cls.__tablename__ )
+
+            if value is not None:
+                return int( value ), False
+
+        except Exception:
+            API.app.logger.error( traceback.format_exc() )
+
+        return query.count(), True
+
+    @staticmethod
+    def tableRows( session, table ):
+        dialect = session.get_bind().dialect.name
+        if dialect == 'mysql':
+            stmt = text( "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                         "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table" )
+
+        elif dialect == 'postgresql':
+            stmt = text( "SELECT reltuples::bigint FROM pg_class WHERE relname = :table" )
+
+        else:
+            return None
+
+        value = session.execute( stmt, { 'table': table } ).scalar()
+        # reltuples is -1 for a table that was never analyzed (PostgreSQL 14+), unknown
+        return value if value is None or value >= 0 else None
+
+    @staticmethod
+    def plannerRows( query ):
+        connection = query.session.connection()
+        dialect = connection.dialect
+        compiled = query.statement.compile( dialect = dialect )
+        if compiled.positional:
+            params = tuple( compiled.params[ name ] for name in compiled.positiontup )
+
+        else:
+            params = compiled.params
+
+        if dialect.name == 'mysql':
+            result = connection.execute( "EXPLAIN {}".format( compiled ), params )
+            keys = list( result.keys() )
+            rows = [ dict( zip( keys, row ) ) for row in result ]
+            if len( rows ) == 0:
+                return None
+
+            # The first row is the driving table, joined tables are looked up per row. 'rows' are
+            # the rows it reads, 'filtered' the percentage of those left by its conditions.
+            driving = rows[ 0 ]
+            return ( driving.get( 'rows' ) or 0 ) * float( driving.get( 'filtered' ) or 100 ) / 100
+
+        elif dialect.name == 'postgresql':
+            result = connection.execute( "EXPLAIN (FORMAT JSON) {}".format( compiled ), params )
+            plan = result.scalar()
+            if isinstance( plan, str ):
+                plan = json.loads( plan )
+
+            return plan[ 0 ][ 'Plan' ][ 'Plan Rows' ]
+
+        return None
+
+
+class CachedCounter( RecordCounter ):
+    """Remember the exact count per filter signature, for _countTtl seconds.
+    """
+    NAME = 'cached'
+
+    def key( self, signature ):
+        table = self._interface._model_cls.__tablename__
+        return "webapp2.count.{}.{}.{}".format( table,
+                                                tableGenerations.key( self._tables ),
+                                                hashlib.sha1( signature.encode( 'utf-8' ) ).hexdigest() )
+
+    def count( self, query, filtered, signature ):
+        key = self.key( signature )
+        try:
+            value = API.cache.get( key )
+            if value is not None:
+                return value, True
+
+        except Exception:
+            API.app.logger.error( traceback.format_exc() )
+            return query.count(), True
+
+        value = query.count()
+        API.cache.set( key, value, timeout = self._interface._countTtl )
+        return value, True
+
+
+countStrategies = { cls.NAME: cls for cls in ( ExactCounter,
+                                               SkippedCounter,
+                                               CappedCounter,
+                                               EstimatedCounter,
+                                               CachedCounter ) }
+
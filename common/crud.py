@@ -1,10 +1,14 @@
+import io
+import csv
 import time
+import zlib
 from typing import Any, List, Optional, Union, ForwardRef
-from flask import request, Response, Request
+from flask import request, Response, Request, stream_with_context
 from pydantic import BaseModel
 import traceback
-from sqlalchemy import and_, not_
+from sqlalchemy import and_, or_
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError
 # from sqlalchemy.exc import IntegrityError
 from flask.globals import LocalProxy
 import posixpath
@@ -14,9 +18,15 @@ from flask_jwt_extended import ( verify_jwt_in_request, get_jwt_identity )
 from webapp2.common.error import BackendError
 from webapp2.common.exceptions import *
 from datetime import date, timedelta, datetime
-from sqlalchemy.orm import Query
+from sqlalchemy.orm import Query, load_only
 # from webapp2.common.util import getNestedAttr
-from webapp2.api import cache
+from webapp2.common import keyset
+from webapp2.common.filterplan import filterCompiler, itemAttr
+from webapp2.common.counting import countStrategies, ExactCounter
+from webapp2.common.cachegen import tableGenerations, filterSignature
+from webapp2.common.respcache import responseCache
+from webapp2.common.jsonenc import dumpsJson, jsonEnvelope
+from webapp2.common.routeclass import routeClasses, READ
 from deprecated import deprecated
 import json
 
@@ -106,6 +116,7 @@ class TableFilter(BaseModel):
 
 TableFilter.update_forward_refs()
 
+
 class RecordLock( object ):
     def __init__( self, table, record_id ):
         self._table = table
@@ -149,7 +160,6 @@ class RecordLock( object ):
 
     @classmethod
     def locked( cls, request, user = None ):
-        from webapp2.common.locking.model import RecordLocks
         obj = cls()
         if user is None:
             user = obj.user
@@ -171,12 +181,13 @@ class RecordLock( object ):
                 raise InvalidRequestExecption( "Unknown {} object to get record information".format( request ) )
 
             API.logger.debug( "Is record lockec {}:{} not for {}".format( obj._table, obj._id, user ) )
-            rec = API.db.session.query( RecordLocks ). \
-                                 filter( and_( RecordLocks.L_TABLE == obj._table,
-                                               RecordLocks.L_RECORD_ID == obj._id,
-                                               RecordLocks.L_USER != user ) ).one()
-            API.logger.warning( "Record is locked by {}".format( rec.L_USER ) )
-            raise RecordLockedException( user = rec.L_USER )
+            locks = cls.lockedRecords( [ obj._id ], user )
+            if len( locks ) == 0:
+                raise NoResultFound
+
+            lock_user = list( locks.values() )[ 0 ]
+            API.logger.warning( "Record is locked by {}".format( lock_user ) )
+            raise RecordLockedException( user = lock_user )
 
         except NoResultFound:
             API.logger.debug( "Record NOT locked" )
@@ -184,9 +195,77 @@ class RecordLock( object ):
 
         return obj
 
+    @staticmethod
+    def leaseTime():
+        """The lifetime of a lock (LOCK_LEASE_TIME in seconds), the client renews the
+           lease with the renew route. 0 disables the expiry.
+        """
+        return timedelta( seconds = int( API.app.config.get( 'LOCK_LEASE_TIME', 300 ) ) )
+
+    @classmethod
+    def leaseExpire( cls ):
+        lease = cls.leaseTime()
+        return datetime.utcnow() + lease if lease.total_seconds() > 0 else None
+
+    @staticmethod
+    def lockKey( record_id ):
+        """The record id as stored in the locking table, L_RECORD_ID is an integer column
+           and the ids from a request may be strings.
+        """
+        try:
+            return int( record_id )
+
+        except ( TypeError, ValueError ):
+            raise InvalidRequestExecption( "Invalid record id {!r} to lock".format( record_id ) )
+
+    @classmethod
+    def lockedRecords( cls, ids, user = None ):
+        """Check the locks of a batch of records with a single query.
+
+        :param ids:     list of record ids.
+        :param user:    the user that checks, his own locks are ignored.
+        :return:        dictionary { record_id: user } of the records locked by other users,
+                        the record_id is the id as passed in ids.
+        """
+        from webapp2.common.locking.model import RecordLocks
+        from webapp2.common.locking.registry import lockRegistry
+        obj = cls()
+        if user is None:
+            user = obj.user
+
+        if len( ids ) == 0:
+            return {}
+
+        keys = {}
+        for id in ids:
+            try:
+                keys[ cls.lockKey( id ) ] = id
+
+            except InvalidRequestExecption:
+                # an id that is not an integer can never be locked
+                pass
+
+        if len( keys ) == 0:
+            return {}
+
+        if lockRegistry.enabled:
+            locks = lockRegistry.lockedRecords( obj._table, list( keys ), user )
+            return { keys[ record_id ]: lock_user for record_id, lock_user in locks.items() }
+
+        API.logger.debug( "Are records locked {}:{} not for {}".format( obj._table, ids, user ) )
+        # Expired leases are ignored, also before the reaper removed them
+        query = API.db.session.query( RecordLocks.L_RECORD_ID, RecordLocks.L_USER ). \
+                               filter( and_( RecordLocks.L_TABLE == obj._table,
+                                             RecordLocks.L_RECORD_ID.in_( list( keys ) ),
+                                             RecordLocks.L_USER != user,
+                                             or_( RecordLocks.L_EXPIRE_DATE == None,     # noqa: E711
+                                                  RecordLocks.L_EXPIRE_DATE > datetime.utcnow() ) ) )
+        return { keys[ record_id ]: lock_user for record_id, lock_user in query }
+
     @classmethod
     def unlock( cls, request, user = None ):
         from webapp2.common.locking.model import RecordLocks
+        from webapp2.common.locking.registry import lockRegistry
         data = getDictFromRequest( request )
         obj = cls()
         if user is None:
@@ -213,6 +292,8 @@ class RecordLock( object ):
                 API.logger.error( 'Could not retrieve {} from record'.format( obj._record_id ) )
                 return { 'result': 'OK', 'table': obj._table, 'id': obj._id }
 
+            obj._id = cls.lockKey( obj._id )
+
         else:
             API.logger.error( 'data not a record'.format( obj._record_id ) )
             return { 'result': 'OK', 'table': obj._table, 'id': obj._id }
@@ -223,6 +304,7 @@ class RecordLock( object ):
                                                                RecordLocks.L_RECORD_ID == obj._id,
                                                                RecordLocks.L_USER == user ) ).delete()
             API.db.session.commit()
+            lockRegistry.remove( obj._table, obj._id, user )
             API.logger.debug( "Unlocking done" )
 
         except NoResultFound:
@@ -233,6 +315,7 @@ class RecordLock( object ):
     @classmethod
     def lock( cls, request, user = None ):
         from webapp2.common.locking.model import RecordLocks
+        from webapp2.common.locking.registry import lockRegistry
         data = getDictFromRequest( request )
         obj = cls()
         if user is None:
@@ -242,15 +325,69 @@ class RecordLock( object ):
             user = 'single.user'
 
         API.logger.debug( "lock: {}".format( data ) )
-        obj._id = data[ obj._record_id ]
+        obj._id = cls.lockKey( data[ obj._record_id ] )
         API.logger.debug( "Locking {}:{} for {}".format( obj._table, obj._id, user ) )
-        API.db.session.add( RecordLocks( L_USER = user,
-                                         L_RECORD_ID = obj._id,
-                                         L_TABLE = obj._table,
-                                         L_START_DATE = datetime.utcnow() ) )
-        API.db.session.commit()
+        # There is one lock per record (unique index on table, record_id)
+        now = datetime.utcnow()
+        expire = cls.leaseExpire()
+        rec = API.db.session.query( RecordLocks ). \
+                             filter( and_( RecordLocks.L_TABLE == obj._table,
+                                           RecordLocks.L_RECORD_ID == obj._id ) ).one_or_none()
+        if rec is None:
+            API.db.session.add( RecordLocks( L_USER = user,
+                                             L_RECORD_ID = obj._id,
+                                             L_TABLE = obj._table,
+                                             L_START_DATE = now,
+                                             L_EXPIRE_DATE = expire ) )
+
+        elif rec.L_USER == user or ( rec.L_EXPIRE_DATE is not None and rec.L_EXPIRE_DATE <= now ):
+            # Our own lock or an expired lease that the reaper didn't remove yet
+            rec.L_USER = user
+            rec.L_START_DATE = now
+            rec.L_EXPIRE_DATE = expire
+
+        else:
+            API.logger.warning( "Record is locked by {}".format( rec.L_USER ) )
+            raise RecordLockedException( user = rec.L_USER )
+
+        try:
+            API.db.session.commit()
+
+        except IntegrityError:
+            # Another request locked the record in the meantime
+            API.db.session.rollback()
+            raise RecordLockedException()
+
+        lockRegistry.add( obj._table, obj._id, user, expire )
         API.logger.debug( "Locking done" )
-        return { 'result': 'OK', 'table': obj._table, 'id': obj._id }
+        return { 'result': 'OK', 'table': obj._table, 'id': obj._id, 'expire': expire }
+
+    @classmethod
+    def renew( cls, request, user = None ):
+        """Extend the lease of the lock, called by the client as heartbeat. When the
+           lease was lost (expired and reaped) the lock is acquired again if possible.
+        """
+        from webapp2.common.locking.model import RecordLocks
+        from webapp2.common.locking.registry import lockRegistry
+        data = getDictFromRequest( request )
+        obj = cls()
+        if user is None:
+            user = obj.user
+
+        obj._id = cls.lockKey( data[ obj._record_id ] )
+        expire = cls.leaseExpire()
+        API.logger.debug( "Renew lock {}:{} for {} until {}".format( obj._table, obj._id, user, expire ) )
+        count = API.db.session.query( RecordLocks ). \
+                               filter( and_( RecordLocks.L_TABLE == obj._table,
+                                             RecordLocks.L_RECORD_ID == obj._id,
+                                             RecordLocks.L_USER == user ) ). \
+                               update( { RecordLocks.L_EXPIRE_DATE: expire }, synchronize_session = False )
+        API.db.session.commit()
+        if count == 0:
+            return cls.lock( request, user )
+
+        lockRegistry.add( obj._table, obj._id, user, expire )
+        return { 'result': 'OK', 'table': obj._table, 'id': obj._id, 'expire': expire }
 
 
 class CrudInterface( object ):
@@ -264,26 +401,36 @@ class CrudInterface( object ):
     _delayed = False
     _cacheTimeout = 150
     _tableFilter = None
+    _countStrategy = 'exact'    # exact, capped, estimated, cached or skipped
+    _countCap = 1000            # for the capped strategy
+    _countTtl = 60              # seconds, for the cached strategy
+    _listFields = None          # default projection (list of fields) for the list views
+    _exportChunkSize = 1000     # rows fetched per round trip by the export
 
     def __init__( self, blue_print, use_jwt = False, session_function = None ):
         self._blue_print = blue_print
         self._session_function  = session_function
         self.registerRoute( 'list/<id>/<value>', self.filteredList, methods = [ 'GET' ] )
-        self.registerRoute( 'pagedlist', self.pagedList, methods = [ 'POST' ] )
+        self.registerRoute( 'pagedlist', self.pagedList, methods = [ 'POST' ], route_class = READ )
         self.registerRoute( 'list', self.recordList, methods = [ 'GET' ] )
         self.registerRoute( 'new', self.newRecord, methods = [ 'POST' ] )
         self.registerRoute( 'primarykey', self.primaryKey, methods = [ 'GET' ] )
         self.registerRoute( 'get', self.recordGet, methods = [ 'GET' ] )
         self.registerRoute( 'get/<int:id>', self.recordGetId, methods = [ 'GET' ] )
-        self.registerRoute( 'getvalue', self.recordGetColValue, methods = [ 'POST' ] )
+        self.registerRoute( 'getvalue', self.recordGetColValue, methods = [ 'POST' ], route_class = READ )
         self.registerRoute( '<id>', self.recordDelete, methods = [ 'DELETE' ] )
         self.registerRoute( 'put', self.recordPut, methods = [ 'POST' ] )
         self.registerRoute( 'update', self.recordPatch, methods = [ 'POST' ] )
-        self.registerRoute( 'select', self.selectList, methods = [ 'POST', 'GET' ] )
+        self.registerRoute( 'select', self.selectList, methods = [ 'POST', 'GET' ], route_class = READ )
         self.registerRoute( 'lock', self.lock, methods = [ 'POST' ] )
         self.registerRoute( 'unlock', self.unlock, methods = [ 'POST' ] )
+        self.registerRoute( 'renew', self.renew, methods = [ 'POST' ] )
         self.registerRoute( 'count', self.recordCount, methods=['GET'])
+        self.registerRoute( 'cachestats', self.cacheStats, methods = [ 'GET' ] )
+        self.registerRoute( 'export', self.exportRecords, methods = [ 'POST' ], route_class = READ )
+        self.registerRoute( 'bulk', self.bulkRecords, methods = [ 'POST' ] )
         self.__useJWT   = use_jwt
+        self._projectionSchemas = {}
         return
 
     def __repr__( self ):
@@ -312,7 +459,11 @@ class CrudInterface( object ):
         self.__useJWT = value
         return
 
-    def registerRoute( self, rule, function, endpoint = None, **options ):
+    def registerRoute( self, rule, function, endpoint = None, route_class = None, **options ):
+        """Add the route to the blueprint, the route class (STATIC, READ or WRITE) is derived
+           from the methods when not given. POST routes that don't change records pass
+           route_class = READ, so the request hooks skip them.
+        """
         if not rule.startswith( '/' ):
             rule = posixpath.join( self._uri, rule )
 
@@ -320,6 +471,8 @@ class CrudInterface( object ):
                                        endpoint,
                                        function,
                                        **options )
+        routeClasses.register( '{}.{}'.format( self._blue_print.name, endpoint or function.__name__ ),
+                               route_class or routeClasses.fromMethods( options.get( 'methods' ) ) )
         return
 
     def checkAuthentication( self ):
@@ -335,92 +488,220 @@ class CrudInterface( object ):
         if callable( self._tableFilter ):
             query = self._tableFilter( query )
 
-        for item in filter:
-            # TODO: can be removed once the filter is passed as a BaseFilter class
-            if isinstance(item, dict):
-                item = BaseFilter.parse_obj(item)
-
-            operator = getattr( item, 'operator', None )
-            if operator is None:
-                continue
+        # The plan holds the resolved columns, operators and joins for this filter shape,
+        # only the values of the filters are bound per request.
+        plan = filterCompiler.plan( model_cls, filter, childFilters )
+        return plan.apply( query, filter, childFilters )
 
-            column  = getattr( item, 'column', None )
-            if isinstance( getattr( item, 'value' ), ( list, tuple ) ):
-                value1, value2   = getattr( item, 'value', [ None, None ] )
+    def countRecords( self, query, filters = None, childFilters = None, options = None ):
+        """Count the records of the query with the count strategy of the interface.
 
-            else:
-                value1, value2 = getattr( item, 'value' ), None
+        :return:    tuple( count, mode, exact )
+        """
+        counter = countStrategies.get( self._countStrategy, ExactCounter )( self, self.cacheTables( filters, childFilters ) )
+        filtered = bool( filters ) or bool( childFilters ) or callable( self._tableFilter )
+        value, exact = counter.count( query, filtered, filterSignature( filters, childFilters, options ) )
+        return value, counter.NAME, exact
+
+    def cacheTables( self, filters = None, childFilters = None, sorting = None, model_cls = None ):
+        """The tables the result of a read depends on, the table of the interface, the tables
+           of the relationships of dotted filter/sort columns and the child filter tables.
+        """
+        if model_cls is None:
+            model_cls = self._model_cls
 
-            API.app.logger.debug( "Filter {} {} {} / {}".format( column, operator, value1, value2 ) )
+        tables = [ model_cls.__tablename__ ]
+        columns = [ itemAttr( item, 'column' ) for item in filters or [] ]
+        if sorting is not None:
+            columns.append( itemAttr( sorting, 'column' ) )
 
-            # if we have a nested relationship attribute, we split the column and
-            # access the attribute via joins
-            attributes = column.split(".")
+        for column in columns:
             relatedClass = model_cls
-            if len(attributes) > 1:
-                for i in range(0, len(attributes) - 1):
-                    relationship = getattr( relatedClass, attributes[i])
-                    query = query.outerjoin(relationship)
-                    relatedClass = relationship.mapper.class_
+            for attribute in ( column or '' ).split( "." )[ : -1 ]:
+                try:
+                    relatedClass = getattr( relatedClass, attribute ).mapper.class_
+                    tables.append( relatedClass.__tablename__ )
 
-            if operator == 'EQ':
-                # apply filter
-                query = query.filter( getattr( relatedClass, attributes[-1] ) == value1)
+                except AttributeError:
+                    break
 
-            elif operator == '!EQ':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) != value1 )
+        for childFilter in childFilters or []:
+            try:
+                tables.extend( self.cacheTables( itemAttr( childFilter, 'filters' ),
+                                                 itemAttr( childFilter, 'childFilters' ),
+                                                 model_cls = filterCompiler.tableClass( itemAttr( childFilter, 'table' ) ) ) )
 
-            elif operator == 'GT':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) > value1 )
+            except KeyError:
+                tables.append( itemAttr( childFilter, 'table' ) )
 
-            elif operator == 'LE':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) < value1 )
+        return tables
 
-            elif operator == 'GT|EQ':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) >= value1 )
+    def bodyTables( self, body ):
+        """The tables the result of a read request body depends on, see cacheTables()
+        """
+        filters = itemAttr( body, 'filters' )
+        if filters is None:
+            filters = itemAttr( body, 'filter' )
 
-            elif operator == 'LE|EQ':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) <= value1 )
+        return self.cacheTables( filters, itemAttr( body, 'childFilters' ), itemAttr( body, 'sorting' ) )
 
-            elif operator == 'EM':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) == "" )
+    def applySorting( self, query, sorting, filter ):
+        """Resolve the sort column, when the column is a dotted relationship column the
+           relationships are joined to the query unless already joined through the filter.
 
-            elif operator == '!EM':
-                query = query.filter( getattr( relatedClass, attributes[-1] ) != "" )
+        :return:    tuple( query, sort column, list of attributes, descending )
+        """
+        if not isinstance( sorting, Sorting ) or sorting.column is None:
+            return query, None, [], False
+
+        column = sorting.column
+        # get related target class of the foreign attribute
+        relatedClass = self._model_cls
+        attributes = column.split(".")
+        shouldJoin = len([ item for item in filter if itemAttr( item, 'column' ) == column ]) == 0
+        for i in range(0, len(attributes) - 1):
+            relationship = getattr( relatedClass, attributes[i])
+            # make join if not already done through filtering
+            if shouldJoin:
+                query = query.outerjoin(relationship)
+
+            relatedClass = relationship.mapper.class_
+
+        # in the following, it is explicitly assumed that the query contains already a join
+        # with the target model class since the filter field and sort field must correlate
+        return query, getattr( relatedClass, attributes[-1] ), attributes, sorting.direction != 'asc'
+
+    def keysetPage( self, query, sortColumn, attributes, descending, cursor, pageSize, extra = None ):
+        """Fetch one page with the seek method, instead of OFFSET the query continues
+           after ( or before ) the boundary record encoded in the cursor. The primary key
+           is used as tie breaker, the NULL values of a nullable sort column are ordered
+           after the other values ( before in descending order ).
+
+        :param extra:   optional callable that returns records from outside the query (objects
+                        or dicts, e.g. the archived records), they are paged with the same cursor.
+                        The extra records follow the records of the query in the sort order, so
+                        the callable is only called when the query doesn't fill the page.
+        :return:    tuple( records, nextCursor, prevCursor )
+        """
+        keyField = self._model_cls.__field_list__[ 0 ]
+        keyColumn = getattr( self._model_cls, keyField )
+        reverse = False
+        sortValue = keyValue = None
+        nullable = sortColumn is not None and keyset.isNullable( sortColumn, attributes )
+        if cursor is not None:
+            sortValue, keyValue, direction = keyset.decodeCursor( cursor )
+            reverse = direction == keyset.PREVIOUS
+            if sortColumn is not None:
+                sortValue = keyset.coerceValue( sortColumn, sortValue )
+
+            query = query.filter( keyset.keysetCondition( query.session.get_bind().dialect.name,
+                                                          sortColumn,
+                                                          keyColumn,
+                                                          sortValue,
+                                                          keyValue,
+                                                          descending != reverse,
+                                                          nullable ) )
+
+        # When paging backwards the order is reversed, and the records are reversed afterwards
+        query = query.order_by( *keyset.orderColumns( sortColumn, keyColumn, descending != reverse, nullable ) )
+        records = query.limit( pageSize + 1 ).all()
+        if callable( extra ) and ( reverse or len( records ) <= pageSize ):
+            def position( record ):
+                return keyset.position( keyset.getRecordValue( record, attributes ) if sortColumn is not None else None,
+                                        keyset.getRecordValue( record, [ keyField ] ) )
+
+            # the same seek condition and order as the query
+            boundary = keyset.position( sortValue, keyValue )
+            extraRecords = [ record for record in extra()
+                             if cursor is None or ( position( record ) < boundary
+                                                    if descending != reverse else
+                                                    position( record ) > boundary ) ]
+            records = sorted( records + extraRecords, key = position, reverse = descending != reverse )[ : pageSize + 1 ]
+
+        hasMore = len( records ) > pageSize
+        records = records[ : pageSize ]
+        if reverse:
+            records.reverse()
+
+        def makeCursor( record, direction ):
+            sortValue = keyset.getRecordValue( record, attributes ) if sortColumn is not None else None
+            return keyset.encodeCursor( sortValue, keyset.getRecordValue( record, [ keyField ] ), direction )
+
+        nextCursor = prevCursor = None
+        if len( records ) > 0:
+            if hasMore or reverse:
+                nextCursor = makeCursor( records[ -1 ], keyset.NEXT )
+
+            if ( hasMore and reverse ) or ( cursor is not None and not reverse ):
+                prevCursor = makeCursor( records[ 0 ], keyset.PREVIOUS )
+
+        return records, nextCursor, prevCursor
+
+    def dumpRecord( self, record, schema = None ):
+        """Serialize one record with the list schema (or the supplied schema) into a dict.
+        """
+        if schema is None:
+            schema = self._schema_list_cls
 
-            elif operator == 'CO':
-                query = query.filter( getattr( relatedClass, attributes[-1] ).like( "%{}%".format( value1 ) ) )
+        result = schema.dump( record, many = False )
+        # workaround to consider different Marshmallow versions
+        if not isinstance( result, dict ):
+            result = result.data
 
-            elif operator == '!CO':
-                query = query.filter( not_( getattr( relatedClass, attributes[-1] ).contains( value1 ) ) )
+        return result
 
-            elif operator == 'BT': # Between
-                query = query.filter( getattr( relatedClass, attributes[-1] ).between( value1, value2 ) )
+    def projectionFields( self, fields, withKey = True ):
+        """Validate the requested fields, the primary key is always part of the projection.
 
-            elif operator == 'SW': # Startswith
-                query = query.filter( getattr( relatedClass, attributes[-1] ).like( "{}%".format( value1 ) ) )
+        :param fields:      list of fields or a comma separated string, None for all fields.
+        :param withKey:     False to return only the requested fields.
+        :return:            tuple of fields or None.
+        """
+        if not fields:
+            return None
 
-            elif operator == 'EW': # Endswith
-                query = query.filter( getattr( relatedClass, attributes[-1] ).like( "%{}".format( value1 ) ) )
+        if isinstance( fields, str ):
+            fields = [ field.strip() for field in fields.split( ',' ) ]
 
-        # process the filter for child records
-        if len(childFilters) > 0:
-            tables_dict = {table.__tablename__: table for table in API.db.Model.__subclasses__()}
+        unknown = [ field for field in fields if field not in self._model_cls.__field_list__ ]
+        if len( unknown ) > 0:
+            raise InvalidRequestExecption( "Unknown field(s) {} for {}".format( ', '.join( unknown ), self._model_cls.__name__ ) )
 
-        for childFilter in childFilters:
-            try:
-                # join with child table based on foreign key
-                childTableClass = tables_dict[childFilter.table]
-                foreignKey = childFilter.foreignKey
-                query = query.outerjoin( childTableClass, and_(getattr(model_cls, model_cls.__field_list__[0]) == getattr(childTableClass, foreignKey)) )
-                # apply filters for child table
-                query = self.makeFilter( query, childFilter.filters, childFilter.childFilters, model_cls=childTableClass )
+        primaryKey = self._model_cls.__field_list__[ 0 ]
+        if withKey and primaryKey not in fields:
+            fields = [ primaryKey ] + list( fields )
 
-            except Exception as e:
-                traceback.print_exc()
-                API.logger.error("Child filter not working, reason: " + str(e))
+        return tuple( fields )
 
-        return query
+    def projectQuery( self, query, fields ):
+        """Load only the columns of the projection from the database.
+        """
+        if fields is None:
+            return query
+
+        return query.options( load_only( *[ getattr( self._model_cls, field ) for field in fields ] ) )
+
+    def projectionSchema( self, fields, many = True ):
+        """The schema that only dumps the fields of the projection, the unloaded columns
+           would otherwise be lazy loaded one record at a time during the dump.
+        """
+        schema = self._schema_list_cls if many else self._schema_cls
+        if fields is None:
+            return schema
+
+        key = ( fields, many )
+        if key not in self._projectionSchemas:
+            self._projectionSchemas[ key ] = schema.__class__( many = many,
+                                                               only = [ field for field in fields if field in schema.fields ] )
+
+        return self._projectionSchemas[ key ]
+
+    def jsonRecords( self, records, schema = None, **envelope ):
+        """Build the JSON response { "records": [ ... ], **envelope } in a single pass,
+           the records are dumped with marshmallow and written directly to the output buffer.
+        """
+        return Response( jsonEnvelope( 'records', records, lambda record: self.dumpRecord( record, schema ), **envelope ),
+                         mimetype = 'application/json' )
 
     class PagedListBodyInput(BaseModel):
         filters: Optional[Union[List[BaseFilter], List[dict]]] = []
@@ -429,9 +710,12 @@ class CrudInterface( object ):
         sorting: Optional[Sorting]
         cacheDeactivator: Optional[int]
         options: Optional[ dict ]
+        keyset: Optional[ bool ] = False    # seek pagination instead of OFFSET
+        cursor: Optional[ str ]             # nextCursor or prevCursor from the previous page
+        fields: Optional[ List[ str ] ]     # projection, default _listFields
 
     @with_valid_input(body=PagedListBodyInput)
-    @cache.memoize(timeout=_cacheTimeout)
+    @responseCache.memoize(timeout=_cacheTimeout)
     def pagedList( self, body: PagedListBodyInput ):
         if body.cacheDeactivator != None:
             self.deleteCache()
@@ -443,11 +727,6 @@ class CrudInterface( object ):
             API.app.logger.debug( 'POST: {}/pagedlist by {}'.format( self._uri, user_info ) )
 
         filter = body.filters
-        # parse filters
-        for item in filter:
-            if isinstance(item, dict):
-                item = BaseFilter.parse_obj(item)
-
         options = {}
         try:
             options = json.loads( request.headers.environ[ 'HTTP_X_ACME_SYSENV' ] )
@@ -456,49 +735,40 @@ class CrudInterface( object ):
             pass
 
         API.app.logger.debug( "Filter {}".format( filter ) )
+        fields = self.projectionFields( body.fields or self._listFields )
         query = self.makeFilter( self.getDbSession( options ).query( self._model_cls ), filter )
         API.app.logger.debug( "SQL-QUERY : {}".format( render_query( query ) ) )
-        recCount = query.count()
-        API.app.logger.debug( "SQL-QUERY original count {}".format( recCount ) )
-        sorting = body.sorting
-        if isinstance( sorting, Sorting ):
-            column = sorting.column
-            # get related target class of the foreign attribute
-            relatedClass = self._model_cls
-            attributes = column.split(".")
-            shouldJoin = len([ item for item in filter if item.column == column ]) == 0
-            for i in range(0, len(attributes) - 1):
-                relationship = getattr( relatedClass, attributes[i])
-                # make join if not already done through filtering
-                if shouldJoin:
-                    query = query.outerjoin(relationship)
-
-                relatedClass = relationship.mapper.class_
-
-            if column is not None:
-                # in the following, it is explicitly assumed that the query contains already a join
-                # with the target model class since the filter field and sort field must correlate
-                if sorting.direction == 'asc':
-                    query = query.order_by( getattr( relatedClass, attributes[-1] ) )
-
-                else:
-                    query = query.order_by( getattr( relatedClass, attributes[-1] ).desc() )
-
+        recCount, countMode, countExact = self.countRecords( query, filter, options = options )
+        API.app.logger.debug( "SQL-QUERY original count {} ({})".format( recCount, countMode ) )
+        query, sortColumn, sortAttributes, descending = self.applySorting( query, body.sorting, filter )
         pageIndex = body.pageIndex
         pageSize = body.pageSize
-        API.app.logger.debug( "SQL-QUERY limit {} / {}".format( pageIndex, pageSize ) )
-        if ( ( pageIndex * pageSize ) > recCount ):
-            pageIndex = 0
+        envelope = {}
+        if body.keyset or body.cursor is not None:
+            API.app.logger.debug( "SQL-QUERY keyset {} / {}".format( body.cursor, pageSize ) )
+            records, nextCursor, prevCursor = self.keysetPage( self.projectQuery( query, fields ), sortColumn, sortAttributes,
+                                                               descending, body.cursor, pageSize )
+            envelope = dict( nextCursor = nextCursor, prevCursor = prevCursor )
+
+        else:
+            if sortColumn is not None:
+                query = query.order_by( sortColumn.desc() if descending else sortColumn )
+
+            API.app.logger.debug( "SQL-QUERY limit {} / {}".format( pageIndex, pageSize ) )
+            if isinstance( recCount, int ) and ( ( pageIndex * pageSize ) > recCount ):
+                pageIndex = 0
+
+            records = self.projectQuery( query, fields ).limit( pageSize ).offset( pageIndex * pageSize ).all()
 
-        query = query.limit( pageSize ).offset( pageIndex * pageSize )
-        result:Response = self._schema_list_cls.jsonify( query.all() )
         API.app.logger.debug( "RESULT filtered count {}q".format( recCount ) )
-        result = jsonify(
-            records = result.json,
-            pageSize = pageSize,
-            page = pageIndex,
-            recordCount = recCount
-        )
+        result = self.jsonRecords( records,
+                                   self.projectionSchema( fields ),
+                                   pageSize = pageSize,
+                                   page = pageIndex,
+                                   recordCount = recCount,
+                                   countMode = countMode,
+                                   countExact = countExact,
+                                   **envelope )
         if self._delayed and t1 + 1 > time.time():
             API.app.logger.debug( 'filteredList waiting: {}'.format( ( t1 + 1 ) - time.time() ) )
             time.sleep( ( t1 + 1 ) - time.time() )
@@ -548,6 +818,104 @@ class CrudInterface( object ):
         API.db.session.close()
         return result
 
+    class ExportBodyInput(BaseModel):
+        filters: Optional[Union[List[BaseFilter], List[dict]]] = []
+        sorting: Optional[Sorting]
+        fields: Optional[ List[ str ] ]
+        format: str = 'ndjson'      # ndjson or csv
+
+    EXPORT_FORMATS = { 'ndjson': ( 'application/x-ndjson', 'ndjson' ),
+                       'csv':    ( 'text/csv', 'csv' ) }
+
+    @with_valid_input(body=ExportBodyInput)
+    def exportRecords( self, body: ExportBodyInput ):
+        """Stream all the records of the filter as NDJSON or CSV, the rows are fetched in chunks
+           of _exportChunkSize with a server side cursor, so the memory use doesn't depend on
+           the number of records. The output is gzip compressed when the client accepts it.
+        """
+        self.checkAuthentication()
+        fmt = body.format.lower()
+        if fmt not in self.EXPORT_FORMATS:
+            raise InvalidRequestExecption( "Unknown export format '{}'".format( body.format ) )
+
+        options = {}
+        try:
+            options = json.loads( request.headers.environ[ 'HTTP_X_ACME_SYSENV' ] )
+
+        except:
+            pass
+
+        API.app.logger.debug( 'POST: {}/export {} by {}'.format( self._uri, fmt, self._lock_cls().user ) )
+        filter = body.filters
+        fields = self.projectionFields( body.fields or self._listFields )
+        schema = self.projectionSchema( fields )
+        query = self.makeFilter( self.getDbSession( options ).query( self._model_cls ), filter )
+        query, sortColumn, sortAttributes, descending = self.applySorting( query, body.sorting, filter )
+        if sortColumn is not None:
+            query = query.order_by( sortColumn.desc() if descending else sortColumn )
+
+        query = self.projectQuery( query, fields ).execution_options( stream_results = True ).yield_per( self._exportChunkSize )
+        compress = 'gzip' in request.headers.get( 'Accept-Encoding', '' )
+
+        def encodeChunks():
+            if fmt == 'ndjson':
+                lines = []
+                for record in query:
+                    lines.append( dumpsJson( self.dumpRecord( record, schema ) ) )
+                    if len( lines ) >= self._exportChunkSize:
+                        yield b'\n'.join( lines ) + b'\n'
+                        lines = []
+
+                if len( lines ):
+                    yield b'\n'.join( lines ) + b'\n'
+
+                return
+
+            stream = io.StringIO()
+            writer = csv.writer( stream, delimiter = ';', quotechar = '"' )
+            header = None
+            for index, record in enumerate( query, 1 ):
+                row = self.dumpRecord( record, schema )
+                if header is None:
+                    # the dumped dict of a projection schema has no fixed order
+                    header = [ field for field in fields or self._model_cls.__field_list__ if field in row ]
+                    header += [ key for key in row if key not in header ]
+                    writer.writerow( header )
+
+                writer.writerow( [ row.get( key ) for key in header ] )
+                if index % self._exportChunkSize == 0:
+                    yield stream.getvalue().encode( 'utf-8' )
+                    stream.seek( 0 )
+                    stream.truncate()
+
+            yield stream.getvalue().encode( 'utf-8' )
+
+        def generate():
+            compressor = zlib.compressobj( 6, zlib.DEFLATED, 31 ) if compress else None
+            try:
+                for chunk in encodeChunks():
+                    if compressor is not None:
+                        chunk = compressor.compress( chunk )
+
+                    if chunk:
+                        yield chunk
+
+                if compressor is not None:
+                    yield compressor.flush()
+
+            finally:
+                API.db.session.remove()
+                API.db.session.close()
+
+        mimetype, extension = self.EXPORT_FORMATS[ fmt ]
+        response = Response( stream_with_context( generate() ), mimetype = mimetype )
+        response.headers[ 'Content-Disposition' ] = 'attachment; filename="{}.{}"'.format( self._model_cls.__tablename__, extension )
+        response.headers[ 'Vary' ] = 'Accept-Encoding'
+        if compress:
+            response.headers[ 'Content-Encoding' ] = 'gzip'
+
+        return response
+
     def primaryKey( self, **kwargs ):
         self.checkAuthentication()
         # get primary key of class
@@ -587,12 +955,19 @@ class CrudInterface( object ):
             pass
 
         try:
-            query = self.getDbSession( options ).query( self._model_cls )
-            for column, value in locker.data.items():
+            data = dict( locker.data )
+            fields = self.projectionFields( data.pop( 'fields', None ) )
+            query = self.projectQuery( self.getDbSession( options ).query( self._model_cls ), fields )
+            for column, value in data.items():
                 query = query.filter(getattr(self._model_cls, column) == value)
 
             record = query.one()
-            result = self._schema_cls.jsonify( record )
+            if fields is None:
+                result = self._schema_cls.jsonify( record )
+
+            else:
+                result = Response( dumpsJson( self.dumpRecord( record, self.projectionSchema( fields, many = False ) ) ),
+                                   mimetype = 'application/json' )
 
         except Exception as exc:
             raise BackendError(exc, problem="Requested {} record does not exist in the database".format( self._model_cls.__name__ ),
@@ -632,7 +1007,7 @@ class CrudInterface( object ):
         column: str
 
     @with_valid_input(body=GetColValueBodyInput)
-    @cache.memoize(_cacheTimeout)
+    @responseCache.memoize(_cacheTimeout)
     def recordGetColValue( self, body: GetColValueBodyInput ):
         options = {}
         try:
@@ -663,20 +1038,13 @@ class CrudInterface( object ):
         dbSession = self.getDbSession(options)
         record = dbSession.query( self._model_cls).get( locker.id )
         if not self._session_function:
-            recordData = record.dictionary
-            for relation in self._relations:
-                # Now
-                if 'delete' in relation.get( 'cascade' ):
-                    cascadeRecords = []
-                    for relRecord in getattr( record, relation.get( 'table', '' ) + '_relation' ):
-                        cascadeRecords.append( relRecord.dictionary )
-
-                    recordData[ relation.get( 'class', '' ) ] = cascadeRecords
-
             API.recordTracking.delete( self._model_cls.__tablename__,
                                        locker.id,
-                                       recordData,
+                                       self.deleteData( record ),
                                        locker.user )
+            # tracked above including the cascade deleted records
+            from webapp2.common.tracking.capture import skipTracking
+            skipTracking( dbSession )
 
         API.app.logger.debug( 'Deleting record: {}'.format( record ) )
         dbSession.delete( record )
@@ -692,6 +1060,22 @@ class CrudInterface( object ):
         API.db.session.close()
         return response
 
+    def deleteData( self, record ):
+        """The record data for the tracking of a delete, including the records of
+           the relations that are deleted by cascade.
+        """
+        recordData = record.dictionary
+        for relation in self._relations:
+            # Now
+            if 'delete' in relation.get( 'cascade' ):
+                cascadeRecords = []
+                for relRecord in getattr( record, relation.get( 'table', '' ) + '_relation' ):
+                    cascadeRecords.append( relRecord.dictionary )
+
+                recordData[ relation.get( 'class', '' ) ] = cascadeRecords
+
+        return recordData
+
     def updateRecord( self, data: dict, record: any, user = None ):
         self.checkAuthentication()
         options = {}
@@ -710,6 +1094,33 @@ class CrudInterface( object ):
         else:
             Exception( "Missing record ref" )
 
+        return self.applyRecord( data, record )
+
+    def recordKey( self, value ):
+        """Convert a primary key value from a request to the type of the primary key column.
+        """
+        if value is None:
+            return None
+
+        column = getattr( self._model_cls, self._model_cls.__field_list__[ 0 ] )
+        try:
+            pythonType = column.type.python_type
+
+        except NotImplementedError:
+            return value
+
+        if isinstance( value, pythonType ):
+            return value
+
+        try:
+            return pythonType( value )
+
+        except ( TypeError, ValueError ):
+            raise InvalidRequestExecption( "Invalid {} record id {!r}".format( self._model_cls.__name__, value ) )
+
+    def applyRecord( self, data: dict, record: any ):
+        """Load the data through the schema and set the fields on the record.
+        """
         # the .data was added after the merge from github into gitlab since
         # unmarshalresult objects have a data attribute containing the result
         result = self._schema_cls.load( self.beforeUpdate( data ) )
@@ -726,7 +1137,6 @@ class CrudInterface( object ):
         else:
             raise Exception( result )
 
-        self.deleteCache()
         return self.beforeCommit( record )
 
     def beforeUpdate( self, data ):
@@ -795,6 +1205,171 @@ class CrudInterface( object ):
         API.db.session.close()
         return result
 
+    BULK_NEW    = 'new'
+    BULK_UPDATE = 'update'
+    BULK_DELETE = 'delete'
+
+    class BulkOperation(BaseModel):
+        operation: str              # new, update or delete
+        record: dict
+
+    class BulkBodyInput(BaseModel):
+        # resolved after the class, see update_forward_refs() below
+        operations: List['BulkOperation']
+
+    @with_valid_input(body=BulkBodyInput)
+    def bulkRecords( self, body: BulkBodyInput ):
+        """Create, update and delete a batch of records in one request.
+
+        The locks of all records are checked with one query and the existing records
+        are loaded with one IN query. The changes are applied in one transaction, the
+        tracking records are written with one executemany and the cache is invalidated
+        once. The result contains per operation the outcome, a failing operation doesn't
+        stop the other operations.
+        """
+        self.checkAuthentication()
+        options = {}
+        try:
+            options = json.loads( request.headers.environ[ 'HTTP_X_ACME_SYSENV' ] )
+
+        except:
+            pass
+
+        primaryKey = self._model_cls.__field_list__[ 0 ]
+        keyColumn = getattr( self._model_cls, primaryKey )
+        table = self._model_cls.__tablename__
+        user = self._lock_cls().user
+        API.app.logger.debug( 'POST: {}/bulk {} operations by {}'.format( self._uri, len( body.operations ), user ) )
+        dbSession = self.getDbSession( options )
+        # the ids are converted once to the type of the primary key, the locks and the
+        # loaded records are looked up with the same value
+        keys = {}
+        for index, operation in enumerate( body.operations ):
+            if operation.operation in ( self.BULK_UPDATE, self.BULK_DELETE ):
+                try:
+                    keys[ index ] = self.recordKey( operation.record.get( primaryKey ) )
+
+                except InvalidRequestExecption as exc:
+                    keys[ index ] = exc
+
+        ids = [ id for id in keys.values() if id is not None and not isinstance( id, Exception ) ]
+        locks = self._lock_cls.lockedRecords( ids, user ) if self._lock else {}
+        records = {}
+        if len( ids ) > 0:
+            for record in dbSession.query( self._model_cls ).filter( keyColumn.in_( set( ids ) ) ):
+                records[ getattr( record, primaryKey ) ] = record
+
+        tracking = not self._session_function
+        version_num = API.recordTracking.versionNum() if tracking else None
+        if tracking:
+            # the tracking rows are written below with one executemany
+            from webapp2.common.tracking.capture import skipTracking
+            skipTracking( dbSession )
+
+        trackingRows = []
+        newRecords = []
+        results = []
+        for index, operation in enumerate( body.operations ):
+            data = dict( operation.record )
+            id = keys.get( index, data.get( primaryKey ) )
+            result = { 'index': index, 'operation': operation.operation, 'id': id, 'ok': False, 'reason': '' }
+            results.append( result )
+            try:
+                if operation.operation == self.BULK_NEW:
+                    data.pop( primaryKey, None )
+                    record = self.applyRecord( data, self._model_cls() )
+                    dbSession.add( record )
+                    newRecords.append( ( result, record ) )
+
+                elif operation.operation in ( self.BULK_UPDATE, self.BULK_DELETE ):
+                    if isinstance( id, Exception ):
+                        result[ 'id' ] = data.get( primaryKey )
+                        raise id
+
+                    if id in locks:
+                        raise RecordLockedException( user = locks[ id ] )
+
+                    record = records.get( id )
+                    if record is None:
+                        raise InvalidRequestExecption( "{} record with id {} does not exist".format( self._model_cls.__name__, id ) )
+
+                    if operation.operation == self.BULK_UPDATE:
+                        try:
+                            record = self.applyRecord( data, record )
+
+                        except Exception:
+                            # undo the fields that were set before the failure
+                            dbSession.expire( record )
+                            raise
+
+                        if tracking:
+                            # the old values are only available before the flush
+                            trackingRows.append( API.recordTracking.updateRow( record, user, version_num ) )
+
+                        result[ 'record' ] = self.dumpRecord( record )
+
+                    else:
+                        if tracking:
+                            trackingRows.append( API.recordTracking.row( API.recordTracking.DELETE,
+                                                                         table,
+                                                                         id,
+                                                                         self.deleteData( record ),
+                                                                         user,
+                                                                         version_num ) )
+
+                        dbSession.delete( record )
+                        # a second operation on the same record must fail
+                        del records[ id ]
+
+                else:
+                    raise InvalidRequestExecption( "Unknown bulk operation '{}'".format( operation.operation ) )
+
+                result[ 'ok' ] = True
+
+            except Exception as exc:
+                API.app.logger.error( 'bulkRecords() operation {}: {}'.format( index, exc ) )
+                result[ 'reason' ] = str( exc )
+
+        try:
+            # the primary keys of the new records are assigned by the flush
+            dbSession.flush()
+            for result, record in newRecords:
+                result[ 'id' ] = getattr( record, primaryKey )
+                result[ 'record' ] = self.dumpRecord( record )
+                if tracking:
+                    trackingRows.append( API.recordTracking.row( API.recordTracking.INSERT,
+                                                                 table,
+                                                                 result[ 'id' ],
+                                                                 record.dictionary,
+                                                                 user,
+                                                                 version_num ) )
+
+            if tracking:
+                API.recordTracking.bulk( trackingRows )
+
+            dbSession.commit()
+
+        except Exception as exc:
+            API.app.logger.error( traceback.format_exc() )
+            dbSession.rollback()
+            for result in results:
+                if result[ 'ok' ]:
+                    result[ 'ok' ] = False
+                    result[ 'reason' ] = str( exc )
+                    result.pop( 'record', None )
+
+        if any( result[ 'ok' ] for result in results ):
+            self.deleteCache()
+
+        API.app.logger.debug( 'bulkRecords() => {}'.format( results ) )
+        response = Response( dumpsJson( { 'ok': all( result[ 'ok' ] for result in results ),
+                                          'results': results } ),
+                             mimetype = 'application/json' )
+        response.headers[ "USER" ] = user
+        API.db.session.remove()
+        API.db.session.close()
+        return response
+
     class SelectListBodyInput(BaseModel):
         value: Optional[str]
         label: Optional[str]
@@ -805,13 +1380,14 @@ class CrudInterface( object ):
         pageIndex: Optional[ int ] # optional for paged version
         pageSize: Optional[ int ] # optional for paged version
         firstItem: Optional[ int ] # optional list item to be at the top
+        fields: Optional[ List[ str ] ] # optional extra fields for each item
         def __repr__(self):
             return f"<SelectListBodyInput {self.label} => {self.value} filter {self.filter} \
             | {self.initial}, {self.final} child-filters {self.childFilters} \
             pageIndex: {self.pageIndex} pageSize: {self.pageSize} firstItem: {self.firstItem}>"
 
     @with_valid_input(body=SelectListBodyInput)
-    @cache.memoize(_cacheTimeout)
+    @responseCache.memoize(_cacheTimeout)
     def selectList( self, body: SelectListBodyInput ):
         name_field = self._model_cls.__field_list__[ 1 ]
         for fld in self._model_cls.__field_list__:
@@ -848,8 +1424,28 @@ class CrudInterface( object ):
         except:
             pass
 
-        # apply specified filter on the query
+        # TODO if label contains comma, split --> list
+        # ' '.join( [ getattr( record, l ) for l in labels ] )
+        labels = label.split(',')
+        extraFields = [ field for field in self.projectionFields( body.fields, withKey = False ) or [] if field != value ]
+        # the primary key keeps the records with equal values apart, it is only selected
+        primaryKey = self._model_cls.__field_list__[ 0 ]
+        keyFields = [ primaryKey ] if len( extraFields ) > 0 and primaryKey not in [ value ] + extraFields else []
+        # apply specified filter on the query, only the columns for the items are selected
         query = self.makeFilter(self.getDbSession( options ).query( self._model_cls ), filter, childFilters=childFilters )
+        # the outer joins of the child filters repeat a record for every matching child row,
+        # the entity query deduplicated those by identity, the column query needs DISTINCT
+        query = query.with_entities( getattr( self._model_cls, value ),
+                                     *[ getattr( self._model_cls, l ) for l in labels ],
+                                     *[ getattr( self._model_cls, field ) for field in extraFields + keyFields ] ).distinct()
+
+        def makeItem( row ):
+            item = { 'value': row[ 0 ],
+                     'label': ' '.join( [ str( l ) for l in row[ 1 : len( labels ) + 1 ] ] ) }
+            for field, fieldValue in zip( extraFields, row[ len( labels ) + 1 : ] ):
+                item[ field ] = fieldValue
+
+            return item
 
         pivotItem = None
         if body.firstItem not in (None, 0) and body.pageIndex == 0:
@@ -858,37 +1454,45 @@ class CrudInterface( object ):
             except Exception as e:
                 pass
 
-        # TODO if label contains comma, split --> list
-        # ' '.join( [ getattr( record, l ) for l in labels ] )
-        totalItems = query.count()
-        labels = label.split(',')
+        totalItems, countMode, countExact = self.countRecords( query, filter, childFilters, options )
         query = query.order_by( getattr( self._model_cls, labels[0] ) )
         if body.pageIndex is not None and body.pageSize is not None:
             query = query.limit( body.pageSize ).offset( body.pageIndex * body.pageSize )
-        result = [ { 'value': getattr( record, value ),
-                     'label': ' '.join( [ str(getattr( record, l )) for l in labels ] ) }
-                                for record in query.all() if getattr( record, value ) != body.firstItem
-        ]
+        result = [ makeItem( row ) for row in query.all() if row[ 0 ] != body.firstItem ]
         if pivotItem is not None:
-            result = [{'value': getattr( pivotItem, value ), 'label': ' '.join( [ str(getattr( pivotItem, l )) for l in labels ] )}] + result
+            result = [ makeItem( pivotItem ) ] + result
 
         API.app.logger.debug( 'selectList => count: {}'.format( len( result ) ) )
         # API.app.logger.debug( 'selectList => result: {}'.format( result ) )
         if body.pageIndex is not None and body.pageSize is not None:
-            return jsonify(  { "itemList": result, "totalItems": totalItems } )
+            return Response( dumpsJson( { "itemList": result,
+                                          "totalItems": totalItems,
+                                          "countMode": countMode,
+                                          "countExact": countExact } ),
+                             mimetype = 'application/json' )
 
         API.db.session.remove()
         API.db.session.close()
-        return jsonify( result )
+        return Response( dumpsJson( result ), mimetype = 'application/json' )
 
     def deleteCache( self ):
-        cache.delete_memoized(self.recordGetColValue)
-        cache.delete_memoized(self.pagedList)
-        cache.delete_memoized(self.selectList)
+        """Invalidate the cached reads that depend on the table of this interface, by
+           bumping the generation of the table. Cached reads of other tables survive.
+        """
+        tableGenerations.bump( self._model_cls.__tablename__ )
+        return
 
     def recordCount( self ):
         return jsonify( recordCount = self.getDbSession().query( self._model_cls ).count() )
 
+    def cacheStats( self ):
+        """The hit/miss counters of the response cache for the routes of this interface.
+        """
+        self.checkAuthentication()
+        prefix = "{}/".format( self._uri )
+        return jsonify( { route: stats for route, stats in responseCache.stats().items()
+                                       if route.startswith( prefix ) } )
+
     def lock( self ):
         if self._lock:
             self.checkAuthentication()
@@ -902,3 +1506,13 @@ class CrudInterface( object ):
             return jsonify( self._lock_cls.unlock( request ) )
 
         return ""
+
+    def renew( self ):
+        if self._lock:
+            self.checkAuthentication()
+            return jsonify( self._lock_cls.renew( request ) )
+
+        return ""
+
+
+CrudInterface.BulkBodyInput.update_forward_refs( BulkOperation = CrudInterface.BulkOperation )
@@ -1,5 +1,6 @@
 import json
 from webapp2.common.jsonenc import JsonEncoder
+from webapp2.common.sqlliteral import InsertWriter
 import webapp2.api as API
 from sqlalchemy import inspect
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -27,12 +28,13 @@ class CrudModelMixin( object ):
     def schemaJson( self ):
         return self.__schema_cls__.jsonify(self).data
 
-    def toSql( self ):
-        data = self.dictionary
-        values = repr( data.values() ).split( '[' )[ 1 ].split( ']' )[ 0 ]
-        return "INSERT INTO {} ( {} ) VALUES ( {} )".format( self.__tablename__,
-                                                             ", ".join( data.keys() ),
-                                                             values )
+    def toSql( self, dialect = None ):
+        """The INSERT statement of the record, without a dialect the literals are
+           generic SQL as before.
+        """
+        columns = [ self.__mapper__.get_property( field ).columns[ 0 ] for field in self.__field_list__ ]
+        return InsertWriter( self.__tablename__, columns, dialect ).insert( [ getattr( self, field )
+                                                                              for field in self.__field_list__ ] )
 
     def __repr__( self ):
         return "<{} {}>".format( self.__class__.__name__, ", ".join( [
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import threading
+import traceback
+from collections import OrderedDict
+from sqlalchemy import and_, not_
+import webapp2.api as API
+
+
+OPERATORS = {
+    'EQ':       lambda column, value1, value2: column == value1,
+    '!EQ':      lambda column, value1, value2: column != value1,
+    'GT':       lambda column, value1, value2: column > value1,
+    'LE':       lambda column, value1, value2: column < value1,
+    'GT|EQ':    lambda column, value1, value2: column >= value1,
+    'LE|EQ':    lambda column, value1, value2: column <= value1,
+    'EM':       lambda column, value1, value2: column == "",
+    '!EM':      lambda column, value1, value2: column != "",
+    'CO':       lambda column, value1, value2: column.like( "%{}%".format( value1 ) ),
+    '!CO':      lambda column, value1, value2: not_( column.contains( value1 ) ),
+    'BT':       lambda column, value1, value2: column.between( value1, value2 ),    # Between
+    'SW':       lambda column, value1, value2: column.like( "{}%".format( value1 ) ),  # Startswith
+    'EW':       lambda column, value1, value2: column.like( "%{}".format( value1 ) ),  # Endswith
+}
+
+
+def itemAttr( item, name, default = None ):
+    """Filters arrive as pydantic models (BaseFilter, TableFilter) or as plain dicts.
+    """
+    if isinstance( item, dict ):
+        return item.get( name, default )
+
+    return getattr( item, name, default )
+
+
+def filterValues( item ):
+    value = itemAttr( item, 'value' )
+    if isinstance( value, ( list, tuple ) ):
+        value1, value2 = value
+        return value1, value2
+
+    return value, None
+
+
+def filterShape( filters, childFilters ):
+    """The shape of a filter is everything except the values, requests that only differ
+       in the values share the same plan.
+    """
+    return ( tuple( ( itemAttr( item, 'column' ), itemAttr( item, 'operator' ) ) for item in filters or [] ),
+             tuple( ( itemAttr( child, 'table' ),
+                      itemAttr( child, 'foreignKey' ),
+                      filterShape( itemAttr( child, 'filters', [] ), itemAttr( child, 'childFilters', [] ) ) )
+                    for child in childFilters or [] ) )
+
+
+class FilterPlan( object ):
+    """Compiled filter, the column expressions, operators and join paths are resolved,
+       apply() only binds the values of the request.
+    """
+    def __init__( self, joins, steps, children ):
+        self.joins      = joins         # relationship attributes to outer join
+        self.steps      = steps         # tuple( index of the filter, column, operator function )
+        self.children   = children      # tuple( index of the child filter, class, onclause, FilterPlan )
+        return
+
+    def apply( self, query, filters, childFilters ):
+        for relationship in self.joins:
+            query = query.outerjoin( relationship )
+
+        for index, column, function in self.steps:
+            value1, value2 = filterValues( filters[ index ] )
+            API.app.logger.debug( "Filter {} {} / {}".format( column, value1, value2 ) )
+            query = query.filter( function( column, value1, value2 ) )
+
+        for index, childTableClass, onclause, plan in self.children:
+            childFilter = childFilters[ index ]
+            # join with child table based on foreign key
+            query = query.outerjoin( childTableClass, onclause )
+            # apply filters for child table
+            query = plan.apply( query,
+                                itemAttr( childFilter, 'filters', [] ),
+                                itemAttr( childFilter, 'childFilters', [] ) )
+
+        return query
+
+
+class FilterCompiler( object ):
+    """Compiles filter specifications into FilterPlan objects, the plans are kept
+       in a LRU keyed by the model class and the filter shape.
+    """
+    def __init__( self, maxsize = 256 ):
+        self._maxsize   = maxsize
+        self._plans     = OrderedDict()
+        self._lock      = threading.Lock()
+        self.hits       = 0
+        self.misses     = 0
+        return
+
+    def plan( self, model_cls, filters, childFilters ):
+        key = ( model_cls, filterShape( filters, childFilters ) )
+        with self._lock:
+            plan = self._plans.get( key )
+            if plan is not None:
+                self._plans.move_to_end( key )
+                self.hits += 1
+                return plan
+
+        plan = self.compile( model_cls, filters, childFilters )
+        with self._lock:
+            self.misses += 1
+            self._plans[ key ] = plan
+            while len( self._plans ) > self._maxsize:
+                self._plans.popitem( last = False )
+
+        return plan
+
+    def clear( self ):
+        with self._lock:
+            self._plans.clear()
+
+        return
+
+    def compile( self, model_cls, filters, childFilters ):
+        joins = []
+        steps = []
+        for index, item in enumerate( filters or [] ):
+            operator = itemAttr( item, 'operator' )
+            if operator is None:
+                continue
+
+            # if we have a nested relationship attribute, we split the column and
+            # access the attribute via joins
+            attributes = itemAttr( item, 'column' ).split( "." )
+            relatedClass = model_cls
+            for attribute in attributes[ : -1 ]:
+                relationship = getattr( relatedClass, attribute )
+                # identity check, == on an attribute builds a SQL expression
+                if not any( relationship is join for join in joins ):
+                    joins.append( relationship )
+
+                relatedClass = relationship.mapper.class_
+
+            column = getattr( relatedClass, attributes[ -1 ] )
+            function = OPERATORS.get( operator )
+            if function is not None:
+                steps.append( ( index, column, function ) )
+
+        children = []
+        for index, childFilter in enumerate( childFilters or [] ):
+            try:
+                childTableClass = self.tableClass( itemAttr( childFilter, 'table' ) )
+                foreignKey = itemAttr( childFilter, 'foreignKey' )
+                onclause = and_( getattr( model_cls, model_cls.__field_list__[ 0 ] ) == getattr( childTableClass, foreignKey ) )
+                children.append( ( index, childTableClass, onclause,
+                                   self.compile( childTableClass,
+                                                 itemAttr( childFilter, 'filters', [] ),
+                                                 itemAttr( childFilter, 'childFilters', [] ) ) ) )
+
+            except Exception as e:
+                API.logger.error( "Child filter not working, reason: " + str( e ) )
+                API.logger.error( traceback.format_exc() )
+
+        return FilterPlan( tuple( joins ), tuple( steps ), tuple( children ) )
+
+    @staticmethod
+    def tableClass( tablename ):
+        if tablename in API.tables_dict:
+            return API.tables_dict[ tablename ]
+
+        return { table.__tablename__: table for table in API.db.Model.__subclasses__() }[ tablename ]
+
+
+filterCompiler = FilterCompiler()
@@ -18,9 +18,16 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 #
 # import flask.json
+import io
 import json
 import decimal
 import datetime
+from flask import current_app, has_app_context
+try:
+    import orjson
+
+except ModuleNotFoundError:
+    orjson = None
 
 
 class WebAppJsonEncoder( json.JSONEncoder ):
@@ -73,3 +80,60 @@ class JsonEncoder( json.JSONEncoder ):
             pass
 
         return str( obj )
+
+
+_encoders = {}
+
+
+def jsonOptions():
+    """The encoder class and the key sorting of jsonify(), the json_encoder and
+       JSON_SORT_KEYS of the application (WebAppJsonEncoder, set by createApp()).
+    """
+    if has_app_context():
+        return current_app.json_encoder, current_app.config.get( 'JSON_SORT_KEYS', True )
+
+    return WebAppJsonEncoder, True
+
+
+def dumpsJson( obj ):
+    """Encode the object to JSON bytes, with the encoder and the key order of jsonify()
+       so the responses of both paths are the same. When orjson is installed it is used
+       as fast encoder, the other types are converted by the encoder of the application.
+    """
+    encoder, sortKeys = jsonOptions()
+    if orjson is not None:
+        if encoder not in _encoders:
+            _encoders[ encoder ] = encoder()
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sortKeys:
+            option |= orjson.OPT_SORT_KEYS
+
+        return orjson.dumps( obj, default = _encoders[ encoder ].default, option = option )
+
+    return json.dumps( obj, cls = encoder, sort_keys = sortKeys, separators = ( ',', ':' ) ).encode( 'utf-8' )
+
+
+def jsonEnvelope( name, rows, dump, **envelope ):
+    """Write the envelope object and the list of rows in one pass to a single buffer.
+
+    :param name:        key of the list in the envelope, e.g. 'records'.
+    :param rows:        iterable with the rows.
+    :param dump:        function to convert a row into a JSON serializable object.
+    :param envelope:    the other keys of the envelope.
+    :return:            JSON bytes.
+    """
+    buffer = io.BytesIO()
+    buffer.write( b'{' + dumpsJson( name ) + b':[' )
+    for index, row in enumerate( rows ):
+        if index:
+            buffer.write( b',' )
+
+        buffer.write( dumpsJson( dump( row ) ) )
+
+    buffer.write( b']' )
+    for key, value in envelope.items():
+        buffer.write( b',' + dumpsJson( key ) + b':' + dumpsJson( value ) )
+
+    buffer.write( b'}' )
+    return buffer.getvalue()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+import base64
+import datetime
+import dateutil.parser
+from sqlalchemy import and_, or_, tuple_
+from webapp2.common.jsonenc import JsonEncoder
+from webapp2.common.exceptions import InvalidRequestExecption
+
+
+NEXT        = 'next'
+PREVIOUS    = 'prev'
+
+# Dialects that support the row value comparison ( a, b ) > ( :a, :b )
+ROW_VALUE_DIALECTS = ( 'mysql', 'postgresql' )
+
+
+def encodeCursor( sortValue, keyValue, direction = NEXT ):
+    """Build the opaque cursor that is passed to the client.
+
+    :param sortValue:   value of the sort column of the boundary record.
+    :param keyValue:    value of the primary key of the boundary record.
+    :param direction:   NEXT or PREVIOUS.
+    :return:            url safe string.
+    """
+    data = json.dumps( [ sortValue, keyValue, direction ], cls = JsonEncoder )
+    return base64.urlsafe_b64encode( data.encode( 'utf-8' ) ).decode( 'ascii' )
+
+
+def decodeCursor( cursor ):
+    """Decode the cursor created by encodeCursor()
+
+    :return:            tuple( sortValue, keyValue, direction )
+    """
+    try:
+        sortValue, keyValue, direction = json.loads( base64.urlsafe_b64decode( cursor.encode( 'ascii' ) ) )
+
+    except Exception:
+        raise InvalidRequestExecption( "Invalid cursor '{}'".format( cursor ) )
+
+    if direction not in ( NEXT, PREVIOUS ):
+        raise InvalidRequestExecption( "Invalid cursor direction '{}'".format( direction ) )
+
+    return sortValue, keyValue, direction
+
+
+def coerceValue( column, value ):
+    """Convert the JSON value from the cursor back to the python type of the column,
+       dates are transported as strings.
+    """
+    if value is None:
+        return value
+
+    try:
+        python_type = column.type.python_type
+
+    except ( AttributeError, NotImplementedError ):
+        return value
+
+    if python_type is datetime.datetime and isinstance( value, str ):
+        return dateutil.parser.parse( value )
+
+    elif python_type is datetime.date and isinstance( value, str ):
+        return dateutil.parser.parse( value ).date()
+
+    return value
+
+
+def isNullable( column, attributes ):
+    """Can the sort column hold NULL values, a dotted relationship column is outer joined
+       and is NULL when there is no related record.
+    """
+    if len( attributes ) > 1:
+        return True
+
+    try:
+        return any( item.nullable for item in column.property.columns )
+
+    except AttributeError:
+        return True
+
+
+def keysetCondition( dialect, sortColumn, keyColumn, sortValue, keyValue, descending = False, nullable = False ):
+    """Build the seek condition ( sortcol, pk ) > ( :a, :b ) or < for descending order.
+       When the dialect doesn't support row values the condition is expanded.
+
+       With nullable the NULL values of the sort column follow the other values in
+       ascending order, see orderColumns(). The row value comparison alone would skip them.
+    """
+    if sortColumn is None:
+        return keyColumn < keyValue if descending else keyColumn > keyValue
+
+    if nullable and sortValue is None:
+        # the boundary record is one of the NULL values, the primary key decides
+        nulls = and_( sortColumn.is_( None ), keyColumn < keyValue if descending else keyColumn > keyValue )
+        return or_( sortColumn.isnot( None ), nulls ) if descending else nulls
+
+    if dialect in ROW_VALUE_DIALECTS:
+        left = tuple_( sortColumn, keyColumn )
+        right = tuple_( sortValue, keyValue )
+        condition = left < right if descending else left > right
+
+    elif descending:
+        condition = or_( sortColumn < sortValue, and_( sortColumn == sortValue, keyColumn < keyValue ) )
+
+    else:
+        condition = or_( sortColumn > sortValue, and_( sortColumn == sortValue, keyColumn > keyValue ) )
+
+    if nullable and not descending:
+        condition = or_( condition, sortColumn.is_( None ) )
+
+    return condition
+
+
+def orderColumns( sortColumn, keyColumn, descending = False, nullable = False ):
+    """The ORDER BY of keysetCondition(), with nullable the NULL values are ordered
+       explicitly ( sortcol IS NULL ), the default differs between the databases.
+    """
+    columns = []
+    if sortColumn is not None:
+        if nullable:
+            columns.append( sortColumn.is_( None ) )
+
+        columns.append( sortColumn )
+
+    columns.append( keyColumn )
+    return [ column.desc() if descending else column for column in columns ]
+
+
+def position( sortValue, keyValue ):
+    """The order of orderColumns() as python sort key, None is never compared with a value.
+    """
+    return ( sortValue is None, sortValue, keyValue )
+
+
+def getRecordValue( record, attributes ):
+    """Get the (nested) value from the record, for dotted relationship columns.
+    """
+    for attribute in attributes:
+        if record is None:
+            return None
+
+        # the archived records are dicts
+        record = record.get( attribute ) if isinstance( record, dict ) else getattr( record, attribute, None )
+
+    return record
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+TABLE       = 'locking'
+# LONGTEXT on MySQL, the type of the former l_user and l_table columns
+LONGTEXT    = sa.Text().with_variant( mysql.LONGTEXT(), 'mysql' )
+
+
+def removeDuplicateLocks( connection, table = TABLE ):
+    """Delete all but the newest lock (highest l_id) of each record, the unique
+       index on ( l_table, l_record_id ) cannot be created with duplicate rows.
+
+       :return:     number of deleted rows.
+    """
+    # MySQL doesn't allow the table of a DELETE in a subquery, the grouped derived
+    # table is materialized first
+    result = connection.execute( sa.text( "DELETE FROM {0} WHERE l_id NOT IN "
+                                          "( SELECT l_id FROM ( SELECT MAX( l_id ) AS l_id FROM {0} "
+                                          "GROUP BY l_table, l_record_id ) newest )".format( table ) ) )
+    return result.rowcount
+
+
+def upgrade():
+    """The locking table of the record leases; l_user and l_table from LONGTEXT to
+       VARCHAR( 128 ) and VARCHAR( 64 ), which MySQL can index, the l_expire_date
+       column and the indexes locking_table_record (unique) and locking_expire.
+
+       A revision of the application calls this function:
+
+           from webapp2.common.locking import migration
+
+           def upgrade():
+               migration.upgrade()
+
+           def downgrade():
+               migration.downgrade()
+
+       Before the unique index is created the duplicate locks of a record, which the
+       former lock() could insert, are removed; only the newest lock of a record is
+       kept. The locks are transient, at worst a user locks the record again. Run the
+       upgrade with the application stopped. On MySQL in strict mode the conversion
+       fails when l_user has values longer than 128 characters, these rows must be
+       removed first (DELETE FROM locking WHERE CHAR_LENGTH( l_user ) > 128).
+    """
+    from alembic import op
+    removeDuplicateLocks( op.get_bind() )
+    with op.batch_alter_table( TABLE ) as batch:
+        batch.alter_column( 'l_user', existing_type = LONGTEXT, type_ = sa.String( 128 ), existing_nullable = False )
+        batch.alter_column( 'l_table', existing_type = LONGTEXT, type_ = sa.String( 64 ), existing_nullable = False )
+        batch.add_column( sa.Column( 'l_expire_date', sa.DateTime(), nullable = True ) )
+        batch.create_index( 'locking_table_record', [ 'l_table', 'l_record_id' ], unique = True )
+        batch.create_index( 'locking_expire', [ 'l_expire_date' ] )
+
+    return
+
+
+def downgrade():
+    from alembic import op
+    with op.batch_alter_table( TABLE ) as batch:
+        batch.drop_index( 'locking_expire' )
+        batch.drop_index( 'locking_table_record' )
+        batch.drop_column( 'l_expire_date' )
+        batch.alter_column( 'l_table', existing_type = sa.String( 64 ), type_ = LONGTEXT, existing_nullable = False )
+        batch.alter_column( 'l_user', existing_type = sa.String( 128 ), type_ = LONGTEXT, existing_nullable = False )
+
+    return
@@ -29,13 +29,19 @@ class RecordLocks( API.db.Model, CrudModelMixin ):
     """Model for the locking table, this is generated by the gencrud.py module
     When modifing the file make sure that you remove the table from the configuration.
     """
-    __field_list__       = ['L_ID', 'L_USER', 'L_TABLE', 'L_RECORD_ID', 'L_START_DATE']
+    __field_list__       = ['L_ID', 'L_USER', 'L_TABLE', 'L_RECORD_ID', 'L_START_DATE', 'L_EXPIRE_DATE']
     __tablename__        = 'locking'
+    __tracking__         = False
+    # One lock per record, the index serves the lock checks on ( table, record_id )
+    # the expire index serves the reaper
+    __table_args__       = ( API.db.Index( 'locking_table_record', 'l_table', 'l_record_id', unique = True ),
+                             API.db.Index( 'locking_expire', 'l_expire_date' ) )
     L_ID                 = API.db.Column( "l_id", API.db.Integer, autoincrement = True, primary_key = True )
-    L_USER               = API.db.Column( "l_user", API.db.LONGTEXT, nullable = False )
-    L_TABLE              = API.db.Column( "l_table", API.db.LONGTEXT, nullable = False )
+    L_USER               = API.db.Column( "l_user", API.db.String( 128 ), nullable = False )
+    L_TABLE              = API.db.Column( "l_table", API.db.String( 64 ), nullable = False )
     L_RECORD_ID          = API.db.Column( "l_record_id", API.db.Integer, nullable = False )
     L_START_DATE         = API.db.Column( "l_start_date", API.db.DateTime, nullable = False )
+    L_EXPIRE_DATE        = API.db.Column( "l_expire_date", API.db.DateTime, nullable = True )
 
 
     def memoryInstance( self ):
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import time
+import threading
+import traceback
+from datetime import datetime
+from sqlalchemy import select
+import webapp2.api as API
+from webapp2.common.locking.registry import lockRegistry
+
+
+class LockReaper( object ):
+    """Background thread that deletes the expired leases from the locking table.
+
+    The rows are deleted in batches of LOCK_REAPER_BATCH by primary key, so a large
+    number of orphan locks doesn't hold the table for a long time. The thread runs
+    every LOCK_REAPER_INTERVAL seconds, 0 disables the reaper.
+
+    The thread is created by start(), so the reaper can be started again after
+    stop() or by a second registerApi().
+    """
+    def __init__( self ):
+        self._thread        = None
+        self._stop_event    = threading.Event()
+        self.interval       = 60
+        self.batch          = 500
+        self.reaped         = 0
+        return
+
+    def configure( self ):
+        self.interval   = int( API.app.config.get( 'LOCK_REAPER_INTERVAL', 60 ) )
+        self.batch      = int( API.app.config.get( 'LOCK_REAPER_BATCH', 500 ) )
+        return self.interval > 0 and int( API.app.config.get( 'LOCK_LEASE_TIME', 300 ) ) > 0
+
+    def is_alive( self ):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start( self ):
+        if self.is_alive():
+            return
+
+        self._stop_event    = threading.Event()
+        self._thread        = threading.Thread( target = self.run, args = ( self._stop_event, ), name = 'lock-reaper', daemon = True )
+        self._thread.start()
+        return
+
+    def stop( self, timeout = None ):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join( timeout )
+            self._thread = None
+
+        return
+
+    def run( self, stop_event ):
+        API.app.logger.info( 'Lock reaper started, interval {} seconds'.format( self.interval ) )
+        while not stop_event.wait( self.interval ):
+            try:
+                with API.app.app_context():
+                    count = self.reap()
+
+                if count > 0:
+                    API.app.logger.info( 'Lock reaper removed {} expired locks'.format( count ) )
+
+            except Exception:
+                API.app.logger.error( traceback.format_exc() )
+
+        return
+
+    def reap( self ):
+        from webapp2.common.locking.model import RecordLocks
+        table = RecordLocks.__table__
+        now = datetime.utcnow()
+        count = 0
+        while True:
+            with API.db.engine.begin() as connection:
+                # MySQL doesn't allow a LIMIT in a subquery of a DELETE on the same table,
+                # therefore the ids are selected first.
+                ids = [ row[ 0 ] for row in connection.execute( select( [ table.c.l_id ] ).
+                                                                where( table.c.l_expire_date <= now ).
+                                                                limit( self.batch ) ) ]
+                if len( ids ) > 0:
+                    connection.execute( table.delete().where( table.c.l_id.in_( ids ) ) )
+
+            count += len( ids )
+            if len( ids ) < self.batch:
+                break
+
+            # give the other writers on the table some room
+            time.sleep( 0.01 )
+
+        lockRegistry.purge( now )
+        self.reaped += count
+        return count
+
+
+lockReaper = LockReaper()
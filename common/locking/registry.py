@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import threading
+import traceback
+from datetime import datetime
+from flask import has_app_context
+from sqlalchemy import select
+import webapp2.api as API
+
+
+class LockRegistry( object ):
+    """In-process map of the record locks, { table: { record_id: ( user, expire ) } }.
+
+    When enabled (LOCK_MEMORY_MAP in the configuration) the map is loaded from the
+    locking table at startup and kept in sync by RecordLock.lock() and RecordLock.unlock(),
+    so the lock check doesn't need a database round trip. The map only sees the locks
+    of its own process, therefore it may only be enabled when a single process serves
+    the application.
+    """
+    def __init__( self ):
+        self._locks     = {}
+        self._lock      = threading.Lock()
+        self._stale     = False
+        self.enabled    = False
+        return
+
+    @staticmethod
+    def key( record_id ):
+        """The key of a record in the map, the same key for the integer of the locking
+           table and the (string) id of a request.
+        """
+        try:
+            return int( record_id )
+
+        except ( TypeError, ValueError ):
+            return str( record_id )
+
+    def load( self ):
+        self.enabled = bool( API.app.config.get( 'LOCK_MEMORY_MAP', False ) )
+        if not self.enabled:
+            return
+
+        if has_app_context():
+            self._load()
+
+        else:
+            with API.app.app_context():
+                self._load()
+
+        return
+
+    def _load( self ):
+        """Read the locking table through the engine, the session of the current request
+           is not touched.
+        """
+        from webapp2.common.locking.model import RecordLocks
+        table = RecordLocks.__table__
+        try:
+            locks = {}
+            for lock_table, record_id, user, expire in API.db.engine.execute( select( [ table.c.l_table,
+                                                                                      table.c.l_record_id,
+                                                                                      table.c.l_user,
+                                                                                      table.c.l_expire_date ] ) ):
+                locks.setdefault( lock_table, {} )[ self.key( record_id ) ] = ( user, expire )
+
+            with self._lock:
+                self._locks = locks
+                self._stale = False
+
+            API.app.logger.info( 'Lock registry loaded with {} locks'.format( sum( len( table ) for table in locks.values() ) ) )
+
+        except Exception:
+            API.app.logger.error( traceback.format_exc() )
+            self.enabled = False
+
+        return
+
+    def invalidate( self ):
+        """The locking table was changed outside RecordLock, reload before the next check.
+        """
+        self._stale = True
+        return
+
+    def add( self, table, record_id, user, expire = None ):
+        if self.enabled:
+            with self._lock:
+                self._locks.setdefault( table, {} )[ self.key( record_id ) ] = ( user, expire )
+
+        return
+
+    def remove( self, table, record_id, user = None ):
+        """Remove the lock, when user is given only when it is owned by that user.
+        """
+        if self.enabled:
+            with self._lock:
+                locks = self._locks.get( table, {} )
+                key = self.key( record_id )
+                if key in locks and user in ( None, locks[ key ][ 0 ] ):
+                    del locks[ key ]
+
+        return
+
+    def purge( self, now = None ):
+        """Remove the expired leases, called by the reaper.
+        """
+        if self.enabled:
+            now = now or datetime.utcnow()
+            with self._lock:
+                for locks in self._locks.values():
+                    for record_id in [ record_id for record_id, ( user, expire ) in locks.items()
+                                       if expire is not None and expire <= now ]:
+                        del locks[ record_id ]
+
+        return
+
+    def lockedRecords( self, table, ids, user ):
+        """Same as RecordLock.lockedRecords(), the records locked by other users.
+        """
+        if self._stale:
+            self._load()
+
+        now = datetime.utcnow()
+        result = {}
+        with self._lock:
+            locks = self._locks.get( table, {} )
+            for record_id in ids:
+                lock_user, expire = locks.get( self.key( record_id ), ( user, None ) )
+                if lock_user != user and ( expire is None or expire > now ):
+                    result[ record_id ] = lock_user
+
+        return result
+
+
+lockRegistry = LockRegistry()
@@ -32,6 +32,7 @@ class RecordLocksSchema( API.mm.SQLAlchemySchema ):
     L_TABLE    = fields.String()
     L_RECORD_ID    = fields.Integer()
     L_START_DATE    = fields.DateTime()
+    L_EXPIRE_DATE    = fields.DateTime( allow_none = True )
 
     @post_dump
     def post_dump_process( self, in_data, **kwargs ):
@@ -40,6 +41,8 @@ class RecordLocksSchema( API.mm.SQLAlchemySchema ):
     @pre_load
     def pre_load_process( self, out_data, **kwargs ):
         out_data[ 'L_START_DATE' ] = utcDateString2Local( out_data[ 'L_START_DATE' ], '%Y-%m-%d %H:%M:%S' )
+        if out_data.get( 'L_EXPIRE_DATE' ) not in ( None, '' ):
+            out_data[ 'L_EXPIRE_DATE' ] = utcDateString2Local( out_data[ 'L_EXPIRE_DATE' ], '%Y-%m-%d %H:%M:%S' )
         return out_data
 
 
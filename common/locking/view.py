@@ -25,6 +25,8 @@ import traceback
 from webapp2.common.locking.model import RecordLocks
 from webapp2.common.locking.schema import RecordLocksSchema
 from webapp2.common.locking.mixin import RecordLocksViewMixin
+from webapp2.common.locking.registry import lockRegistry
+from webapp2.common.locking.reaper import lockReaper
 
 
 lockingApi = Blueprint( 'lockingApi', __name__ )
@@ -35,6 +37,10 @@ def registerApi( *args ):
     # Set the logger for the users module
     API.app.logger.info( 'Register RecordLocks routes' )
     API.app.register_blueprint( lockingApi )
+    lockRegistry.load()
+    if lockReaper.configure():
+        lockReaper.start()
+
     try:
         import webapp2.common.locking.entry_points  as EP
         if hasattr( EP, 'entryPointApi' ):
@@ -86,6 +92,12 @@ class RecordLocksCurdInterface( CrudInterface, RecordLocksViewMixin ):
 
         return record
 
+    def deleteCache( self ):
+        # Lock records were changed through the CRUD interface, reload the lock map
+        lockRegistry.invalidate()
+
+        return CrudInterface.deleteCache( self )
+
 
 locking = RecordLocksCurdInterface()
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+import hashlib
+import functools
+import threading
+import traceback
+from flask import request, Response
+from flask_jwt_extended import get_jwt_identity
+import webapp2.api as API
+from webapp2.common.cachegen import tableGenerations, filterSignature
+
+
+class ResponseCache( object ):
+    """Cache for the serialized responses of the CrudInterface read methods.
+
+    The key is a hash of the route, the normalized request body, the user, the
+    session options (HTTP_X_ACME_SYSENV header) and the generations of the tables
+    the request depends on. The cache holds the response bytes, so a hit doesn't
+    query the database nor serialize the records again.
+    """
+    PREFIX  = 'webapp2.resp.'
+
+    def __init__( self ):
+        self._stats = {}
+        self._lock  = threading.Lock()
+        return
+
+    def _count( self, route, name ):
+        with self._lock:
+            stats = self._stats.setdefault( route, { 'hit': 0, 'miss': 0 } )
+            stats[ name ] += 1
+
+        return
+
+    def stats( self ):
+        with self._lock:
+            return { route: dict( stats ) for route, stats in self._stats.items() }
+
+    @staticmethod
+    def user():
+        try:
+            return get_jwt_identity()
+
+        except Exception:
+            return None
+
+    @staticmethod
+    def options():
+        try:
+            return json.loads( request.headers.environ[ 'HTTP_X_ACME_SYSENV' ] )
+
+        except Exception:
+            return None
+
+    def key( self, route, body, tables ):
+        signature = filterSignature( route, body, self.user(), self.options() )
+        return "{}{}.{}.{}".format( self.PREFIX,
+                                    route,
+                                    tableGenerations.key( tables ),
+                                    hashlib.sha1( signature.encode( 'utf-8' ) ).hexdigest() )
+
+    def memoize( self, timeout = None ):
+        """Decorator for the CrudInterface read methods, called as method( self, body ).
+           The tables the result depends on are taken from self.bodyTables( body ).
+        """
+        def decorator( func ):
+            @functools.wraps( func )
+            def wrapper( interface, body ):
+                # The authentication must be verified before a cached response is served.
+                interface.checkAuthentication()
+                route = "{}/{}".format( interface._uri, func.__name__ )
+                key = self.key( route, body, interface.bodyTables( body ) )
+                try:
+                    entry = API.cache.get( key )
+
+                except Exception:
+                    entry = None
+
+                if entry is not None:
+                    self._count( route, 'hit' )
+                    data, mimetype = entry
+                    return Response( data, mimetype = mimetype )
+
+                self._count( route, 'miss' )
+                result = func( interface, body )
+                if isinstance( result, Response ) and result.status_code == 200 and not result.is_streamed:
+                    try:
+                        API.cache.set( key,
+                                       ( result.get_data(), result.mimetype ),
+                                       timeout = getattr( interface, '_cacheTimeout', timeout ) )
+
+                    except Exception:
+                        API.logger.error( traceback.format_exc() )
+
+                return result
+
+            return wrapper
+
+        return decorator
+
+
+responseCache = ResponseCache()
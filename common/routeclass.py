@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+from flask import request, has_request_context, current_app
+
+
+STATIC          = 'static'
+READ            = 'read'
+WRITE           = 'write'
+READ_METHODS    = ( 'GET', 'HEAD', 'OPTIONS' )
+
+
+class RouteClasses( object ):
+    """The class of each endpoint, STATIC (angular sources and assets), READ or WRITE.
+
+    The class is set when the route is registered, through CrudInterface.registerRoute()
+    and the routeClass() decorator of the blueprint routes. The request hooks (commit,
+    tracking) ask the class of the current request and return at once for the classes
+    they don't handle.
+    """
+    def __init__( self ):
+        self._classes = {}
+        return
+
+    @staticmethod
+    def fromMethods( methods ):
+        """A route with only GET, HEAD or OPTIONS methods is READ, otherwise WRITE.
+        """
+        if methods is None or all( method.upper() in READ_METHODS for method in methods ):
+            return READ
+
+        return WRITE
+
+    def register( self, endpoint, route_class ):
+        self._classes[ endpoint ] = route_class
+        return
+
+    def get( self, endpoint, default = None ):
+        return self._classes.get( endpoint, default )
+
+    def requestClass( self ):
+        """The class of the current request, an endpoint without a class is derived
+           from the request method.
+        """
+        if not has_request_context():
+            return WRITE
+
+        route_class = self._classes.get( request.endpoint )
+        if route_class is None:
+            view = current_app.view_functions.get( request.endpoint )
+            route_class = getattr( view, 'route_class', None )
+
+        if route_class is None:
+            route_class = READ if request.method in READ_METHODS else WRITE
+
+        return route_class
+
+    def items( self ):
+        return sorted( self._classes.items() )
+
+
+routeClasses = RouteClasses()
+
+
+def routeClass( route_class ):
+    """Decorator to set the class of a blueprint route, it must be placed below the
+       route decorator as the function is tagged before the route is added;
+
+        @bluePrint.route( '/' )
+        @routeClass( STATIC )
+        def index():
+    """
+    def wrapper( function ):
+        function.route_class = route_class
+        return function
+
+    return wrapper
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+import math
+import decimal
+import datetime
+import sqlalchemy.sql.sqltypes as SQLTYPES
+from webapp2.common.jsonenc import JsonEncoder
+
+
+MYSQL_ESCAPES = str.maketrans( { '\\':   '\\\\',
+                                 '\0':   '\\0',
+                                 '\n':   '\\n',
+                                 '\r':   '\\r',
+                                 '\x1a': '\\Z' } )
+
+
+def backslashEscapes( dialect ):
+    # MySQL treats the backslash as escape character, unless NO_BACKSLASH_ESCAPES is set
+    return dialect is not None and dialect.name == 'mysql' and getattr( dialect, '_backslash_escapes', True )
+
+
+def textLiteral( dialect ):
+    escapes = backslashEscapes( dialect )
+
+    def literal( value ):
+        if not isinstance( value, str ):
+            value = str( value )
+
+        if escapes:
+            value = value.translate( MYSQL_ESCAPES )
+
+        return "'{}'".format( value.replace( "'", "''" ) )
+
+    return literal
+
+
+def binaryLiteral( dialect ):
+    if dialect is not None and dialect.name == 'postgresql':
+        return lambda value: "'\\x{}'::bytea".format( bytes( value ).hex() )
+
+    return lambda value: "X'{}'".format( bytes( value ).hex() )
+
+
+def booleanLiteral( dialect ):
+    if dialect is not None and dialect.name in ( 'mysql', 'sqlite', 'mssql' ):
+        return lambda value: '1' if value else '0'
+
+    return lambda value: 'TRUE' if value else 'FALSE'
+
+
+def numberLiteral( dialect ):
+    def literal( value ):
+        # NaN and infinity have no SQL literal, they are written as NULL
+        if isinstance( value, float ):
+            return repr( value ) if math.isfinite( value ) else 'NULL'
+
+        if isinstance( value, decimal.Decimal ) and not value.is_finite():
+            return 'NULL'
+
+        return str( value )
+
+    return literal
+
+
+def naiveUtc( value ):
+    """A datetime or time with a timezone to UTC without tzinfo, the DATETIME and
+       TIME columns of MySQL reject the +hh:mm offset.
+    """
+    if value.utcoffset() is None:
+        return value
+
+    if isinstance( value, datetime.datetime ):
+        return value.astimezone( datetime.timezone.utc ).replace( tzinfo = None )
+
+    moment = datetime.datetime.combine( datetime.date( 2000, 1, 1 ), value )
+    return ( moment.replace( tzinfo = None ) - moment.utcoffset() ).time()
+
+
+def temporalLiteral( dialect ):
+    text = textLiteral( dialect )
+
+    def literal( value ):
+        if isinstance( value, datetime.datetime ):
+            return text( naiveUtc( value ).isoformat( ' ' ) )
+
+        if isinstance( value, datetime.time ):
+            return text( naiveUtc( value ).isoformat() )
+
+        return text( value.isoformat() )
+
+    return literal
+
+
+def jsonLiteral( dialect ):
+    text = textLiteral( dialect )
+    return lambda value: text( json.dumps( value, cls = JsonEncoder ) )
+
+
+# Column type to the literal of a value, checked in this order
+TYPE_LITERALS = ( ( SQLTYPES.Boolean,       booleanLiteral ),
+                  ( SQLTYPES.Integer,       numberLiteral ),
+                  ( SQLTYPES.Numeric,       numberLiteral ),
+                  ( SQLTYPES.DateTime,      temporalLiteral ),
+                  ( SQLTYPES.Date,          temporalLiteral ),
+                  ( SQLTYPES.Time,          temporalLiteral ),
+                  ( SQLTYPES._Binary,       binaryLiteral ),
+                  ( SQLTYPES.JSON,          jsonLiteral ) )
+
+
+def literalProcessor( column, dialect = None ):
+    """The function that renders a value of the column as SQL literal, chosen once
+       per column type. The String literal processor of SQLAlchemy does not escape
+       the backslash for MySQL, therefore the text literals are done here.
+    """
+    literal = textLiteral( dialect )
+    for column_type, factory in TYPE_LITERALS:
+        if isinstance( column.type, column_type ):
+            literal = factory( dialect )
+            break
+
+    def processor( value ):
+        return 'NULL' if value is None else literal( value )
+
+    return processor
+
+
+def quoteName( name, dialect = None ):
+    if dialect is None:
+        return name
+
+    return dialect.identifier_preparer.quote( name )
+
+
+class InsertWriter( object ):
+    """Renders the extended INSERT statement of a table, a statement for many rows;
+
+        INSERT INTO table ( column, ... ) VALUES
+        ( value, ... ),
+        ( value, ... );
+
+    Each row is on its own line, the text literals don't span lines when the
+    dialect has backslash escapes.
+    """
+    def __init__( self, table, columns, dialect = None ):
+        self.processors = [ literalProcessor( column, dialect ) for column in columns ]
+        self.prefix = "INSERT INTO {} ( {} ) VALUES\n".format( quoteName( table, dialect ),
+                                                               ", ".join( quoteName( column.name, dialect )
+                                                                          for column in columns ) )
+        return
+
+    def row( self, values ):
+        return "( {} )".format( ", ".join( processor( value ) for processor, value in zip( self.processors, values ) ) )
+
+    def statement( self, rows ):
+        return self.prefix + ",\n".join( self.row( values ) for values in rows ) + ";\n"
+
+    def insert( self, values ):
+        """The INSERT statement of one row on one line, without the terminating
+           semicolon (as CrudModelMixin.toSql() always returned it).
+        """
+        return "{} {}".format( self.prefix.rstrip( '\n' ), self.row( values ) )
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Main webapp application package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import os
+import re
+import time
+import hashlib
+import mimetypes
+import threading
+import traceback
+from flask import request, current_app, send_file
+import webapp2.api as API
+
+
+# Preferred order of the precompressed siblings, made by the Angular build (or a post build step)
+ENCODINGS       = ( ( 'br', '.br' ), ( 'gzip', '.gz' ) )
+IMMUTABLE_AGE   = 31536000
+
+
+class StaticFile( object ):
+    """A file of the Angular dist folder with the information to answer a request
+       without looking at the filesystem.
+    """
+    __slots__ = ( 'name', 'path', 'size', 'mtime', 'digest', 'mimetype', 'immutable', 'encodings', 'content' )
+
+    def __init__( self, name, path, immutable, memory_limit = 0 ):
+        stat            = os.stat( path )
+        self.name       = name
+        self.path       = path
+        self.size       = stat.st_size
+        self.mtime      = stat.st_mtime
+        self.immutable  = immutable
+        self.mimetype   = mimetypes.guess_type( name )[ 0 ] or 'application/octet-stream'
+        self.digest     = self.hash( path )
+        self.encodings  = {}
+        for encoding, extension in ENCODINGS:
+            if os.path.isfile( path + extension ):
+                self.encodings[ encoding ] = path + extension
+
+        # small files are kept in memory, per encoding ( None is the file itself )
+        self.content = {}
+        if self.size <= memory_limit:
+            for encoding, filename in [ ( None, path ) ] + list( self.encodings.items() ):
+                with open( filename, 'rb' ) as stream:
+                    self.content[ encoding ] = stream.read()
+
+        return
+
+    @staticmethod
+    def hash( path ):
+        digest = hashlib.sha1()
+        with open( path, 'rb' ) as stream:
+            for block in iter( lambda: stream.read( 65536 ), b'' ):
+                digest.update( block )
+
+        return digest.hexdigest()
+
+    def etag( self, encoding = None ):
+        """Each encoding is a different representation, so it has its own strong ETag.
+        """
+        return self.digest if encoding is None else '{}-{}'.format( self.digest, encoding )
+
+
+class StaticManifest( object ):
+    """Manifest of the Angular dist folder, built once by registerAngular().
+
+    The files with a content hash in the name (main.3f2a1b9c8d7e6f5a.js) are sent with
+    'Cache-Control: immutable', the others (index.html, assets) are revalidated with
+    their ETag. A matching If-None-Match is answered with a 304 from the manifest. The
+    files up to ANGULAR_MEMORY_LIMIT bytes are sent from memory, the larger files with
+    send_file(), so USE_X_SENDFILE or the wsgi.file_wrapper of the server is used.
+    """
+    HASHED      = re.compile( r'\.[0-9a-f]{16,}\.', re.IGNORECASE )
+
+    def __init__( self ):
+        self.folder         = None
+        self.memoryLimit    = 0
+        self._files         = {}
+        self._signature     = None
+        self._thread        = None
+        return
+
+    @staticmethod
+    def resolve( folder ):
+        # the same as send_from_directory(), relative to the application root
+        if not os.path.isabs( folder ):
+            folder = os.path.join( API.app.root_path, folder )
+
+        return os.path.normpath( folder )
+
+    def build( self, folder, memory_limit = None ):
+        folder = self.resolve( folder )
+        if memory_limit is not None:
+            self.memoryLimit = memory_limit
+
+        signature = self.signature( folder )
+        files = {}
+        if os.path.isdir( folder ):
+            for dirpath, _, filenames in os.walk( folder ):
+                for filename in filenames:
+                    base, extension = os.path.splitext( filename )
+                    if extension in ( '.gz', '.br' ) and base in filenames:
+                        continue
+
+                    path = os.path.join( dirpath, filename )
+                    name = os.path.relpath( path, folder ).replace( os.sep, '/' )
+                    files[ name ] = StaticFile( name, path,
+                                                self.HASHED.search( filename ) is not None,
+                                                self.memoryLimit )
+
+        self.folder = folder
+        self._files = files
+        self._signature = signature
+        API.app.logger.info( "Angular manifest {}: {} files".format( folder, len( files ) ) )
+        return
+
+    def get( self, name ):
+        return self._files.get( name )
+
+    @staticmethod
+    def signature( folder ):
+        """The number of files and the latest modification, only stat() calls.
+        """
+        count, latest = 0, 0
+        for dirpath, dirnames, filenames in os.walk( folder ):
+            latest = max( latest, os.stat( dirpath ).st_mtime )
+            for filename in filenames:
+                count += 1
+                latest = max( latest, os.stat( os.path.join( dirpath, filename ) ).st_mtime )
+
+        return count, latest
+
+    def watch( self, interval = 2.0 ):
+        """Poll the dist folder and rebuild the manifest when 'ng build' rewrote it,
+           for the development mode.
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread( target = self.run, args = ( interval, ), name = 'angular-watcher', daemon = True )
+        self._thread.start()
+        API.app.logger.info( "Watching the Angular dist folder {} every {} seconds".format( self.folder, interval ) )
+        return
+
+    def run( self, interval ):
+        while True:
+            time.sleep( interval )
+            try:
+                signature = self.signature( self.folder )
+                if signature == self._signature:
+                    continue
+
+                # wait until the build is done writing
+                time.sleep( interval )
+                if signature == self.signature( self.folder ):
+                    self.build( self.folder )
+
+            except Exception:
+                API.app.logger.error( traceback.format_exc() )
+
+        return
+
+    def __len__( self ):
+        return len( self._files )
+
+    @staticmethod
+    def encoding( static_file ):
+        for encoding in static_file.encodings:
+            if request.accept_encodings[ encoding ] > 0:
+                return encoding
+
+        return None
+
+    def send( self, name ):
+        """The response for the file, or None when the file is not in the manifest.
+        """
+        static_file = self._files.get( name )
+        if static_file is None:
+            return None
+
+        encoding = self.encoding( static_file )
+        etag = static_file.etag( encoding )
+        max_age = IMMUTABLE_AGE if static_file.immutable else 0
+        if request.if_none_match.contains( etag ):
+            response = current_app.response_class( status = 304 )
+
+        elif encoding in static_file.content:
+            response = current_app.response_class( static_file.content[ encoding ], mimetype = static_file.mimetype )
+            response.last_modified = static_file.mtime
+            response.cache_control.max_age = max_age
+            if encoding is not None:
+                response.headers[ 'Content-Encoding' ] = encoding
+
+        else:
+            response = send_file( static_file.encodings.get( encoding, static_file.path ),
+                                  mimetype = static_file.mimetype,
+                                  add_etags = False,
+                                  cache_timeout = max_age )
+            if encoding is not None:
+                response.headers[ 'Content-Encoding' ] = encoding
+
+        response.set_etag( etag )
+        if static_file.immutable:
+            response.headers[ 'Cache-Control' ] = 'public, max-age={}, immutable'.format( max_age )
+
+        else:
+            response.headers[ 'Cache-Control' ] = 'no-cache'
+
+        if len( static_file.encodings ) > 0:
+            response.vary.add( 'Accept-Encoding' )
+
+        return response
+
+
+staticManifest = StaticManifest()
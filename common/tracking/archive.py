@@ -0,0 +1,242 @@
+import os
+import re
+import gzip
+import json
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, Table, Index, select, and_
+from sqlalchemy.engine.reflection import Inspector
+import webapp2.api as API
+from webapp2.common.jsonenc import JsonEncoder
+from webapp2.common.tracking.model import Tracking
+
+
+class TrackingArchive( object ):
+    """Moves the tracking records older than the hot window to monthly archives.
+
+    The policy is taken from the configuration:
+
+        TRACKING_HOT_DAYS           days that stay in the tracking table (default 90).
+        TRACKING_ARCHIVE_MODE       'table' for the tables tracking_YYYYMM, or 'file' for
+                                    the files tracking-YYYYMM.ndjson.gz (default 'table').
+        TRACKING_ARCHIVE_FOLDER     folder of the archive files.
+        TRACKING_ARCHIVE_CHUNK      records moved per transaction (default 5000).
+        TRACKING_RETENTION_MONTHS   months the archives are kept, 0 keeps them forever.
+
+    The records are moved in chunks, per chunk the archive is written first and then
+    the records are deleted from the tracking table.
+
+    The archive tables have the indexes of the tracking table, so the history of a
+    record is an index lookup per month. The archive files have no index, a search
+    decompresses and scans every file from the month of 'since' onwards; use the
+    file mode for cold data that is rarely searched.
+    """
+    TABLE_PATTERN   = re.compile( r'^tracking_(\d{6})$' )
+    FILE_PATTERN    = re.compile( r'^tracking-(\d{6})\.ndjson\.gz$' )
+
+    def __init__( self ):
+        self._tables = {}
+        self._columns = [ ( prop.key, prop.columns[ 0 ].key ) for prop in Tracking.__mapper__.column_attrs ]
+        return
+
+    @property
+    def hotDays( self ):
+        return int( API.app.config.get( 'TRACKING_HOT_DAYS', 90 ) )
+
+    @property
+    def mode( self ):
+        return API.app.config.get( 'TRACKING_ARCHIVE_MODE', 'table' )
+
+    @property
+    def folder( self ):
+        return API.app.config.get( 'TRACKING_ARCHIVE_FOLDER', os.path.join( 'archive', 'tracking' ) )
+
+    @property
+    def chunk( self ):
+        return int( API.app.config.get( 'TRACKING_ARCHIVE_CHUNK', 5000 ) )
+
+    @property
+    def retention( self ):
+        return int( API.app.config.get( 'TRACKING_RETENTION_MONTHS', 0 ) )
+
+    def cutoff( self, days = None ):
+        return datetime.utcnow() - timedelta( days = self.hotDays if days is None else days )
+
+    def isArchived( self, since ):
+        """True when the date lies before the hot window, so the archive must be searched.
+        """
+        return since is not None and since < self.cutoff()
+
+    @staticmethod
+    def month( value ):
+        return value.strftime( '%Y%m' )
+
+    def archiveTable( self, month ):
+        """The archive table of the month, with the same columns and indexes as the tracking table.
+        """
+        name = 'tracking_{}'.format( month )
+        if name not in self._tables:
+            metadata = MetaData()
+            table = Table( name, metadata, *[ column.copy() for column in Tracking.__table__.columns ] )
+            for index in Tracking.__table__.indexes:
+                # the index names are unique per database, the month is appended
+                Index( '{}_{}'.format( index.name, month ),
+                       *[ table.c[ column.name ] for column in index.columns ],
+                       unique = index.unique,
+                       **index.dialect_kwargs )
+
+            inspector = Inspector.from_engine( API.db.engine )
+            if name in inspector.get_table_names():
+                # archive table of an older release, add the missing indexes
+                existing = set( index[ 'name' ] for index in inspector.get_indexes( name ) )
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create( API.db.engine )
+
+            else:
+                table.create( API.db.engine )
+
+            self._tables[ name ] = table
+
+        return self._tables[ name ]
+
+    def archiveFile( self, month ):
+        return os.path.join( self.folder, 'tracking-{}.ndjson.gz'.format( month ) )
+
+    def toRecord( self, row ):
+        """Core row (column keys) to a dict with the attribute names of the model.
+        """
+        return { attribute: row[ column ] for attribute, column in self._columns }
+
+    def archive( self, cutoff = None, mode = None, chunk = None, progress = None ):
+        """Move the records older than the cutoff to the archive.
+
+        :return:    number of records moved.
+        """
+        cutoff  = cutoff or self.cutoff()
+        mode    = mode or self.mode
+        chunk   = chunk or self.chunk
+        table   = Tracking.__table__
+        if mode == 'file':
+            os.makedirs( self.folder, exist_ok = True )
+
+        moved = 0
+        while True:
+            with API.db.engine.begin() as connection:
+                rows = connection.execute( select( [ table ] ).
+                                           where( table.c.t_change_date_time < cutoff ).
+                                           order_by( table.c.t_id ).
+                                           limit( chunk ) ).fetchall()
+                if len( rows ) == 0:
+                    break
+
+                months = {}
+                for row in rows:
+                    months.setdefault( self.month( row[ 't_change_date_time' ] ), [] ).append( dict( row ) )
+
+                for month, records in months.items():
+                    if mode == 'file':
+                        # gzip members can be appended, the file stays one gzip stream to the reader
+                        with gzip.open( self.archiveFile( month ), 'at', encoding = 'utf-8' ) as stream:
+                            for record in records:
+                                stream.write( json.dumps( self.toRecord( record ), cls = JsonEncoder ) + '\n' )
+
+                    else:
+                        connection.execute( self.archiveTable( month ).insert(), records )
+
+                connection.execute( table.delete().where( table.c.t_id.in_( [ row[ 't_id' ] for row in rows ] ) ) )
+
+            moved += len( rows )
+            if progress is not None:
+                progress( moved )
+
+            if len( rows ) < chunk:
+                break
+
+        return moved
+
+    def months( self, mode = None ):
+        """The months that are archived, sorted.
+        """
+        if ( mode or self.mode ) == 'file':
+            if not os.path.isdir( self.folder ):
+                return []
+
+            names = os.listdir( self.folder )
+            pattern = self.FILE_PATTERN
+
+        else:
+            names = Inspector.from_engine( API.db.engine ).get_table_names()
+            pattern = self.TABLE_PATTERN
+
+        return sorted( match.group( 1 ) for match in [ pattern.match( name ) for name in names ] if match )
+
+    def purge( self, retention = None, mode = None ):
+        """Remove the archives older than the retention (months).
+
+        :return:    list of the removed months.
+        """
+        retention = self.retention if retention is None else retention
+        mode = mode or self.mode
+        if retention <= 0:
+            return []
+
+        now = datetime.utcnow()
+        index = now.year * 12 + now.month - 1 - retention
+        limit = '{:04}{:02}'.format( index // 12, index % 12 + 1 )
+        removed = []
+        for month in self.months( mode ):
+            if month >= limit:
+                continue
+
+            if mode == 'file':
+                os.remove( self.archiveFile( month ) )
+
+            else:
+                self.archiveTable( month ).drop( API.db.engine, checkfirst = True )
+                self._tables.pop( 'tracking_{}'.format( month ), None )
+
+            removed.append( month )
+
+        return removed
+
+    def search( self, table, record_id, since ):
+        """The archived history of a record from the date 'since', oldest first.
+        """
+        result = []
+        mode = self.mode
+        first = self.month( since )
+        for month in self.months( mode ):
+            if month < first:
+                continue
+
+            try:
+                if mode == 'file':
+                    with gzip.open( self.archiveFile( month ), 'rt', encoding = 'utf-8' ) as stream:
+                        for line in stream:
+                            record = json.loads( line )
+                            if record[ 'T_RECORD_ID' ] == record_id and table in ( None, record[ 'T_TABLE' ] ):
+                                # JsonEncoder writes the date with a space, the ISO format uses a T
+                                record[ 'T_CHANGE_DATE_TIME' ] = datetime.strptime( record[ 'T_CHANGE_DATE_TIME' ][ : 19 ].replace( 'T', ' ' ),
+                                                                                    '%Y-%m-%d %H:%M:%S' )
+                                if record[ 'T_CHANGE_DATE_TIME' ] >= since:
+                                    result.append( record )
+
+                else:
+                    archive = self.archiveTable( month )
+                    condition = and_( archive.c.t_record_id == record_id,
+                                      archive.c.t_change_date_time >= since )
+                    if table is not None:
+                        condition = and_( condition, archive.c.t_table == table )
+
+                    for row in API.db.engine.execute( select( [ archive ] ).where( condition ) ):
+                        result.append( self.toRecord( row ) )
+
+            except Exception:
+                API.app.logger.error( traceback.format_exc() )
+
+        result.sort( key = lambda record: ( record[ 'T_CHANGE_DATE_TIME' ], record[ 'T_ID' ] ) )
+        return result
+
+
+trackingArchive = TrackingArchive()
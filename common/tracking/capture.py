@@ -0,0 +1,178 @@
+from flask import g, request, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+import webapp2.api as API
+from webapp2.common.tracking.model import Tracking
+from webapp2.common.tracking.queue import trackingQueue
+from webapp2.common.routeclass import routeClasses
+
+
+ROWS    = 'webapp2.tracking.rows'
+NEW     = 'webapp2.tracking.new'
+SKIP    = 'webapp2.tracking.skip'
+_columnKeys = None
+
+
+def columnKeys():
+    """The tracking rows have the attribute names as keys, the insert the column keys.
+    """
+    global _columnKeys
+    if _columnKeys is None:
+        _columnKeys = { prop.key: prop.columns[ 0 ].key for prop in Tracking.__mapper__.column_attrs }
+
+    return _columnKeys
+
+
+def skipTracking( session = None, *objects ):
+    """The changes are tracked explicitly by the caller (recordDelete, bulkRecords,
+       rollbackRecord). Without objects the whole transaction of the session is skipped.
+    """
+    session = session or API.db.session
+    if len( objects ) == 0:
+        session.info[ SKIP ] = True
+
+    elif session.info.get( SKIP ) is not True:
+        session.info.setdefault( SKIP, set() ).update( id( obj ) for obj in objects )
+
+    return
+
+
+def disableTracking():
+    """Disable the tracking for the current request, from a request handler.
+    """
+    g.webapp2_tracking = False
+    return
+
+
+def trackingDisabled():
+    if getattr( g, 'webapp2_tracking', True ) is False:
+        return True
+
+    # enable tracking by default, however, this can be set to false by the request
+    requestData = request.get_json( silent = True )
+    if requestData is None:
+        requestData = request.args
+
+    return isinstance( requestData, dict ) and requestData.get( "tracking" ) in ( False, str( False ) )
+
+
+def currentUser():
+    """The user of the changes of the request. The CRUD handlers return their user in the
+       USER response header, the JWT identity or 'single.user', but the header is only set
+       after the changes were flushed. The other routes didn't set the header, their
+       changes without an identity are attributed to 'backend'.
+    """
+    try:
+        user = get_jwt_identity()
+        if user not in ( None, '', 0 ):
+            return user
+
+    except Exception:
+        pass
+
+    if routeClasses.get( request.endpoint ) is not None:
+        return 'single.user'
+
+    return 'backend'
+
+
+def tracked( session, obj ):
+    """Only the records of the application models are tracked, not the tracking and
+       locking records (__tracking__ = False) and not the explicitly tracked records.
+    """
+    if not hasattr( obj, '__field_list__' ) or not getattr( obj, '__tracking__', True ):
+        return False
+
+    skip = session.info.get( SKIP )
+    return skip is None or ( skip is not True and id( obj ) not in skip )
+
+
+def beforeFlush( session, flush_context, instances ):
+    """Collect the deleted and modified records, the old values are only available
+       before the flush.
+    """
+    if not has_request_context() or session.info.get( SKIP ) is True:
+        return
+
+    new = [ obj for obj in session.new if tracked( session, obj ) ]
+    deleted = [ obj for obj in session.deleted if tracked( session, obj ) ]
+    dirty = [ obj for obj in session.dirty if tracked( session, obj ) and session.is_modified( obj ) ]
+    if len( new ) + len( deleted ) + len( dirty ) == 0 or trackingDisabled():
+        return
+
+    user = currentUser()
+    rows = session.info.setdefault( ROWS, [] )
+    if len( deleted ) > 1:
+        # TODO: sqlalchemy does not seem to be aware of cascade deletion before commits
+        # so we will only track the items that are deleted by the request
+        rows.append( API.recordTracking.cascadeRow( [ obj.__tablename__ for obj in deleted ],
+                                                    getattr( deleted[ 0 ], deleted[ 0 ].__field_list__[ 0 ] ),
+                                                    [ obj.dictionary for obj in deleted ],
+                                                    user ) )
+
+    elif len( deleted ) == 1:
+        obj = deleted[ 0 ]
+        rows.append( API.recordTracking.row( API.recordTracking.DELETE,
+                                             obj.__tablename__,
+                                             getattr( obj, obj.__field_list__[ 0 ] ),
+                                             obj.dictionary,
+                                             user ) )
+
+    for obj in dirty:
+        rows.append( API.recordTracking.updateRow( obj, user ) )
+
+    # the primary keys of the new records are known after the flush
+    session.info.setdefault( NEW, [] ).extend( ( obj, user ) for obj in new )
+    return
+
+
+def afterFlush( session, flush_context ):
+    if not has_request_context():
+        return
+
+    rows = session.info.get( ROWS, [] )
+    for obj, user in session.info.pop( NEW, [] ):
+        rows.append( API.recordTracking.row( API.recordTracking.INSERT,
+                                             obj.__tablename__,
+                                             getattr( obj, obj.__field_list__[ 0 ] ),
+                                             obj.dictionary,
+                                             user ) )
+
+    if len( rows ) > 0 and not trackingQueue.enabled:
+        # Inline tracking, written in the transaction of the changes
+        keys = columnKeys()
+        session.connection().execute( Tracking.__table__.insert(),
+                                      [ { keys[ attribute ]: value for attribute, value in row.items() } for row in rows ] )
+        session.info.pop( ROWS, None )
+
+    return
+
+
+def afterCommit( session ):
+    if has_request_context():
+        for row in session.info.pop( ROWS, [] ):
+            trackingQueue.put( row )
+
+    afterRollback( session )
+    return
+
+
+def afterRollback( session ):
+    for key in ( ROWS, NEW, SKIP ):
+        session.info.pop( key, None )
+
+    return
+
+
+def registerCapture( session ):
+    """Track the changes of the session with the session events, instead of scanning
+       the session after every request.
+
+       The events of a scoped_session are registered on its sessionmaker, so they fire
+       for the sessions of the commands too; the handlers only track in a request context.
+    """
+    event.listen( session, 'before_flush', beforeFlush )
+    event.listen( session, 'after_flush', afterFlush )
+    event.listen( session, 'after_commit', afterCommit )
+    event.listen( session, 'after_soft_rollback', lambda session, previous_transaction: afterRollback( session ) )
+    return
@@ -0,0 +1,68 @@
+import json
+import zlib
+import base64
+from sqlalchemy.orm import attributes as history_attributes
+import webapp2.api as API
+from webapp2.common.jsonenc import JsonEncoder
+
+
+CHANGES     = '__changes__'
+ZLIB_PREFIX = 'zlib:'
+
+
+def changeSet( modifiedRecord ):
+    """The changed columns of the record with their old and new value,
+       { '__changes__': { column: [ old, new ] } }. This must be done before
+       the session is flushed.
+    """
+    changes = {}
+    for key in modifiedRecord.__field_list__:
+        history = history_attributes.get_history( modifiedRecord, key )
+        if history.has_changes():
+            old = history.deleted[ -1 ] if len( history.deleted ) > 0 else None
+            new = history.added[ -1 ] if len( history.added ) > 0 else None
+            changes[ key ] = [ old, new ]
+
+    return { CHANGES: changes }
+
+
+def isChangeSet( contents ):
+    return isinstance( contents, dict ) and CHANGES in contents
+
+
+def restoreValues( contents ):
+    """The values to set for a rollback of an update, from a change set or from
+       a full snapshot of the old record (the format before the change sets).
+    """
+    if isChangeSet( contents ):
+        return { key: values[ 0 ] for key, values in contents[ CHANGES ].items() }
+
+    return contents
+
+
+def encodeContents( data ):
+    """Compress the JSON text when it is larger than TRACKING_COMPRESS_THRESHOLD
+       characters, 0 disables the compression.
+    """
+    threshold = int( API.app.config.get( 'TRACKING_COMPRESS_THRESHOLD', 4096 ) )
+    if threshold > 0 and len( data ) > threshold:
+        return ZLIB_PREFIX + base64.b64encode( zlib.compress( data.encode( 'utf-8' ) ) ).decode( 'ascii' )
+
+    return data
+
+
+def decodeContents( data ):
+    """The JSON text of T_CONTENTS, compressed or not.
+    """
+    if isinstance( data, str ) and data.startswith( ZLIB_PREFIX ):
+        return zlib.decompress( base64.b64decode( data[ len( ZLIB_PREFIX ): ] ) ).decode( 'utf-8' )
+
+    return data
+
+
+def loadContents( data ):
+    return json.loads( decodeContents( data ) )
+
+
+def dumpContents( contents ):
+    return encodeContents( json.dumps( contents, cls = JsonEncoder ) )
@@ -0,0 +1,120 @@
+import functools
+import threading
+import traceback
+from flask import has_app_context
+from sqlalchemy import text
+import webapp2.api as API
+
+
+class TableMetadata( object ):
+    """The tracking information of one table.
+    """
+    __slots__ = ( 'table', 'primaryKey', 'nameField', 'columns' )
+
+    def __init__( self, table, model_cls ):
+        self.table      = table
+        self.columns    = tuple( model_cls.__field_list__ )
+        self.primaryKey = self.columns[ 0 ]
+        self.nameField  = getattr( model_cls, "__secondary_key__", "" )
+        if self.nameField in ( "", None ):
+            self.nameField = None
+            for field in self.columns:
+                if field.endswith( 'NAME' ):
+                    self.nameField = field
+                    break
+
+        return
+
+
+class TrackingMetadata( object ):
+    """Registry of the schema version and the per table information used by
+    RecordTracking, so a tracked change doesn't query alembic_version nor scan
+    the field list.
+
+    The registry is built at startup by createApp(). The version only changes by a
+    migration, the 'flask db upgrade' and 'flask db downgrade' commands refresh the
+    registry of their process (see refreshAfter()), a server running in another
+    process is restarted or refreshed through POST /api/tracking/metadata.
+    """
+    def __init__( self ):
+        self._tables    = {}
+        self._version   = None
+        self._lock      = threading.Lock()
+        return
+
+    def build( self ):
+        tables = { table: TableMetadata( table, model_cls ) for table, model_cls in API.tables_dict.items() }
+        with self._lock:
+            self._tables = tables
+            self._version = None
+
+        if has_app_context():
+            self.loadVersion()
+
+        else:
+            with API.app.app_context():
+                self.loadVersion()
+
+        return
+
+    def refresh( self ):
+        API.app.logger.info( 'Refresh the tracking metadata' )
+        self.build()
+        return self.info()
+
+    def refreshAfter( self, command ):
+        """Wrap the callback of a Click command, the registry is refreshed after the
+           command succeeded.
+        """
+        callback = command.callback
+
+        @functools.wraps( callback )
+        def wrapper( *args, **kwargs ):
+            result = callback( *args, **kwargs )
+            self.refresh()
+            return result
+
+        command.callback = wrapper
+        return command
+
+    def loadVersion( self ):
+        version_num = ""
+        try:
+            for row in API.db.engine.execute( text( 'select version_num from alembic_version' ) ):
+                version_num = row[ 0 ]
+
+        except Exception:
+            # No migrations (yet), the version remains empty
+            API.app.logger.error( traceback.format_exc() )
+
+        with self._lock:
+            self._version = version_num
+
+        return version_num
+
+    @property
+    def version( self ):
+        if self._version is None:
+            return self.loadVersion()
+
+        return self._version
+
+    def table( self, table ):
+        metadata = self._tables.get( table )
+        if metadata is None:
+            # A table that was registered after the build
+            metadata = TableMetadata( table, API.tables_dict[ table ] )
+            with self._lock:
+                self._tables[ table ] = metadata
+
+        return metadata
+
+    def info( self ):
+        return { 'version': self._version,
+                 'tables':  { table: { 'primaryKey':   metadata.primaryKey,
+                                       'nameField':    metadata.nameField,
+                                       'columns':      list( metadata.columns ) }
+                              for table, metadata in self._tables.items() } }
+
+
+trackingMetadata = TrackingMetadata()
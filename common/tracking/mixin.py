@@ -3,24 +3,50 @@ from flask import request, jsonify
 from sqlalchemy import text
 import json
 import dateutil.parser
+from datetime import timezone
 from flask_jwt_extended import get_jwt_identity
 import webapp2.api as API
 from webapp2.common.crud import getDictFromRequest, render_query
+from webapp2.common.routeclass import READ
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import IntegrityError
 from webapp2.common.tracking import constant
 from webapp2.common.tracking.model import Tracking
+from webapp2.common.tracking.queue import trackingQueue
+from webapp2.common.tracking.metadata import trackingMetadata
+from webapp2.common.tracking.changeset import loadContents, restoreValues
+from webapp2.common.tracking.archive import trackingArchive
+from webapp2.common.tracking.capture import skipTracking
 
 
 class TrackingViewMixin( object ):
     C_NOT_RESTORE_MESSAGE = "Could not restore record"
+    C_HISTORY_PAGE_SIZE = 50
+    # the history without the (large) contents
+    C_HISTORY_FIELDS = ( 'T_ID', 'T_USER', 'T_TABLE', 'T_ACTION', 'T_RECORD_ID',
+                         'T_RECORD_NAME', 'T_CHANGE_DATE_TIME', 'T_VERSION' )
 
 
     def __init__( self ):
-        self.registerRoute( 'retrieve', self.retrieveRecords, methods = [ 'POST' ] )
+        self.registerRoute( 'retrieve', self.retrieveRecords, methods = [ 'POST' ], route_class = READ )
         self.registerRoute( 'rollback', self.rollbackRecord, methods = [ 'POST' ] )
+        self.registerRoute( 'queue', self.queueStats, methods = [ 'GET' ] )
+        self.registerRoute( 'metadata', self.metadata, methods = [ 'GET', 'POST' ] )
         return
 
+    def queueStats( self ):
+        self.checkAuthentication()
+        return jsonify( trackingQueue.stats() )
+
+    def metadata( self ):
+        """GET shows the tracking metadata, POST rebuilds it after a migration.
+        """
+        self.checkAuthentication()
+        if request.method == 'POST':
+            return jsonify( trackingMetadata.refresh() )
+
+        return jsonify( trackingMetadata.info() )
+
     def rollbackRecord( self ):
         self.checkAuthentication()
         if API.use_jwt:
@@ -28,6 +54,8 @@ class TrackingViewMixin( object ):
             API.app.logger.debug( 'GET: {}/rollback by {}'.format( self._uri, user_info ) )
         data = getDictFromRequest( request )
         API.app.logger.debug( data )
+        # restoring a record is not a change to be tracked
+        skipTracking( API.db.session )
         query = API.db.session.query( Tracking )
         query = query.filter( Tracking.T_ID == data[ 'T_ID' ] )
         record = None
@@ -37,7 +65,7 @@ class TrackingViewMixin( object ):
                 # We need to disable the dabase integrity
                 API.db.session.execute( text( "SET FOREIGN_KEY_CHECKS=0" ) )
                 tables = json.loads( record.T_TABLE )
-                for i, recordDict in enumerate(json.loads( record.T_CONTENTS )):
+                for i, recordDict in enumerate(loadContents( record.T_CONTENTS )):
                     restoreRecord = API.dbtables.instanciate( tables[i] )
                     for key, value in recordDict.items():
                         if hasattr( restoreRecord, key ):
@@ -50,7 +78,7 @@ class TrackingViewMixin( object ):
 
             if record.T_ACTION == constant.C_T_ACTION_DELETE:
                 restoreRecord = API.dbtables.instanciate( record.T_TABLE )
-                for key, value in json.loads( record.T_CONTENTS ).items():
+                for key, value in loadContents( record.T_CONTENTS ).items():
                     if hasattr( restoreRecord, key ):
                         setattr( restoreRecord, key, value )
 
@@ -60,7 +88,8 @@ class TrackingViewMixin( object ):
 
             elif record.T_ACTION == constant.C_T_ACTION_UPDATE:
                 restoreRecord = API.db.session.query( API.dbtables.get( record.T_TABLE ) ).get( record.T_RECORD_ID )
-                for key, value in json.loads( record.T_CONTENTS ).items():
+                # a change set or a full snapshot of the old record
+                for key, value in restoreValues( loadContents( record.T_CONTENTS ) ).items():
                     setattr( restoreRecord, key, value )
 
                 API.db.session.delete( record )
@@ -102,13 +131,59 @@ class TrackingViewMixin( object ):
             API.app.logger.debug( 'GET: {}/retrieve by {}'.format( self._uri, user_info ) )
         data = getDictFromRequest( request )
         API.app.logger.debug( data )
-        query = API.db.session.query( Tracking )
-        query = query.filter( Tracking.T_RECORD_ID == data[ 'T_RECORD_ID' ] )
-        data[ 'T_CHANGE_DATE_TIME' ] = dateutil.parser.parse( data[ 'T_CHANGE_DATE_TIME' ] ).replace( microsecond = 0 )
+        # The record id is only unique within the table of its model, without a table
+        # the history of the record id in all tables is retrieved
+        table = data.get( 'T_TABLE' ) or None
+        recordId = int( data[ 'T_RECORD_ID' ] )
+        query = API.db.session.query( Tracking ).filter( Tracking.T_RECORD_ID == recordId )
+        since = None
+        if data.get( 'T_CHANGE_DATE_TIME' ) not in ( None, '' ):
+            data[ 'T_CHANGE_DATE_TIME' ] = dateutil.parser.parse( data[ 'T_CHANGE_DATE_TIME' ] ).replace( microsecond = 0 )
+            query = query.filter( Tracking.T_CHANGE_DATE_TIME >= data[ 'T_CHANGE_DATE_TIME' ] )
+            since = data[ 'T_CHANGE_DATE_TIME' ]
+            if since.tzinfo is not None:
+                since = since.astimezone( timezone.utc ).replace( tzinfo = None )
+
+        if table is not None:
+            # T_TABLE, T_RECORD_ID, T_CHANGE_DATE_TIME are served by the tracking_history index,
+            # a cascade delete stores the list of the tables with the table of the record first.
+            # The two conditions are separate queries, with an OR the index can't be used.
+            cascades = query.filter( Tracking.T_ACTION == constant.C_T_ACTION_CASCADE_DELETE,
+                                     Tracking.T_TABLE.startswith( json.dumps( [ table ] )[ : -1 ], autoescape = True ) )
+            query = query.filter( Tracking.T_TABLE == table ).union_all( cascades )
+
+        def archived():
+            # Only when the date lies before the hot window the archive is searched
+            if trackingArchive.isArchived( since ):
+                return trackingArchive.search( table, recordId, since )
+
+            return []
+
         API.app.logger.debug( data )
-        query = query.filter( Tracking.T_CHANGE_DATE_TIME >= data[ 'T_CHANGE_DATE_TIME' ] )
-        query = query.order_by( Tracking.T_CHANGE_DATE_TIME )
-        API.app.logger.debug( "SQL-QUERY : {}".format( render_query( query ) ) )
-        records = query.all()
+        fields = None
+        if data.get( 'contents', True ) in ( False, str( False ), 'false' ):
+            fields = self.C_HISTORY_FIELDS
+            query = self.projectQuery( query, fields )
+
+        if 'cursor' not in data and 'pageSize' not in data:
+            # The original interface, all records oldest first
+            query = query.order_by( Tracking.T_CHANGE_DATE_TIME )
+            API.app.logger.debug( "SQL-QUERY : {}".format( render_query( query ) ) )
+            records = archived() + query.all()
+            API.app.logger.debug( "Result: {}".format( records ) )
+            return self.projectionSchema( fields ).jsonify( records )
+
+        # Newest first, one page at a time, the archived records follow the records of
+        # the tracking table and are paged with the same cursor
+        records, nextCursor, prevCursor = self.keysetPage( query,
+                                                           Tracking.T_CHANGE_DATE_TIME,
+                                                           [ 'T_CHANGE_DATE_TIME' ],
+                                                           True,
+                                                           data.get( 'cursor' ),
+                                                           int( data.get( 'pageSize' ) or self.C_HISTORY_PAGE_SIZE ),
+                                                           extra = archived )
         API.app.logger.debug( "Result: {}".format( records ) )
-        return self._schema_list_cls.jsonify( records )
+        return self.jsonRecords( records,
+                                 self.projectionSchema( fields ),
+                                 nextCursor = nextCursor,
+                                 prevCursor = prevCursor )
@@ -32,6 +32,10 @@ class Tracking( API.db.Model, CrudModelMixin ):
     __tablename__        = 'tracking'
     __schema_cls__       = TrackingSchema()
     __secondary_key__    = 'T_RECORD_NAME'
+    __tracking__         = False
+    # the history of a record, newest first
+    __table_args__       = ( API.db.Index( 'tracking_history', 't_table', 't_record_id', 't_change_date_time',
+                                           mysql_length = { 't_table': 64 } ), )
     T_ID                 = API.db.Column( "t_id", API.db.Integer, autoincrement = True, primary_key = True )
     T_USER               = API.db.Column( "t_user", API.db.LONGTEXT, nullable = False )
     T_TABLE              = API.db.Column( "t_table", API.db.LONGTEXT, nullable = False )
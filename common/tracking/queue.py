@@ -0,0 +1,176 @@
+import os
+import time
+import queue
+import atexit
+import threading
+import traceback
+from sqlalchemy.orm import Session
+import webapp2.api as API
+from webapp2.common.tracking.model import Tracking
+
+
+class TrackingQueue( object ):
+    """Write-behind queue for the tracking records.
+
+    The request thread only puts the tracking row (see RecordTracking.row()) on a
+    bounded queue. A worker thread with its own session drains the queue and writes
+    the rows with one executemany per batch, a batch is written when it has
+    TRACKING_BATCH_SIZE rows or TRACKING_FLUSH_MS milliseconds after its first row.
+    When the queue is full (TRACKING_QUEUE_SIZE) the row is dropped and counted.
+
+    TRACKING_ASYNC = false (the default) writes the tracking rows inline in the request,
+    as before.
+
+    start() only reads the configuration, the queue and the worker thread are created
+    by the first put() of the process. A server that forks after the application was
+    created (gunicorn --preload) has no threads in the child processes, each child
+    starts its own worker.
+    """
+    def __init__( self ):
+        self._queue     = None
+        self._thread    = None
+        self._pid       = None
+        self._stopping  = threading.Event()
+        self._lock      = threading.Lock()
+        self.enabled    = False
+        self.batchSize  = 100
+        self.interval   = 0.2
+        self.queueSize  = 10000
+        self.enqueued   = 0
+        self.written    = 0
+        self.dropped    = 0
+        self.batches    = 0
+        self.errors     = 0
+        return
+
+    def start( self ):
+        config = API.app.config
+        self.enabled = bool( config.get( 'TRACKING_ASYNC', False ) )
+        if not self.enabled:
+            return
+
+        self.batchSize  = int( config.get( 'TRACKING_BATCH_SIZE', 100 ) )
+        self.interval   = int( config.get( 'TRACKING_FLUSH_MS', 200 ) ) / 1000.0
+        self.queueSize  = int( config.get( 'TRACKING_QUEUE_SIZE', 10000 ) )
+        return
+
+    def startWorker( self ):
+        """The queue and the worker thread of the current process.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            self._queue     = queue.Queue( maxsize = self.queueSize )
+            self._stopping  = threading.Event()
+            self._thread    = threading.Thread( target = self.run, args = ( self._queue, self._stopping ),
+                                                name = 'tracking-writer', daemon = True )
+            self._thread.start()
+            self._pid       = os.getpid()
+
+        atexit.register( self.stop )
+        API.app.logger.info( 'Tracking write-behind queue started in process {}, batch {} rows / {} ms'.format(
+                                    self._pid, self.batchSize, int( self.interval * 1000 ) ) )
+        return
+
+    def stop( self, timeout = 30 ):
+        """Stop the worker after the queue is written completely.
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        self._stopping.set()
+        self._thread.join( timeout )
+        if self._thread.is_alive():
+            API.app.logger.error( 'Tracking queue not flushed, {} rows pending'.format( self._queue.qsize() ) )
+
+        self._thread = None
+        self._pid = None
+        self.enabled = False
+        return
+
+    def put( self, row ):
+        if self._pid != os.getpid():
+            self.startWorker()
+
+        try:
+            self._queue.put_nowait( row )
+            with self._lock:
+                self.enqueued += 1
+
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+            API.app.logger.error( 'Tracking queue full, dropped {} {}:{}'.format( row[ 'T_ACTION' ],
+                                                                                  row[ 'T_TABLE' ],
+                                                                                  row[ 'T_RECORD_ID' ] ) )
+
+        return
+
+    def stats( self ):
+        with self._lock:
+            return { 'enabled':     self.enabled,
+                     'depth':       self._queue.qsize() if self._queue is not None else 0,
+                     'enqueued':    self.enqueued,
+                     'written':     self.written,
+                     'dropped':     self.dropped,
+                     'batches':     self.batches,
+                     'errors':      self.errors }
+
+    def run( self, rowQueue, stopping ):
+        while True:
+            try:
+                rows = [ rowQueue.get( timeout = self.interval ) ]
+
+            except queue.Empty:
+                if stopping.is_set():
+                    break
+
+                continue
+
+            deadline = time.monotonic() + self.interval
+            while len( rows ) < self.batchSize:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    rows.append( rowQueue.get( timeout = remaining ) )
+
+                except queue.Empty:
+                    break
+
+            self.write( rows )
+
+        return
+
+    def write( self, rows ):
+        try:
+            with API.app.app_context():
+                session = Session( bind = API.db.engine )
+                try:
+                    session.bulk_insert_mappings( Tracking, rows )
+                    session.commit()
+                    with self._lock:
+                        self.written += len( rows )
+                        self.batches += 1
+
+                except Exception:
+                    session.rollback()
+                    raise
+
+                finally:
+                    session.close()
+
+        except Exception:
+            with self._lock:
+                self.errors += 1
+
+            API.app.logger.error( 'Tracking batch of {} rows not written'.format( len( rows ) ) )
+            API.app.logger.error( traceback.format_exc() )
+
+        return
+
+
+trackingQueue = TrackingQueue()
@@ -21,6 +21,7 @@
 import webapp2.api as API
 from marshmallow import fields, pre_load, post_dump
 from webapp2.common.convert import value2Label, utcDateString2Local
+from webapp2.common.tracking.changeset import decodeContents
 
 
 class TrackingSchema( API.mm.SQLAlchemySchema ):
@@ -40,6 +41,9 @@ class TrackingSchema( API.mm.SQLAlchemySchema ):
     @post_dump
     def post_dump_process( self, in_data, **kwargs ):
         in_data[ 'T_ACTION_LABEL' ] = value2Label( {1: 'Insert', 2: 'Update', 3: 'Delete', 4: 'Cascade Delete'}, in_data[ 'T_ACTION' ] )
+        if 'T_CONTENTS' in in_data:
+            # the client always receives the JSON text
+            in_data[ 'T_CONTENTS' ] = decodeContents( in_data[ 'T_CONTENTS' ] )
         return in_data
 
     @pre_load
@@ -6,8 +6,9 @@ from numpy import record
 from webapp2.common.jsonenc import JsonEncoder
 import webapp2.api as API
 from webapp2.common.tracking.model import Tracking
-from sqlalchemy.orm import attributes as history_attributes
-from sqlalchemy import text
+from webapp2.common.tracking.queue import trackingQueue
+from webapp2.common.tracking.metadata import trackingMetadata
+from webapp2.common.tracking.changeset import changeSet, encodeContents
 
 class RecordTracking( object ):
     INSERT = 1
@@ -22,38 +23,63 @@ class RecordTracking( object ):
     def _getAttr(self, record: Union[dict, object], field):
         return record.get(field, "") if isinstance( record, dict ) else getattr(record, field, "")
 
-    def action( self, action, table, rec_id, record, user ):
-        API.logger.debug( "record action: {} => {}".format( action, record ) )
+    def versionNum( self ):
+        return trackingMetadata.version
+
+    def recordName( self, table, record ):
+        nameField = trackingMetadata.table( table ).nameField
+        return self._getAttr( record, nameField ) if nameField is not None else ""
+
+    def row( self, action, table, rec_id, record, user, version_num = None, source = None ):
+        """Build the values of a tracking record as dictionary.
+
+        :param version_num: the schema version, when None the version of the tracking metadata.
+        :param source:      the record to take the record name from, when None the record itself.
+        """
         if isinstance( record, dict ):
             data = json.dumps( record, cls = JsonEncoder )
 
         else:
             data = record.json
 
-        version_num = ""
-        for row in API.db.session.execute( text( 'select version_num from alembic_version' ) ):
-            version_num = row[ 0 ]
+        if version_num is None:
+            version_num = trackingMetadata.version
 
-        record_name_field = getattr( API.tables_dict[table], "__secondary_key__", "" )
-        record_name = ""
-        if record_name_field not in ("", None):
-            record_name = self._getAttr(record, record_name_field)
+        return dict( T_USER = user,
+                     T_TABLE = table,
+                     T_ACTION = action,
+                     T_RECORD_ID = int( rec_id ),
+                     T_RECORD_NAME = self.recordName( table, record if source is None else source ),
+                     T_CONTENTS = encodeContents( data ),
+                     T_CHANGE_DATE_TIME = datetime.utcnow(),
+                     T_VERSION = version_num )
+
+    def action( self, action, table, rec_id, record, user ):
+        API.logger.debug( "record action: {} => {}".format( action, record ) )
+        self.write( self.row( action, table, rec_id, record, user ) )
+        return
+
+    def write( self, row ):
+        """Write the tracking row, through the write-behind queue when enabled
+           otherwise inline with its own commit.
+        """
+        if trackingQueue.enabled:
+            trackingQueue.put( row )
 
         else:
-            for field in API.tables_dict[table].__field_list__:
-                if field.endswith( 'NAME' ):
-                    record_name = self._getAttr(record, field)
-                    break
-
-        API.db.session.add( Tracking( T_USER = user,
-                                      T_TABLE = table,
-                                      T_ACTION = action,
-                                      T_RECORD_ID = int( rec_id ),
-                                      T_RECORD_NAME = record_name,
-                                      T_CONTENTS = data,
-                                      T_CHANGE_DATE_TIME = datetime.utcnow(),
-                                      T_VERSION = version_num ) )
-        API.db.session.commit()
+            API.db.session.add( Tracking( **row ) )
+            API.db.session.commit()
+
+        return
+
+    def bulk( self, rows ):
+        """Add the tracking rows (see row()) with a single executemany to the current
+           transaction of the session, the caller commits.
+        """
+        if len( rows ) > 0:
+            API.logger.debug( "record bulk( {} rows )".format( len( rows ) ) )
+            API.db.session.bulk_insert_mappings( Tracking, rows )
+
         return
 
     def insert( self, table, rec_id, record_instance, user ):
@@ -71,49 +97,44 @@ class RecordTracking( object ):
         self.action( self.DELETE, table, rec_id, record_instance, user )
         return
 
+    def cascadeRow( self, tables, parent_rec_id, record_instances, user ):
+        """Build the values of a cascade delete tracking record as dictionary.
+        """
+        if isinstance( record_instances[0], dict ):
+            data = json.dumps( record_instances, cls = JsonEncoder )
+        else:
+            data = json.dumps( [record.dictionary for record in record_instances], cls = JsonEncoder )
+
+        return dict( T_USER = user,
+                     T_TABLE = json.dumps( tables, cls = JsonEncoder ),
+                     T_ACTION = self.CASCADE_DELETE,
+                     T_RECORD_ID = int( parent_rec_id ),
+                     T_RECORD_NAME = self.recordName( tables[ 0 ], record_instances[ 0 ] ),
+                     T_CONTENTS = encodeContents( data ),
+                     T_CHANGE_DATE_TIME = datetime.utcnow(),
+                     T_VERSION = trackingMetadata.version )
+
     def cascade_delete( self, tables, parent_rec_id, record_instances, user ):
         if len(record_instances) > 0:
             API.logger.debug( "cascade delete( {} with id {} )".format( tables[0], parent_rec_id ) )
-            if isinstance( record_instances[0], dict ):
-                data = json.dumps( record_instances, cls = JsonEncoder )
-            else:
-                data = json.dumps( [record.dictionary for record in record_instances], cls = JsonEncoder )
-
-            version_num = ""
-            for row in API.db.session.execute( text( 'select version_num from alembic_version' ) ):
-                version_num = row[ 0 ]
-
-            record_name_field = getattr( API.tables_dict[tables[0]], "__secondary_key__", "" )
-            record_name = ""
-            if record_name_field not in ("", None):
-                record_name = self._getAttr(record_instances[0], record_name_field)
-            else:
-                for field in API.tables_dict[tables[0]].__field_list__:
-                    if field.endswith( 'NAME' ):
-                        record_name = self._getAttr(record_instances[0], field)
-                        break
-            API.db.session.add( Tracking( T_USER = user,
-                                        T_TABLE = json.dumps( tables, cls = JsonEncoder ),
-                                        T_ACTION = self.CASCADE_DELETE,
-                                        T_RECORD_ID = int( parent_rec_id ),
-                                        T_RECORD_NAME = record_name,
-                                        T_CONTENTS = data,
-                                        T_CHANGE_DATE_TIME = datetime.utcnow(),
-                                        T_VERSION = version_num ) )
-            API.db.session.commit()
+            self.write( self.cascadeRow( tables, parent_rec_id, record_instances, user ) )
         return
 
+    def updateRow( self, modifiedRecord, user, version_num = None ):
+        """The tracking row of an update, only the changed columns with their old and
+           new values are stored. This must be done before the session is flushed.
+        """
+        return self.row( self.UPDATE,
+                         modifiedRecord.__tablename__,
+                         getattr( modifiedRecord, modifiedRecord.__field_list__[ 0 ] ),
+                         changeSet( modifiedRecord ),
+                         user,
+                         version_num,
+                         source = modifiedRecord )
+
     def autoUpdate( self, modifiedRecord, user ):
-        oldRecord = modifiedRecord.dictionary
-        for key in oldRecord:
-            # get an history object that shows the changes for a given attribute
-            # deleted specifies the old value for an attribute
-            changedValues = history_attributes.get_history(modifiedRecord, key).deleted
-            if len(changedValues) > 0:
-                oldRecord[key] = changedValues[-1]
-        self.update( modifiedRecord.__tablename__,
-                            getattr(modifiedRecord, modifiedRecord.__field_list__[ 0 ]),
-                            oldRecord,
-                            user )
+        API.logger.debug( "record update( {} )".format( modifiedRecord ) )
+        self.write( self.updateRow( modifiedRecord, user ) )
+        return
 
 # API.recordTracking = RecordTracking()
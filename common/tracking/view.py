@@ -25,6 +25,7 @@ import traceback
 from webapp2.common.tracking.model import Tracking
 from webapp2.common.tracking.schema import TrackingSchema
 from webapp2.common.tracking.mixin import TrackingViewMixin
+from webapp2.common.tracking.queue import trackingQueue
 
 
 trackingApi = Blueprint( 'trackingApi', __name__ )
@@ -35,6 +36,7 @@ def registerApi( *args ):
     # Set the logger for the users module
     API.app.logger.info( 'Register Tracking routes' )
     API.app.register_blueprint( trackingApi )
+    trackingQueue.start()
     try:
         import webapp2.common.tracking.entry_points  as EP
         if hasattr( EP, 'entryPointApi' ):
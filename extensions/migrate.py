@@ -19,7 +19,12 @@
 #
 
 from flask_migrate import Migrate
+from flask_migrate.cli import db as dbCommands
 import webapp2.api as API
+from webapp2.common.tracking.metadata import trackingMetadata
 
 
 API.migrate = Migrate()
+# a migration changes the schema version of the tracking records
+for name in ( 'upgrade', 'downgrade' ):
+    trackingMetadata.refreshAfter( dbCommands.commands[ name ] )
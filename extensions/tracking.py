@@ -1,5 +1,8 @@
 import webapp2.api as API
 from webapp2.common.tracking.tracking import RecordTracking
+from webapp2.common.tracking.capture import registerCapture
 
 
-API.recordTracking    = RecordTracking()
\ No newline at end of file
+API.recordTracking    = RecordTracking()
+# track the changes of the session with the session events
+registerCapture( API.db.session )
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Test fixtures of the webapp2 package."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import os
+import tempfile
+import pytest
+from flask import Flask, Blueprint, request, jsonify
+from marshmallow import fields
+import webapp2.api as API
+import webapp2.extensions.database                                  # noqa: F401
+import webapp2.extensions.cache                                     # noqa: F401
+import webapp2.extensions.marshmallow                               # noqa: F401
+from webapp2.common.jsonenc import WebAppJsonEncoder
+
+# The models of the package are declared on API.db, so the application and the extensions
+# are set up before the test modules (and the package modules) are imported.
+DATABASE_FILE = os.path.join( tempfile.mkdtemp( prefix = 'webapp2-tests-' ), 'tests.db' )
+API.app = Flask( 'webapp2' )
+API.app.config.update( SQLALCHEMY_DATABASE_URI = 'sqlite:///' + DATABASE_FILE,
+                       SQLALCHEMY_TRACK_MODIFICATIONS = False,
+                       CACHE_TYPE = 'simple',
+                       TESTING = True )
+API.app.json_encoder = WebAppJsonEncoder
+API.logger = API.app.logger
+API.db.init_app( API.app )
+API.cache.init_app( API.app )
+API.mm.init_app( API.app )
+
+import webapp2.extensions.tracking                                  # noqa: E402
+import webapp2.extensions.middleware                                # noqa: E402
+from webapp2.common.crud import CrudInterface, RecordLock           # noqa: E402
+from webapp2.common.crudmixin import CrudModelMixin                 # noqa: E402
+from webapp2.common.locking.model import RecordLocks                # noqa: E402, F401
+from webapp2.common.tracking.view import trackingApi                # noqa: E402
+
+
+class Item( API.db.Model, CrudModelMixin ):
+    __field_list__       = [ 'I_ID', 'I_NAME', 'I_GROUP' ]
+    __tablename__        = 'test_item'
+    I_ID                 = API.db.Column( "i_id", API.db.Integer, autoincrement = True, primary_key = True )
+    I_NAME               = API.db.Column( "i_name", API.db.String( 64 ), nullable = False )
+    I_GROUP              = API.db.Column( "i_group", API.db.Integer, nullable = True )
+
+
+class Part( API.db.Model, CrudModelMixin ):
+    __field_list__       = [ 'P_ID', 'P_ITEM_ID', 'P_NAME' ]
+    __tablename__        = 'test_part'
+    P_ID                 = API.db.Column( "p_id", API.db.Integer, autoincrement = True, primary_key = True )
+    P_ITEM_ID            = API.db.Column( "p_item_id", API.db.Integer, API.db.ForeignKey( 'test_item.i_id' ), nullable = False )
+    P_NAME               = API.db.Column( "p_name", API.db.String( 64 ), nullable = False )
+
+
+class ItemSchema( API.mm.SQLAlchemySchema ):
+    I_ID                 = fields.Integer()
+    I_NAME               = fields.String()
+    I_GROUP              = fields.Integer( allow_none = True )
+
+
+Item.__schema_cls__ = ItemSchema()
+itemApi = Blueprint( 'itemApi', __name__ )
+
+
+class ItemRecordLock( RecordLock ):
+    def __init__( self ):
+        RecordLock.__init__( self, 'test_item', 'I_ID' )
+        return
+
+
+class ItemCrudInterface( CrudInterface ):
+    _model_cls = Item
+    _lock_cls = ItemRecordLock
+    _schema_cls = ItemSchema()
+    _schema_list_cls = ItemSchema( many = True )
+    _uri = '/api/item'
+    _relations = []
+
+    def __init__( self ):
+        CrudInterface.__init__( self, itemApi )
+        return
+
+    def beforeUpdate( self, record ):
+        record.pop( 'I_ID', None )
+        return record
+
+
+items = ItemCrudInterface()
+
+
+@itemApi.route( '/api/item/rename/<int:id>', methods = [ 'POST', 'GET' ] )
+def renameItem( id ):
+    """A route outside the CRUD interface, the change is committed by the middleware."""
+    item = API.db.session.query( Item ).get( id )
+    item.I_NAME = ( request.get_json( silent = True ) or request.args )[ 'I_NAME' ]
+    return jsonify( ok = True )
+
+
+API.app.register_blueprint( itemApi )
+API.app.register_blueprint( trackingApi )
+API.tables_dict = { table.__tablename__: table for table in API.db.Model.__subclasses__() }
+
+
+@pytest.fixture
+def app():
+    with API.app.app_context():
+        API.db.create_all()
+        API.db.session.execute( 'create table if not exists alembic_version ( version_num varchar( 32 ) not null )' )
+        yield API.app
+        API.db.session.remove()
+        API.db.drop_all()
+
+
+@pytest.fixture
+def client( app ):
+    return app.test_client()
+
+
+@pytest.fixture
+def records( app ):
+    """Three items, the first item has two parts."""
+    rows = [ Item( I_NAME = 'alpha', I_GROUP = 1 ),
+             Item( I_NAME = 'beta', I_GROUP = 1 ),
+             Item( I_NAME = 'gamma', I_GROUP = 2 ) ]
+    API.db.session.add_all( rows )
+    API.db.session.flush()
+    API.db.session.add_all( [ Part( P_ITEM_ID = rows[ 0 ].I_ID, P_NAME = 'left' ),
+                              Part( P_ITEM_ID = rows[ 0 ].I_ID, P_NAME = 'right' ) ] )
+    API.db.session.commit()
+    return [ row.I_ID for row in rows ]
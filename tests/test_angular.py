@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Tests of the Angular application routes."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import pytest
+from flask import Flask
+from webapp2.common.angular import bluePrint
+from webapp2.common.staticfiles import staticManifest
+
+
+@pytest.fixture
+def angular( tmp_path ):
+    ( tmp_path / 'index.html' ).write_text( '<html></html>' )
+    ( tmp_path / 'api' ).mkdir()
+    ( tmp_path / 'api' / 'data.json' ).write_text( '{}' )
+    app = Flask( 'angular' )
+    app.register_blueprint( bluePrint )
+    with app.app_context():
+        staticManifest.build( str( tmp_path ), 262144 )
+
+    return app.test_client()
+
+
+def test_api_prefix( angular ):
+    assert angular.get( '/index.html' ).status_code == 200
+    # the api routes are never served from the Angular folder
+    assert angular.get( '/api/data.json' ).status_code == 404
+    assert angular.get( '/api' ).status_code == 404
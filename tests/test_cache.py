@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Tests of the table generations of the cache."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import time
+import webapp2.api as API
+from webapp2.common.cachegen import tableGenerations
+
+
+def test_bump_missing_counter( app ):
+    # a counter that was never read (or was evicted) continues from the clock
+    start = int( time.time() * 1000 )
+    API.cache.delete( tableGenerations.PREFIX + 'test_item' )
+    tableGenerations.bump( 'test_item' )
+    generation = tableGenerations.get( 'test_item' )
+    assert generation > start
+    tableGenerations.bump( 'test_item' )
+    assert tableGenerations.get( 'test_item' ) == generation + 1
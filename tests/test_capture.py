@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Tests of the capture of the changes and the request hooks."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import webapp2.api as API
+from webapp2.common.tracking.model import Tracking
+from webapp2.common.tracking import capture
+from conftest import Item
+
+
+def trackingRows( table = 'test_item' ):
+    return API.db.session.query( Tracking ).filter( Tracking.T_TABLE == table ).order_by( Tracking.T_ID ).all()
+
+
+def test_new_record( client, records ):
+    response = client.post( '/api/item/new', json = { 'I_NAME': 'delta', 'I_GROUP': 3 } )
+    assert response.status_code == 200
+    record = response.get_json()
+    assert record[ 'I_ID' ] not in records
+    assert API.db.session.query( Item ).get( record[ 'I_ID' ] ).I_NAME == 'delta'
+    rows = trackingRows()
+    assert [ ( row.T_ACTION, row.T_RECORD_ID, row.T_USER ) for row in rows ] == \
+                [ ( API.recordTracking.INSERT, record[ 'I_ID' ], 'single.user' ) ]
+
+
+def test_updated_record_response( client, records ):
+    # the middleware commits and returns the updated record
+    response = client.post( '/api/item/rename/{}'.format( records[ 1 ] ), json = { 'I_NAME': 'BETA' } )
+    assert response.status_code == 200
+    assert response.get_json() == { 'I_ID': records[ 1 ], 'I_NAME': 'BETA', 'I_GROUP': 1 }
+    API.db.session.expire_all()
+    assert API.db.session.query( Item ).get( records[ 1 ] ).I_NAME == 'BETA'
+    # a route outside the CRUD interface without an identity
+    rows = trackingRows()
+    assert [ ( row.T_ACTION, row.T_RECORD_ID, row.T_USER ) for row in rows ] == \
+                [ ( API.recordTracking.UPDATE, records[ 1 ], 'backend' ) ]
+
+
+def test_no_request_context( app, records ):
+    # the sessions of the commands share the events, they are not tracked
+    session = API.db.session
+    session.info[ capture.ROWS ] = [ API.recordTracking.row( API.recordTracking.UPDATE, 'test_item', records[ 0 ], {}, 'backend' ) ]
+    session.info[ capture.NEW ] = []
+    session.add( Item( I_NAME = 'delta', I_GROUP = 3 ) )
+    session.commit()
+    assert trackingRows() == []
+    assert not any( key in session.info for key in ( capture.ROWS, capture.NEW, capture.SKIP ) )
+
+
+def test_read_route_changes( client, records, caplog ):
+    # a GET route outside the CRUD interface that changes a record is still committed, with a warning
+    response = client.get( '/api/item/rename/{}?I_NAME=BETA'.format( records[ 1 ] ) )
+    assert response.status_code == 200
+    API.db.session.expire_all()
+    assert API.db.session.query( Item ).get( records[ 1 ] ).I_NAME == 'BETA'
+    assert [ row.T_RECORD_ID for row in trackingRows() ] == [ records[ 1 ] ]
+    assert any( 'GET /api/item/rename/' in record.getMessage() for record in caplog.records )
+
+
+def test_tracking_disabled( client, records ):
+    response = client.post( '/api/item/rename/{}'.format( records[ 1 ] ), json = { 'I_NAME': 'BETA', 'tracking': False } )
+    assert response.status_code == 200
+    assert trackingRows() == []
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Tests of the record count strategies."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import pytest
+from webapp2.common.counting import EstimatedCounter
+
+
+class Session( object ):
+    """The table statistics of a PostgreSQL database."""
+    def __init__( self, reltuples ):
+        self.reltuples = reltuples
+
+    def get_bind( self ):
+        return self
+
+    @property
+    def dialect( self ):
+        return self
+
+    name = 'postgresql'
+
+    def execute( self, statement, params ):
+        return self
+
+    def scalar( self ):
+        return self.reltuples
+
+
+@pytest.mark.parametrize( 'reltuples, rows', [ ( 1200, 1200 ), ( 0, 0 ), ( -1, None ) ] )
+def test_table_rows( reltuples, rows ):
+    # -1 is a table that was never analyzed, the exact count is used
+    assert EstimatedCounter.tableRows( Session( reltuples ), 'test_item' ) == rows
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Tests of the CRUD interface routes."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+import importlib
+import traceback
+import pytest
+from flask import request
+import webapp2.api as API
+from conftest import Item, ItemRecordLock
+
+
+def test_import():
+    crud = importlib.import_module( 'webapp2.common.crud' )
+    assert crud.CrudInterface.BulkBodyInput.parse_obj( { 'operations': [ { 'operation': 'new', 'record': {} } ] } )
+
+
+def test_paged_list( client, records ):
+    response = client.post( '/api/item/pagedlist', json = { 'pageIndex': 1,
+                                                            'pageSize': 2,
+                                                            'sorting': { 'column': 'I_NAME', 'direction': 'asc' } } )
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result[ 'recordCount' ] == 3
+    assert [ record[ 'I_NAME' ] for record in result[ 'records' ] ] == [ 'gamma' ]
+
+
+def test_paged_list_keyset( client, records ):
+    names = []
+    cursor = None
+    while True:
+        response = client.post( '/api/item/pagedlist', json = { 'keyset': True,
+                                                                'cursor': cursor,
+                                                                'pageSize': 2,
+                                                                'fields': [ 'I_NAME' ],
+                                                                'filters': [ { 'operator': 'GT|EQ', 'column': 'I_GROUP', 'value': '1' } ],
+                                                                'sorting': { 'column': 'I_NAME', 'direction': 'desc' } } )
+        result = response.get_json()
+        # the projection and the primary key
+        assert all( set( record ) == { 'I_ID', 'I_NAME' } for record in result[ 'records' ] )
+        names.extend( record[ 'I_NAME' ] for record in result[ 'records' ] )
+        cursor = result[ 'nextCursor' ]
+        if cursor is None:
+            break
+
+    assert names == [ 'gamma', 'beta', 'alpha' ]
+
+@pytest.mark.parametrize( 'direction', [ 'asc', 'desc' ] )
+def test_paged_list_keyset_nulls( client, records, direction ):
+    # I_GROUP is nullable, the NULL values follow the other values in ascending order
+    API.db.session.add_all( [ Item( I_NAME = 'delta' ), Item( I_NAME = 'epsilon' ) ] )
+    API.db.session.commit()
+    pages = []
+    cursor = None
+    while True:
+        response = client.post( '/api/item/pagedlist', json = { 'keyset': True,
+                                                                'cursor': cursor,
+                                                                'pageSize': 2,
+                                                                'sorting': { 'column': 'I_GROUP', 'direction': direction } } )
+        assert response.status_code == 200
+        result = response.get_json()
+        pages.append( result )
+        cursor = result[ 'nextCursor' ]
+        if cursor is None:
+            break
+
+    groups = [ ( record[ 'I_GROUP' ], record[ 'I_NAME' ] ) for page in pages for record in page[ 'records' ] ]
+    expected = [ ( 1, 'alpha' ), ( 1, 'beta' ), ( 2, 'gamma' ), ( None, 'delta' ), ( None, 'epsilon' ) ]
+    assert groups == ( expected if direction == 'asc' else list( reversed( expected ) ) )
+    # back from the last page
+    response = client.post( '/api/item/pagedlist', json = { 'keyset': True,
+                                                            'cursor': pages[ -1 ][ 'prevCursor' ],
+                                                            'pageSize': 2,
+                                                            'sorting': { 'column': 'I_GROUP', 'direction': direction } } )
+    assert response.get_json()[ 'records' ] == pages[ -2 ][ 'records' ]
+
+
+def test_get_count_delete( client, records ):
+    response = client.get( '/api/item/get/{}'.format( records[ 2 ] ) )
+    assert response.get_json() == { 'I_ID': records[ 2 ], 'I_NAME': 'gamma', 'I_GROUP': 2 }
+    assert client.get( '/api/item/count' ).get_json() == { 'recordCount': 3 }
+    response = client.delete( '/api/item/{}'.format( records[ 2 ] ) )
+    assert response.status_code == 200
+    assert client.get( '/api/item/count' ).get_json() == { 'recordCount': 2 }
+
+
+def test_cache_stats( client, records ):
+    def stats():
+        response = client.get( '/api/item/cachestats' )
+        assert response.status_code == 200
+        return response.get_json().get( '/api/item/pagedList', { 'hit': 0, 'miss': 0 } )
+
+    before = stats()
+    for _ in range( 2 ):
+        client.post( '/api/item/pagedlist', json = { 'pageIndex': 0, 'pageSize': 2 } )
+
+    after = stats()
+    assert after[ 'miss' ] == before[ 'miss' ] + 1
+    assert after[ 'hit' ] == before[ 'hit' ] + 1
+    assert client.get( '/api/cachestats' ).status_code == 404
+
+
+def test_export( client, records ):
+    response = client.post( '/api/item/export', json = { 'format': 'ndjson',
+                                                         'sorting': { 'column': 'I_ID', 'direction': 'asc' } } )
+    assert response.status_code == 200
+    lines = [ json.loads( line ) for line in response.get_data( as_text = True ).splitlines() ]
+    assert [ line[ 'I_NAME' ] for line in lines ] == [ 'alpha', 'beta', 'gamma' ]
+    response = client.post( '/api/item/export', json = { 'format': 'csv', 'fields': [ 'I_NAME' ] } )
+    assert response.get_data( as_text = True ).splitlines()[ 0 ] == 'I_ID;I_NAME'
+
+
+def test_select_child_filter( client, records ):
+    # the first item has two parts, it is listed once
+    response = client.post( '/api/item/select', json = { 'value': 'I_ID',
+                                                         'label': 'I_NAME',
+                                                         'childFilters': [ { 'table': 'test_part',
+                                                                             'foreignKey': 'P_ITEM_ID',
+                                                                             'filters': [ { 'operator': 'CO',
+                                                                                            'column': 'P_NAME',
+                                                                                            'value': 't' } ] } ],
+                                                         'pageIndex': 0,
+                                                         'pageSize': 10 } )
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result[ 'itemList' ] == [ { 'value': records[ 0 ], 'label': 'alpha' } ]
+    assert result[ 'totalItems' ] == 1
+
+
+def test_child_filter_error( client, records, caplog, monkeypatch ):
+    # an invalid child filter is logged with its traceback, nothing is printed
+    printed = []
+    monkeypatch.setattr( traceback, 'print_exc', lambda *args, **kwargs: printed.append( args ) )
+    response = client.post( '/api/item/select', json = { 'childFilters': [ { 'table': 'test_part',
+                                                                             'foreignKey': 'P_UNKNOWN',
+                                                                             'filters': [] } ] } )
+    assert response.status_code == 200
+    assert len( response.get_json() ) == 3
+    assert any( 'Traceback' in record.getMessage() for record in caplog.records )
+    assert printed == []
+
+
+def test_select_fields( client, records ):
+    # the primary key is only returned when requested, the equal groups stay apart
+    def select( **kwargs ):
+        response = client.post( '/api/item/select', json = dict( value = 'I_GROUP', label = 'I_GROUP', **kwargs ) )
+        assert response.status_code == 200
+        return sorted( response.get_json(), key = lambda item: sorted( item.items() ) )
+
+    assert select( fields = [ 'I_NAME' ] ) == [ { 'value': 1, 'label': '1', 'I_NAME': 'alpha' },
+                                                { 'value': 1, 'label': '1', 'I_NAME': 'beta' },
+                                                { 'value': 2, 'label': '2', 'I_NAME': 'gamma' } ]
+    assert select( fields = [ 'I_ID' ] ) == [ { 'value': 1, 'label': '1', 'I_ID': records[ 0 ] },
+                                          { 'value': 1, 'label': '1', 'I_ID': records[ 1 ] },
+                                          { 'value': 2, 'label': '2', 'I_ID': records[ 2 ] } ]
+
+
+def test_bulk( client, records ):
+    response = client.post( '/api/item/bulk', json = { 'operations': [
+        { 'operation': 'new', 'record': { 'I_NAME': 'delta', 'I_GROUP': 3 } },
+        { 'operation': 'update', 'record': { 'I_ID': str( records[ 1 ] ), 'I_NAME': 'BETA', 'I_GROUP': 1 } },
+        { 'operation': 'delete', 'record': { 'I_ID': records[ 2 ] } },
+        { 'operation': 'update', 'record': { 'I_ID': 'abc', 'I_NAME': 'none', 'I_GROUP': 1 } },
+        { 'operation': 'update', 'record': { 'I_ID': 9999, 'I_NAME': 'none', 'I_GROUP': 1 } } ] } )
+    assert response.status_code == 200
+    results = response.get_json()[ 'results' ]
+    assert [ result[ 'ok' ] for result in results ] == [ True, True, True, False, False ]
+    assert results[ 1 ][ 'id' ] == records[ 1 ]
+    names = sorted( item.I_NAME for item in API.db.session.query( Item ) )
+    assert names == [ 'BETA', 'alpha', 'delta' ]
+
+
+def test_bulk_locked( app, client, records ):
+    # locked by another user, the id of the request is a string
+    with app.test_request_context( json = { 'I_ID': str( records[ 0 ] ) } ):
+        ItemRecordLock.lock( request, user = 'other.user' )
+
+    response = client.post( '/api/item/bulk', json = { 'operations': [
+        { 'operation': 'update', 'record': { 'I_ID': str( records[ 0 ] ), 'I_NAME': 'ALPHA', 'I_GROUP': 1 } },
+        { 'operation': 'delete', 'record': { 'I_ID': records[ 0 ] } } ] } )
+    results = response.get_json()[ 'results' ]
+    assert [ result[ 'ok' ] for result in results ] == [ False, False ]
+    assert API.db.session.query( Item ).get( records[ 0 ] ).I_NAME == 'alpha'
+    assert ItemRecordLock.lockedRecords( [ 'x', str( records[ 0 ] ) ] ) == { str( records[ 0 ] ): 'other.user' }
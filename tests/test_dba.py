@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Tests of the export and the import of the database."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import os
+import csv
+import json
+import numpy
+import decimal
+from datetime import datetime, time
+import pytest
+import yaml
+import webapp2.api as API
+from webapp2.commands.dba import exportTable, importTable, tableLevels
+from webapp2.commands.exporter import dbExporters
+from webapp2.commands.exporter.npz import encodeColumn
+from webapp2.commands.exporter.yaml import YamlDumper
+from webapp2.commands.inporter import dbInporters
+from webapp2.commands.inporter.base import resetForeignKeyChecks
+from webapp2.commands.inporter.npz import decodeColumn
+from webapp2.common.locking.model import RecordLocks
+from conftest import Item, Part
+
+
+def snapshot():
+    API.db.session.expire_all()
+    return { model.__tablename__: sorted( tuple( record.dictionary.items() ) for record in API.db.session.query( model ) )
+             for model in ( Item, Part, RecordLocks ) }
+
+
+def clearTables():
+    for model in ( Part, RecordLocks, Item ):
+        API.db.session.query( model ).delete()
+
+    API.db.session.commit()
+    return
+
+
+@pytest.fixture
+def dump( app, records ):
+    API.db.session.add( RecordLocks( L_USER = 'other.user',
+                                     L_TABLE = 'test_item',
+                                     L_RECORD_ID = records[ 0 ],
+                                     L_START_DATE = datetime.utcnow().replace( microsecond = 0 ),
+                                     L_EXPIRE_DATE = None ) )
+    API.db.session.commit()
+    return snapshot()
+
+
+@pytest.mark.parametrize( 'fmt', [ 'csv', 'json', 'yaml', 'sql', 'npz', 'json.gz', 'yaml.gz', 'sql.gz' ] )
+def test_round_trip( app, dump, tmp_path, fmt ):
+    # the table list of the dba commands is read with SHOW TABLES (MySQL), the tables
+    # are exported and imported with the functions of the commands
+    tables = [ ( model.__tablename__, model ) for model in ( Item, Part, RecordLocks ) ]
+    filename = str( tmp_path / 'dump.{}'.format( fmt ) )
+    exporter = dbExporters[ fmt.split( '.' )[ 0 ] ]( filename, 2 )
+    exporter.open( filename )
+    for tbl, model in tables:
+        assert exportTable( exporter, tbl, model, False, 2 )[ 1 ] == len( dump[ tbl ] )
+
+    exporter.close()
+    API.db.session.remove()
+    clearTables()
+    assert snapshot() != dump
+    inporter = dbInporters[ fmt.split( '.' )[ 0 ] ]( filename, 2 )
+    inporter.open( filename )
+    for level in tableLevels( tables ):
+        for tbl, model in level:
+            importTable( inporter, tbl, model, False )
+
+    inporter.close()
+    assert snapshot() == dump
+
+
+def readExport( fmt, filename ):
+    if fmt == 'csv':
+        base, ext = os.path.splitext( filename )
+        with open( '{}-test_item{}'.format( base, ext ), newline = '' ) as stream:
+            return [ { key: int( value ) if value.isdigit() else value for key, value in row.items() }
+                     for row in csv.DictReader( stream, delimiter = ';' ) ]
+
+    with open( filename ) as stream:
+        if fmt == 'sql':
+            # an extended INSERT per chunk, a line per record
+            lines = stream.read().splitlines()
+            assert len( [ line for line in lines if line.startswith( 'INSERT INTO test_item' ) ] ) == 2
+            return [ line for line in lines if line.startswith( '( ' ) ]
+
+        data = json.load( stream ) if fmt == 'json' else yaml.safe_load( stream )
+
+    return data[ 'test_item' ][ 'records' ]
+
+
+@pytest.mark.parametrize( 'fmt', [ 'csv', 'json', 'yaml', 'sql' ] )
+def test_export_chunks( app, records, tmp_path, fmt ):
+    # a chunk smaller than the table, the records are written in more than one chunk
+    filename = str( tmp_path / 'dump.{}'.format( fmt ) )
+    exporter = dbExporters[ fmt ]( filename, 2 )
+    exporter.open( filename )
+    query = API.db.session.query( Item ).order_by( Item.I_ID ).yield_per( 2 )
+    assert exporter.writeTable( 'test_item', query, False ) == 3
+    exporter.close()
+    result = readExport( fmt, filename )
+    assert len( result ) == 3
+    if fmt != 'sql':
+        assert result == [ record.toDict() for record in API.db.session.query( Item ).order_by( Item.I_ID ) ]
+
+
+def test_csv_empty_table( app, tmp_path ):
+    # an empty table still has the header row, the import reads no records
+    filename = str( tmp_path / 'dump.csv' )
+    exporter = dbExporters[ 'csv' ]( filename, 2 )
+    assert exportTable( exporter, 'test_part', Part, False, 2 )[ 1 ] == 0
+    with open( str( tmp_path / 'dump-test_part.csv' ), newline = '' ) as stream:
+        assert stream.read().splitlines() == [ 'P_ID;P_ITEM_ID;P_NAME' ]
+
+    inporter = dbInporters[ 'csv' ]( filename, 2 )
+    inporter.open( filename )
+    assert importTable( inporter, 'test_part', Part, False )[ 1 ] == 0
+    inporter.close()
+
+
+def test_table_levels():
+    # the parts refer to the items, they are imported after the items
+    levels = tableLevels( [ ( model.__tablename__, model ) for model in ( Part, RecordLocks, Item ) ] )
+    assert [ [ tbl for tbl, model in level ] for level in levels ] == [ [ 'locking', 'test_item' ], [ 'test_part' ] ]
+
+
+def test_parallel_formats():
+    # the formats of which a table is read without reading the whole file
+    assert sorted( fmt for fmt, inporter in dbInporters.items() if inporter.PARALLEL ) == [ 'csv', 'npz' ]
+
+
+def test_yaml_safe_types():
+    # the Decimal and time values are written as text, yaml.safe_load() refuses python tags
+    text = yaml.dump( [ { 'amount': decimal.Decimal( '1.50' ), 'at': time( 12, 30 ) } ], Dumper = YamlDumper )
+    assert yaml.safe_load( text ) == [ { 'amount': '1.50', 'at': '12:30:00' } ]
+    with pytest.raises( yaml.YAMLError ):
+        yaml.safe_load( yaml.dump( decimal.Decimal( '1.50' ) ) )
+
+
+def test_reset_foreign_key_checks():
+    class Connection( object ):
+        invalidated = False
+
+        def execute( self, statement ):
+            raise Exception( 'connection lost' )
+
+        def invalidate( self ):
+            self.invalidated = True
+
+    connection = Connection()
+    resetForeignKeyChecks( connection )
+    assert connection.invalidated
+
+
+@pytest.mark.parametrize( 'kind, values', [ ( 'text', [ 'a', None, 'caf\u00e9', 'x' * 100000 ] ),
+                                            ( 'json', [ { 'a': [ 1, 2 ] }, None, 'text' ] ),
+                                            ( 'binary', [ b'\x00\x01', None, b'' ] ) ] )
+def test_npz_column( kind, values ):
+    # the values are stored as bytes with offsets, one long value doesn't widen the others
+    arrays = encodeColumn( kind, values )
+    assert arrays[ 'data' ].dtype == numpy.uint8
+    assert arrays[ 'data' ].nbytes == sum( len( value if isinstance( value, bytes ) else json.dumps( value ) if kind == 'json' else value.encode( 'utf-8' ) )
+                                           for value in values if value is not None )
+    assert decodeColumn( kind, arrays[ 'data' ], arrays[ 'mask' ], arrays[ 'offsets' ] ) == values
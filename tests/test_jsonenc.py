@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Tests of the JSON encoding."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+from datetime import datetime, date
+from flask import jsonify
+from webapp2.common.jsonenc import dumpsJson
+
+
+def test_dumps_like_jsonify( app ):
+    # the responses of dumpsJson() and jsonify() are the same
+    data = { 'name': 'café', 'at': datetime( 2023, 5, 1, 12, 30 ), 'on': date( 2023, 5, 1 ), 'group': None, 'count': [ 1, 2 ] }
+    assert dumpsJson( data ) == jsonify( data ).get_data().rstrip( b'\n' )
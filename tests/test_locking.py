@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Tests of the record locks and the lock registry."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import pytest
+from flask import request
+import webapp2.api as API
+from webapp2.common.locking.registry import lockRegistry
+from webapp2.common.locking.reaper import LockReaper
+from webapp2.common.locking.migration import removeDuplicateLocks
+from webapp2.common.exceptions import InvalidRequestExecption
+from conftest import ItemRecordLock
+
+
+@pytest.fixture
+def registry( app ):
+    API.app.config[ 'LOCK_MEMORY_MAP' ] = True
+    lockRegistry.load()
+    yield lockRegistry
+    API.app.config[ 'LOCK_MEMORY_MAP' ] = False
+    lockRegistry.load()
+    lockRegistry._locks = {}
+
+
+def lock( app, record_id, user, action = ItemRecordLock.lock ):
+    with app.test_request_context( json = { 'I_ID': record_id } ):
+        return action( request, user = user )
+
+
+def test_lock_string_id( app, records ):
+    lock( app, str( records[ 0 ] ), 'other.user' )
+    assert ItemRecordLock.lockedRecords( [ records[ 0 ] ], 'single.user' ) == { records[ 0 ]: 'other.user' }
+    assert ItemRecordLock.lockedRecords( [ records[ 0 ] ], 'other.user' ) == {}
+    lock( app, str( records[ 0 ] ), 'other.user', ItemRecordLock.unlock )
+    assert ItemRecordLock.lockedRecords( [ records[ 0 ] ], 'single.user' ) == {}
+
+
+def test_registry_string_id( app, records, registry ):
+    lock( app, str( records[ 0 ] ), 'other.user' )
+    lock( app, records[ 1 ], 'other.user' )
+    assert registry.lockedRecords( 'test_item', [ records[ 0 ], str( records[ 1 ] ) ], 'single.user' ) == \
+                { records[ 0 ]: 'other.user', str( records[ 1 ] ): 'other.user' }
+    lock( app, records[ 0 ], 'other.user', ItemRecordLock.unlock )
+    lock( app, str( records[ 1 ] ), 'other.user', ItemRecordLock.unlock )
+    assert registry.lockedRecords( 'test_item', records, 'single.user' ) == {}
+    # the registry loaded from the locking table has the same keys
+    lock( app, str( records[ 2 ] ), 'other.user' )
+    registry.invalidate()
+    assert ItemRecordLock.lockedRecords( [ str( records[ 2 ] ) ], 'single.user' ) == { str( records[ 2 ] ): 'other.user' }
+
+
+def test_lock_invalid_id( app, records ):
+    with pytest.raises( InvalidRequestExecption ):
+        lock( app, 'abc', 'other.user' )
+
+
+def test_reaper_restart( app ):
+    # the thread is created by start(), the reaper can be started again
+    reaper = LockReaper()
+    reaper.interval = 0.01
+    for _ in range( 2 ):
+        reaper.start()
+        reaper.start()
+        assert reaper.is_alive()
+        reaper.stop( 5 )
+        assert not reaper.is_alive()
+
+
+def test_remove_duplicate_locks( app ):
+    # the locking table before the unique index, only the newest lock of a record is kept
+    API.db.session.execute( 'create table locking_old ( l_id integer primary key, l_table text, l_record_id integer )' )
+    for lockId, table, recordId in ( ( 1, 'test_item', 1 ), ( 2, 'test_item', 1 ), ( 3, 'test_item', 2 ),
+                                     ( 4, 'test_part', 1 ), ( 5, 'test_item', 1 ) ):
+        API.db.session.execute( 'insert into locking_old values ( {}, \'{}\', {} )'.format( lockId, table, recordId ) )
+
+    assert removeDuplicateLocks( API.db.session.connection(), 'locking_old' ) == 2
+    assert [ row[ 0 ] for row in API.db.session.execute( 'select l_id from locking_old order by l_id' ) ] == [ 3, 4, 5 ]
+    API.db.session.execute( 'drop table locking_old' )
+    API.db.session.commit()
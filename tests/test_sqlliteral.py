@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Tests of the SQL literals."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import decimal
+from datetime import datetime, time, timedelta, timezone
+import pytest
+from sqlalchemy import Column, Float, Numeric, DateTime, Time
+from sqlalchemy.dialects import mysql
+from webapp2.common.sqlliteral import literalProcessor
+from conftest import Item
+
+
+@pytest.mark.parametrize( 'column_type, value', [ ( Float, float( 'nan' ) ), ( Float, float( 'inf' ) ),
+                                                  ( Numeric, decimal.Decimal( 'NaN' ) ),
+                                                  ( Numeric, decimal.Decimal( '-Infinity' ) ) ] )
+def test_number_not_finite( column_type, value ):
+    assert literalProcessor( Column( 'value', column_type ) )( value ) == 'NULL'
+
+
+def test_number():
+    assert literalProcessor( Column( 'value', Float ) )( 0.1 ) == '0.1'
+    assert literalProcessor( Column( 'value', Numeric ) )( decimal.Decimal( '1.50' ) ) == '1.50'
+
+
+def test_temporal_utc():
+    # MySQL DATETIME and TIME reject the offset, the values are converted to UTC
+    zone = timezone( timedelta( hours = 2 ) )
+    dialect = mysql.dialect()
+    assert literalProcessor( Column( 'at', DateTime ), dialect )( datetime( 2023, 5, 1, 1, 30, tzinfo = zone ) ) == \
+           "'2023-04-30 23:30:00'"
+    assert literalProcessor( Column( 'at', DateTime ), dialect )( datetime( 2023, 5, 1, 1, 30 ) ) == "'2023-05-01 01:30:00'"
+    assert literalProcessor( Column( 'at', Time ), dialect )( time( 1, 30, tzinfo = zone ) ) == "'23:30:00'"
+
+
+def test_to_sql():
+    # the former toSql() signature and format, without the terminating semicolon
+    item = Item( I_ID = 1, I_NAME = "o'neil", I_GROUP = None )
+    assert item.toSql() == "INSERT INTO test_item ( i_id, i_name, i_group ) VALUES ( 1, 'o''neil', NULL )"
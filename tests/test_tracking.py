@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""Tests of the tracking history."""
+#
+# Main webapp application package
+# Copyright (C) 2018-2023 Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This library is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Library General Public License GPL-2.0-only
+# as published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+#
+import json
+from datetime import datetime, timedelta
+import pytest
+import click
+from click.testing import CliRunner
+from sqlalchemy import MetaData, Table
+from sqlalchemy.engine.reflection import Inspector
+import webapp2.api as API
+from webapp2.common.tracking.model import Tracking
+from webapp2.common.tracking.archive import trackingArchive
+from webapp2.common.tracking.metadata import trackingMetadata
+from webapp2.common.tracking.queue import TrackingQueue
+
+
+@pytest.fixture
+def history( app, records, tmp_path ):
+    """Eight changes of the first item, five of them are archived, and changes of other
+       records and another table with the same record id.
+    """
+    API.app.config[ 'TRACKING_ARCHIVE_MODE' ] = 'file'
+    API.app.config[ 'TRACKING_ARCHIVE_FOLDER' ] = str( tmp_path )
+    now = datetime.utcnow().replace( microsecond = 0 )
+    changes = [ now - timedelta( days = 200 - day ) for day in range( 5 ) ] + \
+              [ now - timedelta( days = 3 - day ) for day in range( 3 ) ]
+    for table, recordId in ( ( 'test_item', records[ 0 ] ), ( 'test_item', records[ 1 ] ), ( 'test_part', records[ 0 ] ) ):
+        for change in changes if recordId == records[ 0 ] and table == 'test_item' else changes[ : 2 ] + changes[ -2 : ]:
+            row = API.recordTracking.row( API.recordTracking.UPDATE, table, recordId, { 'change': str( change ) }, 'single.user' )
+            row[ 'T_CHANGE_DATE_TIME' ] = change
+            API.db.session.add( Tracking( **row ) )
+
+    API.db.session.commit()
+    assert trackingArchive.archive() == 9
+    yield changes
+    API.app.config.pop( 'TRACKING_ARCHIVE_MODE' )
+    API.app.config.pop( 'TRACKING_ARCHIVE_FOLDER' )
+
+
+def retrieve( client, records, **kwargs ):
+    data = { 'T_TABLE': 'test_item',
+             'T_RECORD_ID': records[ 0 ],
+             'T_CHANGE_DATE_TIME': ( datetime.utcnow() - timedelta( days = 365 ) ).isoformat(),
+             'contents': False }
+    data.update( kwargs )
+    response = client.post( '/api/tracking/retrieve', json = data )
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_retrieve_all( client, records, history ):
+    result = retrieve( client, records )
+    assert [ record[ 'T_CHANGE_DATE_TIME' ][ : 19 ] for record in result ] == [ change.isoformat() for change in history ]
+
+
+def test_retrieve_pages( client, records, history ):
+    pages = []
+    cursor = None
+    while True:
+        result = retrieve( client, records, pageSize = 3, **( { 'cursor': cursor } if cursor else {} ) )
+        assert len( result[ 'records' ] ) <= 3
+        pages.append( result )
+        cursor = result[ 'nextCursor' ]
+        if cursor is None:
+            break
+
+    changes = [ record[ 'T_CHANGE_DATE_TIME' ][ : 19 ] for page in pages for record in page[ 'records' ] ]
+    assert changes == [ change.isoformat() for change in reversed( history ) ]
+    # back from the last page, which only holds archived records
+    result = retrieve( client, records, pageSize = 3, cursor = pages[ -1 ][ 'prevCursor' ] )
+    assert result[ 'records' ] == pages[ -2 ][ 'records' ]
+
+
+def test_archive_table_index( app ):
+    # the archive tables have the history index of the tracking table, older tables get it added
+    Table( 'tracking_200002', MetaData(), *[ column.copy() for column in Tracking.__table__.columns ] ).create( API.db.engine )
+    for month in ( '200001', '200002' ):
+        trackingArchive._tables.pop( 'tracking_{}'.format( month ), None )
+        trackingArchive.archiveTable( month )
+        indexes = Inspector.from_engine( API.db.engine ).get_indexes( 'tracking_{}'.format( month ) )
+        assert [ ( index[ 'name' ], index[ 'column_names' ] ) for index in indexes ] == \
+               [ ( 'tracking_history_{}'.format( month ), [ 't_table', 't_record_id', 't_change_date_time' ] ) ]
+
+
+def test_metadata_refresh_after( app ):
+    # the registry is refreshed after a migration command, like 'flask db upgrade'
+    @click.command()
+    def upgrade():
+        API.db.session.execute( "insert into alembic_version ( version_num ) values ( 'abc123' )" )
+        API.db.session.commit()
+
+    trackingMetadata.build()
+    assert trackingMetadata.version == ''
+    result = CliRunner().invoke( trackingMetadata.refreshAfter( upgrade ) )
+    assert result.exit_code == 0
+    assert trackingMetadata.version == 'abc123'
+    API.db.session.execute( 'delete from alembic_version' )
+    API.db.session.commit()
+    trackingMetadata.build()
+
+
+def test_retrieve_table_scope( client, records ):
+    rows = [ API.recordTracking.row( API.recordTracking.UPDATE, table, records[ 0 ], {}, 'single.user' ) for table in ( 'test_item', 'test_part', 'test_item' ) ]
+    # a cascade delete of the item and its parts
+    rows[ 2 ].update( T_ACTION = API.recordTracking.CASCADE_DELETE, T_TABLE = json.dumps( [ 'test_item', 'test_part' ] ) )
+    API.db.session.add_all( [ Tracking( **row ) for row in rows ] )
+    API.db.session.commit()
+
+    def tables( **kwargs ):
+        response = client.post( '/api/tracking/retrieve', json = dict( T_RECORD_ID = records[ 0 ], **kwargs ) )
+        assert response.status_code == 200
+        return sorted( record[ 'T_TABLE' ] for record in response.get_json() )
+
+    assert tables( T_TABLE = 'test_item' ) == [ '["test_item", "test_part"]', 'test_item' ]
+    assert tables( T_TABLE = 'test_part' ) == [ 'test_part' ]
+    assert tables( T_TABLE = 'unknown' ) == []
+    # without a table the history of the record id in all tables
+    assert tables() == [ '["test_item", "test_part"]', 'test_item', 'test_part' ]
+
+
+def test_queue_lazy_worker( app, records ):
+    # the worker is started by the first put() of a process, not by start()
+    queue = TrackingQueue()
+    queue.start()
+    assert not queue.enabled
+    API.app.config[ 'TRACKING_ASYNC' ] = True
+    try:
+        queue.start()
+        assert queue.enabled and queue._thread is None
+        row = API.recordTracking.row( API.recordTracking.UPDATE, 'test_item', records[ 0 ], {}, 'single.user' )
+        queue.put( dict( row ) )
+        parent, stopping = queue._thread, queue._stopping
+        assert parent.is_alive()
+        # a forked child has no worker thread, its first put() starts its own
+        queue._pid = -1
+        queue.put( dict( row ) )
+        assert queue._thread is not parent and queue._thread.is_alive()
+        stopping.set()
+        parent.join( 5 )
+        queue.stop( 5 )
+        assert queue.stats()[ 'written' ] == 2
+
+    finally:
+        API.app.config.pop( 'TRACKING_ASYNC' )